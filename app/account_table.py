@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+即梦账号表格（模型/视图）
+原先每次任务结束都重新查询全部账号的当日次数，并为每行重建复选框控件。这里改为：
+- AccountTableModel：选择列使用模型的勾选状态（不创建控件），刷新时按账号 ID 保留勾选
+- 任务成功时引擎事件附带账号 ID，直接累加对应单元格的次数
+- 其他变化只安排一次合并刷新，两次刷新间隔不少于 ACCOUNTS_REFRESH_INTERVAL_MS
+"""
+
+from typing import Any, Dict, List, Optional
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+# 账号列表自动刷新的最小间隔（毫秒）
+ACCOUNTS_REFRESH_INTERVAL_MS = 3000
+
+COLUMNS = ["选择", "ID", "用户名", "当日图片数", "当日视频数"]
+COL_CHECK, COL_ID, COL_USERNAME, COL_IMAGES, COL_VIDEOS = range(len(COLUMNS))
+
+# 记录类型 -> 次数字段 / 列
+_COUNT_FIELDS = {1: ('image_count', COL_IMAGES), 2: ('video_count', COL_VIDEOS)}
+
+
+class AccountTableModel(QAbstractTableModel):
+    """账号列表模型，数据为 get_accounts_with_usage 的结果"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._accounts: List[Dict[str, Any]] = []
+        self._rows: Dict[int, int] = {}  # 账号ID -> 行号
+        self._checked = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._accounts)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        account = self._accounts[index.row()]
+        column = index.column()
+        if column == COL_CHECK:
+            if role == Qt.ItemDataRole.CheckStateRole:
+                return Qt.CheckState.Checked if account['id'] in self._checked else Qt.CheckState.Unchecked
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == COL_ID:
+                return str(account['id'])
+            if column == COL_USERNAME:
+                return account['username']
+            if column == COL_IMAGES:
+                return str(account['image_count'])
+            if column == COL_VIDEOS:
+                return str(account['video_count'])
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == COL_CHECK:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or index.column() != COL_CHECK or role != Qt.ItemDataRole.CheckStateRole:
+            return False
+        account_id = self._accounts[index.row()]['id']
+        if Qt.CheckState(value) == Qt.CheckState.Checked:
+            self._checked.add(account_id)
+        else:
+            self._checked.discard(account_id)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        return True
+
+    # ---- 数据更新 ----
+
+    def set_accounts(self, accounts: List[Dict[str, Any]], keep_checked: bool = True):
+        """替换全部账号；保留仍存在账号的勾选状态"""
+        self.beginResetModel()
+        self._accounts = accounts
+        self._rows = {account['id']: row for row, account in enumerate(accounts)}
+        self._checked = (self._checked & self._rows.keys()) if keep_checked else set()
+        self.endResetModel()
+
+    def add_usage(self, account_id: Optional[int], record_type: Optional[int]) -> bool:
+        """累加某账号的当日次数；账号不在列表中时返回 False（需要完整刷新）"""
+        row = self._rows.get(account_id)
+        field = _COUNT_FIELDS.get(record_type)
+        if row is None or field is None:
+            return False
+        name, column = field
+        self._accounts[row][name] += 1
+        index = self.index(row, column)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+        return True
+
+    def checked_ids(self) -> List[int]:
+        return [account['id'] for account in self._accounts if account['id'] in self._checked]
+
+    def set_all_checked(self, checked: bool):
+        self._checked = set(self._rows) if checked else set()
+        if self._accounts:
+            self.dataChanged.emit(self.index(0, COL_CHECK), self.index(len(self._accounts) - 1, COL_CHECK),
+                                  [Qt.ItemDataRole.CheckStateRole])
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+图片资源缓存
+同一张源图在表格缩略图、场景生成、上传派生图、重试与视频阶段会被多次读取。
+本模块按 (路径, 修改时间, 大小) 记录内容哈希，并以内容哈希为键在有界 LRU 中缓存：
+- 原始字节（小文件）；大文件使用临时只读内存映射，不复制到内存也不进入缓存，
+  映射在使用结束时关闭，不会长期占用地址空间或锁定文件（Windows）
+- 派生产物（缩略图、LLM 小图路径、上传派生图路径等）
+并统计各类产物的命中率。每个进程一个实例（前端与生成引擎各自独立）。
+"""
+
+import os
+import mmap
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from database import logger
+
+# 缓存字节总量上限
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 不小于该大小的文件使用临时内存映射，不缓存原始字节
+MMAP_THRESHOLD = 4 * 1024 * 1024
+
+# 单个文件超过该比例的缓存上限时不缓存原始字节
+_MAX_ENTRY_RATIO = 0.25
+
+# 最多记录的文件哈希条数
+_MAX_HASHES = 50000
+
+_HASH_CHUNK = 1024 * 1024
+
+StatKey = Tuple[str, int, int]
+
+
+def stat_key(path: str) -> StatKey:
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def file_digest(path: str) -> str:
+    """文件内容哈希；大文件通过临时内存映射计算，小文件分块读取"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                return hashlib.sha1(m).hexdigest()
+        h = hashlib.sha1()
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            h.update(chunk)
+        return h.hexdigest()
+
+
+class _Counter:
+    __slots__ = ('hits', 'misses')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class AssetCache:
+    """以内容哈希为键的有界 LRU 资源缓存（线程安全）"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, mmap_threshold: int = MMAP_THRESHOLD):
+        self.max_bytes = max_bytes
+        self.mmap_threshold = mmap_threshold
+        self._lock = threading.RLock()
+        # (路径, 修改时间, 大小) -> 内容哈希
+        self._hashes: 'OrderedDict[StatKey, str]' = OrderedDict()
+        # (内容哈希, 类型) -> (值, 占用字节)
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[Any, int]]' = OrderedDict()
+        self._bytes = 0
+        self._stats: Dict[str, _Counter] = {}
+
+    # ---------- 统计 ----------
+
+    def _count(self, kind: str, hit: bool):
+        counter = self._stats.get(kind)
+        if counter is None:
+            counter = self._stats[kind] = _Counter()
+        if hit:
+            counter.hits += 1
+        else:
+            counter.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """各类产物的命中统计与当前占用"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'kinds': {kind: c.as_dict() for kind, c in self._stats.items()},
+            }
+
+    def log_stats(self):
+        stats = self.stats()
+        if not stats['kinds']:
+            return
+        parts = [f"{kind} {c['hits']}/{c['hits'] + c['misses']} ({c['hit_rate']:.0%})"
+                 for kind, c in sorted(stats['kinds'].items())]
+        logger.info(f"资源缓存命中率: {', '.join(parts)}；占用 {stats['bytes'] / 1024 / 1024:.1f}MB")
+
+    # ---------- LRU ----------
+
+    def _lookup(self, key: Tuple[str, str]):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: Tuple[str, str], value: Any, size: int):
+        if size > self.max_bytes * _MAX_ENTRY_RATIO:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def _remember_hash(self, key: StatKey, digest: str):
+        self._hashes[key] = digest
+        if len(self._hashes) > _MAX_HASHES:
+            self._hashes.popitem(last=False)
+
+    # ---------- 读取 ----------
+
+    def _load(self, path: str, key: StatKey) -> Tuple[str, bytes]:
+        """按需读取小文件并登记内容哈希与原始字节，返回 (内容哈希, 字节)"""
+        with self._lock:
+            digest = self._hashes.get(key)
+            if digest is not None:
+                entry = self._lookup((digest, 'raw'))
+                if entry is not None:
+                    self._count('raw', True)
+                    return digest, entry[0]
+            self._count('raw', False)
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            self._remember_hash(key, digest)
+            self._store((digest, 'raw'), data, len(data))
+        return digest, data
+
+    def content_hash(self, path: str) -> str:
+        """文件内容哈希；文件未变化（修改时间与大小相同）时不重复读取"""
+        key = stat_key(path)
+        with self._lock:
+            digest = self._hashes.get(key)
+            self._count('hash', digest is not None)
+        if digest is not None:
+            return digest
+        # 只计算哈希，原始字节在 open_bytes 时才缓存
+        digest = file_digest(path)
+        with self._lock:
+            self._remember_hash(key, digest)
+        return digest
+
+    def known_hash(self, key: StatKey) -> Optional[str]:
+        """已记录的内容哈希（不读取文件）；未记录时返回 None"""
+        with self._lock:
+            return self._hashes.get(key)
+
+    def record_hash(self, key: StatKey, digest: str):
+        """登记在别处（如工作进程中）算好的内容哈希"""
+        with self._lock:
+            self._remember_hash(key, digest)
+
+    @contextmanager
+    def open_bytes(self, path: str) -> Iterator[Any]:
+        """
+        文件原始内容（bytes 或只读 mmap，均支持缓冲区协议），仅在 with 块内有效
+        小文件来自缓存；大文件使用临时内存映射，退出 with 块时关闭
+        """
+        key = stat_key(path)
+        if key[2] < self.mmap_threshold:
+            yield self._load(path, key)[1]
+            return
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+
+    def get_artifact(self, path: str, kind: str, factory: Callable[[Any], Any],
+                     size_of: Optional[Callable[[Any], int]] = None):
+        """
+        获取源图的派生产物，未命中时调用 factory 生成并缓存
+        :param kind: 产物类型（如 thumb_130、llm、upload）
+        :param factory: factory(path) -> 产物；返回 None 时不缓存
+        :param size_of: 估算产物占用字节，默认按 0 计
+        """
+        digest = self.content_hash(path)
+        with self._lock:
+            entry = self._lookup((digest, kind))
+            self._count(kind, entry is not None)
+        if entry is not None:
+            return entry[0]
+        value = factory(path)
+        if value is not None:
+            with self._lock:
+                self._store((digest, kind), value, size_of(value) if size_of else 0)
+        return value
+
+    def peek_artifact(self, path: str, kind: str):
+        """只查询不生成（命中统计同 get_artifact）"""
+        digest = self.content_hash(path)
+        with self._lock:
+            entry = self._lookup((digest, kind))
+            self._count(kind, entry is not None)
+        return entry[0] if entry is not None else None
+
+    def put_artifact(self, path: str, kind: str, value: Any, size: int = 0):
+        digest = self.content_hash(path)
+        with self._lock:
+            self._store((digest, kind), value, size)
+
+    def clear(self):
+        with self._lock:
+            self._hashes.clear()
+            self._entries.clear()
+            self._bytes = 0
+
+
+_cache: Optional[AssetCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_asset_cache() -> AssetCache:
+    """进程内共享的资源缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AssetCache()
+        return _cache
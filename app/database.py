@@ -8,7 +8,7 @@ import sys
 from pathlib import Path
 from peewee import *
 import platform
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # 确保正确导入 loguru
 try:
@@ -133,8 +133,9 @@ def get_database():
     # 数据库文件路径
     db_path = os.path.join(db_dir, "app.db")
     
-    # 创建数据库实例
-    db = SqliteDatabase(db_path)
+    # 创建数据库实例：界面进程与引擎进程共用同一数据库文件，
+    # 使用 WAL 允许读写并发，写冲突时等待而不是立即报 database is locked
+    db = SqliteDatabase(db_path, pragmas={'journal_mode': 'wal', 'busy_timeout': 5000})
     return db
 
 
@@ -184,6 +185,41 @@ class KelingAccount(BaseModel):
     created_at = DateTimeField(constraints=[SQL('DEFAULT CURRENT_TIMESTAMP')])
 
 
+# 场景描述缓存：键为 (图片内容哈希, 标题, 模型, 系统提示词版本) 的摘要
+class SceneCache(BaseModel):
+    key = CharField(unique=True)
+    scene = TextField()
+    hits = IntegerField(default=0)
+    created_at = DateTimeField(default=datetime.now)
+    last_used = DateTimeField(default=datetime.now, index=True)
+
+
+# 生成结果索引：内容哈希寻址的输出文件及其来源
+class OutputAsset(BaseModel):
+    digest = CharField(index=True)
+    path = TextField()
+    kind = CharField()  # image / video
+    sku = CharField(null=True, index=True)  # 商品文件夹名
+    row_id = CharField(null=True, index=True)
+    job_id = CharField(null=True)
+    account_id = IntegerField(null=True)
+    source = TextField(null=True)  # 源图路径
+    url = TextField(null=True)
+    created_at = DateTimeField(default=datetime.now)
+
+
+# 导入索引：每个 SKU 文件夹的修改时间、图片列表与标题，未变化的文件夹导入时无需重新扫描
+class ImportIndex(BaseModel):
+    folder_path = CharField(unique=True)  # SKU 文件夹路径（images/<SKU>）
+    root = CharField(index=True)  # 导入根目录
+    dir_mtime_ns = IntegerField()
+    json_mtime_ns = IntegerField(default=0)  # items/<SKU>.json 的修改时间，不存在时为0
+    images = TextField()  # 图片文件名列表（JSON，按扩展名优先级排序）
+    title = TextField()
+    main_image = TextField(null=True)  # 默认主图
+    updated_at = DateTimeField(default=datetime.now)
+
+
 def init_database():
     """初始化数据库"""
     try:
@@ -191,7 +227,7 @@ def init_database():
         db.connect()
         
         # 创建表
-        db.create_tables([Config, JimengAccount, JimengRecord], safe=True)
+        db.create_tables([Config, JimengAccount, JimengRecord, SceneCache, OutputAsset, ImportIndex], safe=True)
         
         # 初始化默认配置
         init_default_configs()
@@ -215,7 +251,17 @@ def init_default_configs():
         {'key': 'image_prompt', 'value': '', 'description': '图片生成提示词'},
         {'key': 'video_prompt', 'value': '', 'description': '视频生成提示词'},
         {'key': 'video_duration', 'value': '5', 'description': '视频时长（秒）'},
-        {'key': 'browser_headless', 'value': '1', 'description': '浏览器无头模式开关（1开，0关）'}
+        {'key': 'browser_headless', 'value': '1', 'description': '浏览器无头模式开关（1开，0关）'},
+        {'key': 'job_timeout', 'value': '20', 'description': '单个生成任务的时间预算（分钟，含重试与下载）'},
+        {'key': 'image_letterbox', 'value': '0', 'description': '上传前将图片补边为9:16（1开，0关）'},
+        {'key': 'scene_cache_ttl_days', 'value': '7', 'description': '场景描述缓存有效期（天，0为不缓存）'},
+        {'key': 'scene_cache_max_entries', 'value': '5000', 'description': '场景描述缓存最大条数'},
+        {'key': 'llm_max_retries', 'value': '2', 'description': 'LLM 请求遇到429/5xx时的重试次数'},
+        {'key': 'llm_hedge', 'value': '0', 'description': 'LLM 慢请求对冲开关（1开，0关；对冲最多占请求数的10%）'},
+        {'key': 'llm_hedge_proxy', 'value': '', 'description': '对冲请求的备用API地址（为空时使用主地址）'},
+        {'key': 'llm_hedge_model', 'value': '', 'description': '对冲请求的备用模型（为空时使用主模型）'},
+        {'key': 'watch_poll_interval', 'value': '3', 'description': '监听文件夹的轮询间隔（秒，无 inotify 时使用）'},
+        {'key': 'watch_auto_generate', 'value': '0', 'description': '监听到新商品时自动生成（0关，1图片，2图片和视频）'}
     ]
     
     for config_data in default_configs:
@@ -466,34 +512,38 @@ def delete_accounts(account_ids):
         return {'success': False, 'error': str(e)}
 
 
+def get_daily_usage(day=None):
+    """
+    各账号某日的使用次数（一次分组查询）
+    :return: {账号ID: {1: 图片次数, 2: 视频次数}}
+    """
+    day = day or datetime.now().date()
+    usage = {}
+    query = (JimengRecord
+             .select(JimengRecord.account, JimengRecord.type, fn.COUNT(JimengRecord.id).alias('count'))
+             .where(fn.date(JimengRecord.time) == day)
+             .group_by(JimengRecord.account, JimengRecord.type)
+             .tuples())
+    for account_id, record_type, count in query:
+        usage.setdefault(account_id, {})[record_type] = count
+    return usage
+
+
 def get_accounts_with_usage():
-    """获取所有账号及其当日使用次数"""
+    """获取所有账号及其当日使用次数（账号与当日次数各一次查询）"""
     try:
         accounts = []
-        today = datetime.now().date()
+        usage = get_daily_usage()
         
         for account in JimengAccount.select():
-            # 计算当日图片使用次数
-            image_count = JimengRecord.select().where(
-                (JimengRecord.account == account) &
-                (JimengRecord.type == 1) &
-                (fn.date(JimengRecord.time) == today)
-            ).count()
-            
-            # 计算当日视频使用次数
-            video_count = JimengRecord.select().where(
-                (JimengRecord.account == account) &
-                (JimengRecord.type == 2) &
-                (fn.date(JimengRecord.time) == today)
-            ).count()
-            
+            counts = usage.get(account.id, {})
             accounts.append({
                 'id': account.id,
                 'username': account.username,
                 'password': account.password,
                 'cookies': account.cookies,
-                'image_count': image_count,
-                'video_count': video_count,
+                'image_count': counts.get(1, 0),
+                'video_count': counts.get(2, 0),
                 'created_at': account.created_at.strftime('%Y-%m-%d %H:%M:%S'),
                 'updated_at': account.updated_at.strftime('%Y-%m-%d %H:%M:%S')
             })
@@ -519,6 +569,141 @@ def add_record(account_id, record_type):
         return {'success': False, 'error': str(e)}
 
 
+def get_cached_scene(key, ttl_days):
+    """读取未过期的场景缓存，命中时刷新最近使用时间；未命中返回 None"""
+    try:
+        entry = SceneCache.get_or_none(SceneCache.key == key)
+        if entry is None:
+            return None
+        if entry.created_at < datetime.now() - timedelta(days=ttl_days):
+            entry.delete_instance()
+            return None
+        SceneCache.update(hits=SceneCache.hits + 1, last_used=datetime.now()).where(SceneCache.id == entry.id).execute()
+        return entry.scene
+    except Exception as e:
+        logger.warning(f"读取场景缓存失败: {e}")
+        return None
+
+
+def save_cached_scene(key, scene, max_entries):
+    """写入场景缓存，超过条数上限时按最近使用时间淘汰"""
+    try:
+        now = datetime.now()
+        (SceneCache
+         .insert(key=key, scene=scene, hits=0, created_at=now, last_used=now)
+         .on_conflict_replace()
+         .execute())
+        overflow = SceneCache.select().count() - max_entries
+        if overflow > 0:
+            stale = SceneCache.select(SceneCache.id).order_by(SceneCache.last_used).limit(overflow)
+            SceneCache.delete().where(SceneCache.id.in_(stale)).execute()
+    except Exception as e:
+        logger.warning(f"写入场景缓存失败: {e}")
+
+
+def add_output_asset(**fields):
+    """登记一个生成结果"""
+    try:
+        OutputAsset.create(**fields)
+    except Exception as e:
+        logger.warning(f"登记生成结果失败: {e}")
+
+
+# SQLite 单条语句的变量数有限，批量读写时分段
+_SQL_BATCH = 500
+
+
+def find_output_asset(digest, kind):
+    """按内容哈希查找已保存的结果路径，不存在时返回 None"""
+    try:
+        entry = (OutputAsset.select(OutputAsset.path)
+                 .where((OutputAsset.digest == digest) & (OutputAsset.kind == kind))
+                 .first())
+        return entry.path if entry else None
+    except Exception as e:
+        logger.warning(f"查询生成结果失败: {e}")
+        return None
+
+
+def get_output_assets(sku=None, row_id=None, kind=None, skus=None):
+    """按 SKU（或一组 SKU）或行查询生成结果（按时间先后），返回字典列表"""
+    try:
+        query = OutputAsset.select()
+        if sku is not None:
+            query = query.where(OutputAsset.sku == sku)
+        if row_id is not None:
+            query = query.where(OutputAsset.row_id == row_id)
+        if kind is not None:
+            query = query.where(OutputAsset.kind == kind)
+        if skus is None:
+            queries = [query]
+        else:
+            skus = list(skus)
+            queries = [query.where(OutputAsset.sku.in_(skus[i:i + _SQL_BATCH]))
+                       for i in range(0, len(skus), _SQL_BATCH)]
+        assets = [a for q in queries for a in q.order_by(OutputAsset.id)]
+        if len(queries) > 1:
+            assets.sort(key=lambda a: a.id)
+        return [
+            {
+                'path': a.path, 'kind': a.kind, 'sku': a.sku, 'row_id': a.row_id, 'job_id': a.job_id,
+                'account_id': a.account_id, 'source': a.source, 'digest': a.digest,
+                'created_at': a.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            for a in assets
+        ]
+    except Exception as e:
+        logger.error(f"查询生成结果失败: {e}")
+        return []
+
+
+_IMPORT_INDEX_FIELDS = ('folder_path', 'root', 'dir_mtime_ns', 'json_mtime_ns', 'images', 'title', 'main_image')
+
+
+
+def get_import_entries(root=None, folder_paths=None):
+    """按导入根目录或文件夹路径读取导入索引，返回 {文件夹路径: 字典}"""
+    try:
+        if folder_paths is None:
+            queries = [ImportIndex.select().where(ImportIndex.root == root).dicts()]
+        else:
+            paths = list(folder_paths)
+            queries = [
+                ImportIndex.select().where(ImportIndex.folder_path.in_(paths[i:i + _SQL_BATCH])).dicts()
+                for i in range(0, len(paths), _SQL_BATCH)
+            ]
+        return {row['folder_path']: row for query in queries for row in query}
+    except Exception as e:
+        logger.warning(f"读取导入索引失败: {e}")
+        return {}
+
+
+def save_import_entries(entries):
+    """批量写入导入索引（按文件夹路径覆盖）"""
+    if not entries:
+        return
+    try:
+        now = datetime.now()
+        rows = [dict({k: e.get(k) for k in _IMPORT_INDEX_FIELDS}, updated_at=now) for e in entries]
+        step = _SQL_BATCH // (len(_IMPORT_INDEX_FIELDS) + 1)
+        with db.atomic():
+            for i in range(0, len(rows), step):
+                ImportIndex.insert_many(rows[i:i + step]).on_conflict_replace().execute()
+    except Exception as e:
+        logger.warning(f"写入导入索引失败: {e}")
+
+
+def delete_import_entries(folder_paths):
+    """删除已不存在的文件夹的索引"""
+    paths = list(folder_paths)
+    try:
+        with db.atomic():
+            for i in range(0, len(paths), _SQL_BATCH):
+                ImportIndex.delete().where(ImportIndex.folder_path.in_(paths[i:i + _SQL_BATCH])).execute()
+    except Exception as e:
+        logger.warning(f"删除导入索引失败: {e}")
+
+
 def close_database():
     """关闭数据库连接"""
     try:
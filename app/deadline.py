@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+任务时间预算
+每个生成任务持有一个 Deadline，场景生成、登录、上传、提交、等待与下载
+都从剩余预算中推导各自的超时，避免单个任务无限期占用工作线程。
+"""
+
+import time
+from typing import Optional, Tuple
+
+
+# requests 建立连接的超时上限（秒）
+CONNECT_TIMEOUT = 10
+
+# 剩余预算过小时仍给单步保留的最短超时（秒），避免 0 超时被解释为“不限时”
+MIN_STEP_TIMEOUT = 1.0
+
+
+class DeadlineExceeded(Exception):
+    """任务超出时间预算"""
+
+
+class Deadline:
+    """
+    单个任务的截止时间
+    :param budget: 总预算（秒），None 表示不限时（各步骤仅使用自身上限）
+    """
+
+    def __init__(self, budget: Optional[float] = None):
+        self.budget = budget
+        self.started_at = time.monotonic()
+        self.expires_at = None if budget is None else self.started_at + budget
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def remaining(self) -> float:
+        """剩余秒数；不限时返回 inf，已超时返回负数"""
+        if self.expires_at is None:
+            return float('inf')
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, step: str = ''):
+        """已超时则抛出 DeadlineExceeded"""
+        if self.expired:
+            suffix = f"（{step}）" if step else ''
+            raise DeadlineExceeded(f"任务超出时间预算{suffix}: 已用 {self.elapsed():.0f} 秒")
+
+    def timeout(self, cap: float, step: str = '') -> float:
+        """
+        计算某一步的超时（秒）：取步骤上限与剩余预算的较小值
+        :raises DeadlineExceeded: 预算已耗尽
+        """
+        self.check(step)
+        return max(min(cap, self.remaining()), MIN_STEP_TIMEOUT)
+
+    def timeout_ms(self, cap: float, step: str = '') -> float:
+        """Playwright 使用的毫秒超时"""
+        return self.timeout(cap, step) * 1000
+
+    def request_timeout(self, cap: float, step: str = '') -> Tuple[float, float]:
+        """requests 使用的 (连接超时, 读取超时)"""
+        read = self.timeout(cap, step)
+        return min(CONNECT_TIMEOUT, read), read
+
+    def child(self, cap: float) -> 'Deadline':
+        """派生一个不超过当前剩余预算的子截止时间（如“最多等待15分钟”）"""
+        return Deadline(min(cap, self.remaining()))
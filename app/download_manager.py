@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+下载管理器
+生成任务拿到结果 URL 后把下载交给本模块，生成线程（浏览器并发名额）立即释放：
+- 共享 requests.Session，连接池大小与下载并发数一致
+- 同一任务的多个 URL 并发下载，逐个完成即回调
+- 大缓冲写盘；连接/读取超时受任务剩余预算约束；5xx 与网络错误退避重试
+- 先写临时文件（按 URL 命名的 .part），校验长度与 MD5 后原子重命名；中断后按 HTTP Range 只续传缺失部分，
+  .part 与其校验标识（.part.json）在任务重试或程序重启后继续使用，If-Range 不匹配时服务端返回完整内容
+- 任务被取消或超出预算时停止下载（未完成的 .part 保留待续传，由输出存储按时间清理）
+"""
+
+import os
+import re
+import json
+import base64
+import hashlib
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from database import logger
+from job_control import JobHandle, JobCancelled
+
+# 并发下载数
+DOWNLOAD_WORKERS = 8
+
+# 单个文件失败后的重试次数
+DOWNLOAD_RETRIES = 3
+
+# 连接超时与读取超时上限（秒）
+DOWNLOAD_CONNECT_TIMEOUT = 10
+DOWNLOAD_READ_TIMEOUT = 60
+
+# 读取块大小与写盘缓冲（字节）
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# 需要重试的 HTTP 状态码
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# 退避基数与上限（秒）
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 8.0
+
+# 未完成下载的临时文件后缀；续传信息（校验标识与完整响应的 MD5）保存在 <part>.json
+PART_SUFFIX = '.part'
+META_SUFFIX = '.json'
+
+
+class ChecksumMismatch(Exception):
+    """下载内容与服务端提供的 MD5 不一致"""
+
+
+class _HttpStatusError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retryable = status in RETRY_STATUS
+
+
+class DownloadManager:
+    """后台下载线程池（进程内共享）"""
+
+    def __init__(self, max_workers: int = DOWNLOAD_WORKERS):
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download')
+        # 关闭时置位，中断无任务句柄的下载的退避等待
+        self._closing = threading.Event()
+        # 正在写入的 .part 文件（同一 URL 并发下载时后来者不续传）
+        self._active_parts = set()
+        self._parts_lock = threading.Lock()
+
+    def download_all(self, items: Sequence[Tuple[str, str]], handle: Optional[JobHandle] = None,
+                     on_saved: Optional[Callable[[str, str], None]] = None) -> Future:
+        """
+        并发下载一组文件，立即返回
+        :param items: [(URL, 目标路径), ...]
+        :param handle: 任务句柄，用于取消与时间预算
+        :param on_saved: 单个文件下载完成时回调 on_saved(URL, 路径)（在下载线程中调用），
+                         返回值非空时作为该文件的最终路径（如移入输出存储后的路径）
+        :return: Future，结果为与 items 顺序一致的路径列表（下载失败的为 None）；
+                 任务被取消或超出预算时以 JobCancelled / DeadlineExceeded 结束
+        """
+        batch: Future = Future()
+        results: List[Optional[str]] = [None] * len(items)
+        if not items:
+            batch.set_result(results)
+            return batch
+        remaining = [len(items)]
+        errors: List[Exception] = []
+        lock = threading.Lock()
+
+        def _one_done(index: int, future: Future):
+            try:
+                results[index] = future.result()
+            except CancelledError:
+                # 引擎退出时排队中的下载被丢弃
+                errors.append(JobCancelled("下载已取消"))
+            except Exception as e:
+                errors.append(e)
+            with lock:
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished:
+                if errors:
+                    batch.set_exception(errors[0])
+                else:
+                    batch.set_result(results)
+
+        for index, (url, path) in enumerate(items):
+            future = self._pool.submit(self._fetch, url, path, handle, on_saved)
+            future.add_done_callback(lambda f, i=index: _one_done(i, f))
+        return batch
+
+    def _timeout(self, handle: Optional[JobHandle]):
+        if handle is None or handle.deadline is None:
+            return DOWNLOAD_CONNECT_TIMEOUT, DOWNLOAD_READ_TIMEOUT
+        return handle.deadline.request_timeout(DOWNLOAD_READ_TIMEOUT, '下载')
+
+    def _fetch(self, url: str, path: str, handle: Optional[JobHandle],
+               on_saved: Optional[Callable[[str, str], None]]) -> Optional[str]:
+        """
+        下载单个文件；失败返回 None
+        先写入按 URL 命名的 .part（与目标路径同目录），校验长度（及服务端提供的 MD5）后原子重命名为目标路径。
+        已有部分时用 Range + If-Range 续传缺失部分；有新进度的重试不计入重试次数。
+        """
+        part_path = _part_path(url, path)
+        with self._parts_lock:
+            if part_path in self._active_parts:
+                part_path = path + PART_SUFFIX
+            self._active_parts.add(part_path)
+        try:
+            return self._fetch_to(url, path, part_path, handle, on_saved)
+        finally:
+            with self._parts_lock:
+                self._active_parts.discard(part_path)
+
+    def _fetch_to(self, url: str, path: str, part_path: str, handle: Optional[JobHandle],
+                  on_saved: Optional[Callable[[str, str], None]]) -> Optional[str]:
+        failures = 0
+        while True:
+            if handle is not None:
+                handle.check('下载')
+            before = _size(part_path)
+            try:
+                self._fetch_part(url, part_path, handle)
+                os.replace(part_path, path)
+                _remove(part_path + META_SUFFIX)
+                if on_saved is not None:
+                    return on_saved(url, path) or path
+                return path
+            except _HttpStatusError as e:
+                if not e.retryable:
+                    logger.error(f"下载失败，HTTP {e.status}: {url}")
+                    _remove_part(part_path)
+                    return None
+                error: Exception = e
+            except ChecksumMismatch as e:
+                # 内容损坏：丢弃已下载部分，从头下载
+                _remove_part(part_path)
+                error = e
+            except (requests.RequestException, OSError) as e:
+                error = e
+            if _size(part_path) <= before:
+                failures += 1
+            if failures > DOWNLOAD_RETRIES:
+                # 保留 .part，任务重试时可继续续传
+                logger.error(f"下载失败（已重试 {DOWNLOAD_RETRIES} 次）{url}: {error}")
+                return None
+            delay = min(BACKOFF_BASE * (2 ** max(failures - 1, 0)), BACKOFF_MAX)
+            logger.warning(f"下载中断（已下载 {_size(part_path)} 字节），{delay:.0f} 秒后续传: {error}")
+            # 退避等待可被取消或关闭打断
+            if handle is not None:
+                handle.sleep(delay, '下载')
+            elif self._closing.wait(delay):
+                return None
+
+    def _fetch_part(self, url: str, part_path: str, handle: Optional[JobHandle]):
+        """
+        请求并写入 .part 文件（已有部分时续传），完成后校验
+        续传以首次完整响应记录的 ETag / Last-Modified 作为 If-Range，文件已变化则服务端返回完整内容；
+        MD5 只取自完整（200）响应，206 响应的 Content-MD5 仅覆盖返回的片段
+        """
+        offset = _size(part_path)
+        meta = _read_meta(part_path) if offset > 0 else {}
+        if offset > 0 and not meta.get('validator'):
+            # 没有校验标识无法确认服务端内容未变：从头下载
+            _remove_part(part_path)
+            offset = 0
+        headers = {}
+        if offset > 0:
+            headers['Range'] = f"bytes={offset}-"
+            headers['If-Range'] = meta['validator']
+        with self.session.get(url, stream=True, timeout=self._timeout(handle), headers=headers) as response:
+            status = response.status_code
+            if status == 416 and offset > 0:
+                # 请求范围无效（通常是 .part 已完整或文件已变化）：从头下载
+                _remove_part(part_path)
+                raise requests.ConnectionError("续传范围无效，重新下载")
+            if status not in (200, 206):
+                raise _HttpStatusError(status)
+            if status == 206 and offset > 0:
+                total = _content_range_total(response.headers.get('Content-Range'))
+                mode = 'ab'
+            else:
+                # 完整响应（首次下载、服务端不支持续传或内容已变化）：从头写入并记录续传信息
+                total = _int_header(response.headers.get('Content-Length'))
+                mode = 'wb'
+                meta = {
+                    'validator': response.headers.get('ETag') or response.headers.get('Last-Modified'),
+                    'md5': _expected_md5(response.headers),
+                }
+                _write_meta(part_path, meta)
+            with open(part_path, mode, buffering=WRITE_BUFFER_SIZE) as f:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    if handle is not None:
+                        handle.check('下载')
+                    f.write(chunk)
+        size = _size(part_path)
+        if total is not None and size != total:
+            raise requests.ConnectionError(f"下载不完整：{size}/{total} 字节")
+        expected_md5 = meta.get('md5')
+        if expected_md5 and _file_md5(part_path) != expected_md5:
+            raise ChecksumMismatch(f"MD5 校验失败: {part_path}")
+
+    def shutdown(self):
+        self._closing.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _remove_part(part_path: str):
+    _remove(part_path)
+    _remove(part_path + META_SUFFIX)
+
+
+def _part_path(url: str, path: str) -> str:
+    """按 URL 命名的 .part 路径，同一 URL 重新下载时可续传"""
+    name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:24]
+    return os.path.join(os.path.dirname(path), name + os.path.splitext(path)[1] + PART_SUFFIX)
+
+
+def _read_meta(part_path: str) -> dict:
+    try:
+        with open(part_path + META_SUFFIX, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return meta if isinstance(meta, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(part_path: str, meta: dict):
+    with open(part_path + META_SUFFIX, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _int_header(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _content_range_total(value: Optional[str]) -> Optional[int]:
+    """解析 Content-Range: bytes 100-199/1000 中的总长度"""
+    m = re.match(r"bytes\s+\d+-\d+/(\d+)", value or '')
+    return int(m.group(1)) if m else None
+
+
+def _expected_md5(headers) -> Optional[str]:
+    """从 Content-MD5 / x-goog-hash / S3 单段上传的 ETag 中取 MD5（十六进制）"""
+    content_md5 = headers.get('Content-MD5')
+    if content_md5:
+        try:
+            return base64.b64decode(content_md5).hex()
+        except ValueError:
+            pass
+    for part in (headers.get('x-goog-hash') or '').split(','):
+        key, _, value = part.strip().partition('=')
+        if key == 'md5' and value:
+            try:
+                return base64.b64decode(value).hex()
+            except ValueError:
+                pass
+    # 只有确认来自 S3（带 x-amz-* 响应头）时，单段上传的 ETag 才是内容 MD5；
+    # 分段上传（含 "-"）、KMS 或客户提供密钥（SSE-C）加密时不是。其他 CDN/源站的 32 位 ETag 不作为 MD5
+    if not any(name.lower().startswith('x-amz-') for name in headers):
+        return None
+    if (headers.get('x-amz-server-side-encryption') == 'aws:kms'
+            or headers.get('x-amz-server-side-encryption-customer-algorithm')):
+        return None
+    etag = (headers.get('ETag') or '').strip()
+    if etag.startswith('W/'):
+        return None
+    etag = etag.strip('"').lower()
+    if re.fullmatch(r"[0-9a-f]{32}", etag):
+        return etag
+    return None
+
+
+def _file_md5(path: str) -> str:
+    h = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(WRITE_BUFFER_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+_manager: Optional[DownloadManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_download_manager() -> DownloadManager:
+    """进程内共享的下载管理器"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DownloadManager()
+        return _manager
+
+
+def shutdown_download_manager():
+    global _manager
+    with _manager_lock:
+        manager, _manager = _manager, None
+    if manager is not None:
+        manager.shutdown()
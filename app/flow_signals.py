@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浏览器生成流程的完成信号
+响应监听器在网络响应到达时直接触发事件（获取到任务ID / 生成完成 / 生成失败），
+流程协程等待这些事件，而不是定时轮询标志位。
+"""
+
+import asyncio
+from typing import Optional
+
+
+class GenerationSignals:
+    """单次生成的状态事件，需在流程所在的事件循环中使用"""
+
+    def __init__(self):
+        self._task_id_event = asyncio.Event()
+        self._done_event = asyncio.Event()
+        self.reset()
+
+    def reset(self):
+        """提交前重置（重新点击提交按钮时复用同一对象）"""
+        self.task_id: Optional[str] = None
+        self.error: Optional[str] = None
+        self._task_id_event.clear()
+        self._done_event.clear()
+
+    def set_task_id(self, task_id):
+        self.task_id = task_id
+        self._task_id_event.set()
+
+    def complete(self):
+        """生成完成（结果数据由流程自行保存）"""
+        self._done_event.set()
+
+    def fail(self, error: str):
+        """生成失败；同时唤醒等待任务ID的协程"""
+        self.error = error
+        self._done_event.set()
+        self._task_id_event.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done_event.is_set()
+
+    @property
+    def completed(self) -> bool:
+        """已完成且未失败"""
+        return self.done and self.error is None
+
+    async def wait_task_id(self, timeout: float) -> bool:
+        """等待任务ID，超时或失败返回 False"""
+        await _wait_event(self._task_id_event, timeout)
+        return self.task_id is not None and self.error is None
+
+    async def wait_done(self, timeout: float) -> bool:
+        """等待完成或失败，超时返回 False"""
+        return await _wait_event(self._done_event, timeout)
+
+
+async def _wait_event(event: asyncio.Event, timeout: float) -> bool:
+    if event.is_set():
+        return True
+    try:
+        await asyncio.wait_for(event.wait(), max(timeout, 0))
+        return True
+    except asyncio.TimeoutError:
+        return False
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+商品文件夹扫描
+导入目录结构：<根目录>/images/<SKU>/*.jpg 与 <根目录>/items/<SKU>.json。
+- images/ 与 items/ 各用 os.scandir 遍历一次（不再对每个 SKU 执行六次 glob）
+- 各 SKU 子文件夹在线程池中并发扫描，标题 JSON 只在存在时读取
+- 结果按目录顺序分块回调，界面可边扫描边显示
+- 每个 SKU 文件夹的修改时间、图片列表与标题记入导入索引（数据库），
+  文件夹与 JSON 的修改时间都未变化时直接使用索引，只重新扫描有变化的文件夹
+- 每批行附上按 SKU 登记的已生成结果（模特图、视频），界面线程无需再查询
+"""
+
+import os
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from database import logger, get_import_entries, save_import_entries, delete_import_entries, get_output_assets
+from row_store import MODEL_SLOTS
+
+# 支持的图片扩展名（按优先级排列：默认主图取优先级最高的扩展名中的第一张）
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
+
+# 扫描线程数
+SCAN_WORKERS = 8
+
+# 每次回调的行数
+SCAN_CHUNK_SIZE = 200
+
+Row = Dict[str, Any]
+
+
+def list_images(folder_path: str) -> List[str]:
+    """列出文件夹中的图片，按扩展名优先级、文件名排序"""
+    images = []
+    try:
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                ext = os.path.splitext(entry.name)[1].lower()
+                if ext in IMAGE_EXTENSIONS and entry.is_file():
+                    images.append((IMAGE_EXTENSIONS.index(ext), entry.name, entry.path))
+    except OSError as e:
+        logger.warning(f"读取文件夹失败 {folder_path}: {e}")
+        return []
+    return [path for _, _, path in sorted(images)]
+
+
+def read_title(json_file: str, default: str) -> str:
+    """从 items/<SKU>.json 中读取标题（title 或 name），失败时返回默认值"""
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return data.get('title', data.get('name', default))
+    except Exception as e:
+        logger.warning(f"读取 JSON 文件失败 {json_file}: {e}")
+    return default
+
+
+def _item_names(items_folder: str) -> Set[str]:
+    """items/ 下存在的 JSON 文件名集合"""
+    try:
+        with os.scandir(items_folder) as entries:
+            return {entry.name for entry in entries if entry.name.endswith('.json')}
+    except OSError:
+        return set()
+
+
+def _sku_dirs(images_folder: str) -> List[str]:
+    with os.scandir(images_folder) as entries:
+        return [entry.name for entry in entries if entry.is_dir()]
+
+
+def _mtime_ns(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def scan_sku(images_folder: str, items_folder: str, sku: str, item_names: Set[str],
+             stamp: Optional[int] = None, index: Optional[Dict[str, Dict[str, Any]]] = None,
+             changed: Optional[List[Dict[str, Any]]] = None) -> Optional[Row]:
+    """
+    扫描单个 SKU 子文件夹；没有图片时返回 None
+    :param index: 导入索引 {文件夹路径: 索引项}；修改时间未变化时直接使用索引项
+    :param changed: 重新扫描后的索引项追加到该列表
+    """
+    folder_path = os.path.join(images_folder, sku)
+    json_name = f"{sku}.json"
+    json_file = os.path.join(items_folder, json_name)
+    # 先取修改时间再列目录：两者之间发生的变化会在下次导入时被发现
+    dir_mtime = _mtime_ns(folder_path)
+    json_mtime = _mtime_ns(json_file) if json_name in item_names else 0
+    entry = index.get(folder_path) if index else None
+    if entry is not None and entry['dir_mtime_ns'] == dir_mtime and entry['json_mtime_ns'] == json_mtime:
+        title, main_image = entry['title'], entry['main_image']
+    else:
+        images = list_images(folder_path)
+        title = read_title(json_file, sku) if json_mtime else sku
+        main_image = images[0] if images else None
+        if changed is not None:
+            changed.append({
+                'folder_path': folder_path, 'root': os.path.dirname(images_folder),
+                'dir_mtime_ns': dir_mtime, 'json_mtime_ns': json_mtime,
+                'images': json.dumps([os.path.basename(p) for p in images], ensure_ascii=False),
+                'title': title, 'main_image': main_image
+            })
+    if not main_image:
+        return None
+    return {
+        'name': title,
+        'main_image': main_image,
+        'folder_path': folder_path,
+        'uniqueId': f"{sku}_{stamp if stamp is not None else int(time.time())}",  # 生成唯一ID
+        'selected_model_image': None  # 当前选中的模特图（未选择/未生成时为None）
+    }
+
+
+def folder_images(folder_paths: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    获取各 SKU 文件夹中的图片（按扩展名优先级、文件名排序）
+    文件夹修改时间与导入索引一致时直接使用索引，否则重新列目录并更新索引
+    """
+    paths = list(folder_paths)
+    entries = get_import_entries(folder_paths=paths)
+    result: Dict[str, List[str]] = {}
+    changed = []
+    for path in paths:
+        dir_mtime = _mtime_ns(path)
+        entry = entries.get(path)
+        if entry is not None and entry['dir_mtime_ns'] == dir_mtime:
+            result[path] = [os.path.join(path, name) for name in json.loads(entry['images'])]
+            continue
+        images = result[path] = list_images(path)
+        if entry is not None:
+            entry.update(dir_mtime_ns=dir_mtime, main_image=images[0] if images else None,
+                         images=json.dumps([os.path.basename(p) for p in images], ensure_ascii=False))
+            changed.append(entry)
+    save_import_entries(changed)
+    return result
+
+
+def attach_outputs(rows: List[Row]):
+    """
+    为一批行附上已生成的模特图（最近的 MODEL_SLOTS 张，model_images）与视频（最新一个，video_path）
+    按 SKU 一次查询，只取文件仍存在的
+    """
+    by_sku: Dict[str, List[Row]] = {}
+    for row in rows:
+        if row.get('folder_path'):
+            by_sku.setdefault(os.path.basename(row['folder_path']), []).append(row)
+    if not by_sku:
+        return
+    for asset in get_output_assets(skus=list(by_sku)):
+        path = asset['path']
+        if not os.path.exists(path):
+            continue
+        for row in by_sku.get(asset['sku'], ()):
+            if asset['kind'] == 'video':
+                row['video_path'] = path
+            else:
+                images = row.setdefault('model_images', [])
+                if path not in images:
+                    images.append(path)
+                    del images[:-MODEL_SLOTS]
+
+
+def rescan_skus(folder_path: str, skus: Iterable[str]) -> Dict[str, Optional[Row]]:
+    """
+    重新检查指定的 SKU 子文件夹（文件夹监听发现变化时使用），并更新导入索引
+    :return: {SKU: 行}，没有图片的 SKU 对应 None
+    """
+    folder_path = os.path.abspath(folder_path)
+    images_folder = os.path.join(folder_path, "images")
+    items_folder = os.path.join(folder_path, "items")
+    skus = list(skus)
+    index = get_import_entries(folder_paths=[os.path.join(images_folder, sku) for sku in skus])
+    item_names = {f"{sku}.json" for sku in skus if os.path.isfile(os.path.join(items_folder, f"{sku}.json"))}
+    changed: List[Dict[str, Any]] = []
+    stamp = int(time.time())
+    rows = {sku: scan_sku(images_folder, items_folder, sku, item_names, stamp, index, changed) for sku in skus}
+    save_import_entries(changed)
+    attach_outputs([row for row in rows.values() if row is not None])
+    return rows
+
+
+def _scan_in_order(pool: ThreadPoolExecutor, skus: List[str], scan: Callable[[str], Optional[Row]],
+                   window: int) -> Iterator[Optional[Row]]:
+    """按目录顺序产出扫描结果；同时在途的任务不超过 window 个，首批结果可以尽早返回"""
+    pending = deque()
+    names = iter(skus)
+    for sku in names:
+        pending.append(pool.submit(scan, sku))
+        if len(pending) >= window:
+            break
+    while pending:
+        row = pending.popleft().result()
+        sku = next(names, None)
+        if sku is not None:
+            pending.append(pool.submit(scan, sku))
+        yield row
+
+
+def _chunks(rows: Iterable[Optional[Row]], size: int) -> Iterator[List[Row]]:
+    chunk: List[Row] = []
+    for row in rows:
+        if row is None:
+            continue
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def scan_product_folder(folder_path: str, on_chunk: Optional[Callable[[List[Row]], None]] = None,
+                        chunk_size: int = SCAN_CHUNK_SIZE, max_workers: int = SCAN_WORKERS,
+                        use_index: bool = True) -> List[Row]:
+    """
+    扫描商品根目录
+    :param on_chunk: 每扫描到 chunk_size 行回调一次（在调用线程中，按目录顺序）
+    :param use_index: 使用并更新导入索引
+    :return: 全部行；目录结构不符合要求时返回空列表
+    """
+    folder_path = os.path.abspath(folder_path)
+    images_folder = os.path.join(folder_path, "images")
+    items_folder = os.path.join(folder_path, "items")
+    if not os.path.isdir(folder_path):
+        logger.error(f"文件夹路径不存在或不是文件夹: {folder_path}")
+        return []
+    if not os.path.isdir(images_folder):
+        logger.error(f"未找到 images 文件夹: {images_folder}")
+        return []
+    if not os.path.isdir(items_folder):
+        logger.error(f"未找到 items 文件夹: {items_folder}")
+        return []
+
+    started = time.perf_counter()
+    try:
+        skus = _sku_dirs(images_folder)
+    except OSError as e:
+        logger.error(f"遍历 images 文件夹时出错: {e}")
+        return []
+    item_names = _item_names(items_folder)
+    stamp = int(time.time())
+    index = get_import_entries(root=folder_path) if use_index else None
+    changed: Optional[List[Dict[str, Any]]] = [] if use_index else None
+
+    rows: List[Row] = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='folder-scan') as pool:
+        scanned = _scan_in_order(
+            pool, skus, lambda sku: scan_sku(images_folder, items_folder, sku, item_names, stamp, index, changed),
+            window=max(chunk_size, max_workers * 4)
+        )
+        for chunk in _chunks(scanned, chunk_size):
+            attach_outputs(chunk)
+            rows.extend(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+    rescanned = len(skus)
+    if index is not None and changed is not None:
+        save_import_entries(changed)
+        rescanned = len(changed)
+        removed = set(index) - {os.path.join(images_folder, sku) for sku in skus}
+        if removed:
+            delete_import_entries(removed)
+    logger.info(f"扫描完成: {folder_path}，{len(skus)} 个子文件夹（重新扫描 {rescanned} 个），"
+                f"{len(rows)} 个有效商品，耗时 {time.perf_counter() - started:.2f} 秒")
+    return rows
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+导入目录监听
+采集程序会不断向导入目录写入新的 SKU 文件夹，本模块在后台线程中发现新增或变化的
+images/<SKU>/ 与 items/<SKU>.json，只重新扫描这些 SKU（不重扫整个目录）并回调：
+- Linux 上使用 inotify（通过 libc，无需额外依赖），其他平台或监听数超出系统上限时改为定时轮询
+- SKU 在一段时间内（SETTLE_SECONDS）没有新的变化后才上报，避免采集程序写到一半就被导入
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from database import logger
+from folder_scanner import Row, rescan_skus
+
+try:
+    import ctypes
+    import ctypes.util
+    if not sys.platform.startswith('linux'):
+        raise ImportError("inotify 仅在 Linux 上可用")
+    _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    _libc.inotify_init1.argtypes = [ctypes.c_int]
+    _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    HAS_INOTIFY = True
+except (ImportError, OSError, AttributeError):
+    HAS_INOTIFY = False
+
+# SKU 无新变化多久后上报（秒）
+SETTLE_SECONDS = 2.0
+
+# 默认轮询间隔（秒）
+DEFAULT_POLL_INTERVAL = 3.0
+
+# inotify 事件掩码
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_SKU_MASK = IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE | IN_DELETE | IN_MOVED_FROM
+_EVENT_HEADER = struct.Struct('iIII')
+
+# on_rows(新增行, 变化行)，在监听线程中调用
+OnRows = Callable[[List[Row], List[Row]], None]
+
+
+class _Inotify:
+    """inotify 文件描述符的最小封装"""
+
+    def __init__(self):
+        self.fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add(self, path: str, mask: int) -> int:
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"{os.strerror(err)}: {path}")
+        return wd
+
+    def read(self) -> List[Tuple[int, int, str]]:
+        """读取全部待处理事件 [(wd, mask, 文件名), ...]"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """监听一个导入根目录（含 images/ 与 items/）"""
+
+    def __init__(self, folder_path: str, known_skus: Iterable[str], on_rows: OnRows,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, settle: float = SETTLE_SECONDS):
+        self.root = os.path.abspath(folder_path)
+        self.images_folder = os.path.join(self.root, "images")
+        self.items_folder = os.path.join(self.root, "items")
+        self.poll_interval = max(poll_interval, 0.5)
+        self.settle = settle
+        self.mode: Optional[str] = None  # inotify / polling
+        self._known = set(known_skus)
+        self._on_rows = on_rows
+        self._dirty: Dict[str, float] = {}  # SKU -> 最近一次变化时间
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='folder-watch', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 3.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            if HAS_INOTIFY:
+                try:
+                    self._watch_inotify()
+                    return
+                except OSError as e:
+                    logger.warning(f"inotify 监听不可用，改为轮询: {e}")
+            self._watch_polling()
+        except Exception as e:
+            logger.error(f"文件夹监听异常退出: {e}")
+        finally:
+            logger.info(f"停止监听文件夹: {self.root}")
+
+    def _mark(self, sku: str, now: float):
+        if sku and not sku.startswith('.'):
+            self._dirty[sku] = now
+
+    def _mark_unknown(self, skus: Iterable[str], now: float):
+        """开始监听前已出现但尚未显示的 SKU"""
+        for sku in skus:
+            if sku not in self._known:
+                self._mark(sku, now)
+
+    def _flush(self, now: float):
+        """重新扫描已稳定的 SKU 并上报"""
+        ready = sorted(sku for sku, changed_at in self._dirty.items() if now - changed_at >= self.settle)
+        if not ready:
+            return
+        for sku in ready:
+            del self._dirty[sku]
+        new_rows: List[Row] = []
+        changed_rows: List[Row] = []
+        for sku, row in rescan_skus(self.root, ready).items():
+            if row is None:
+                continue
+            if sku in self._known:
+                changed_rows.append(row)
+            else:
+                self._known.add(sku)
+                new_rows.append(row)
+        if new_rows or changed_rows:
+            logger.info(f"监听到文件夹变化: 新增 {len(new_rows)} 个，更新 {len(changed_rows)} 个")
+            self._on_rows(new_rows, changed_rows)
+
+    def _sku_dirs(self) -> List[str]:
+        try:
+            with os.scandir(self.images_folder) as entries:
+                return [entry.name for entry in entries if entry.is_dir()]
+        except OSError:
+            return []
+
+    # ---- inotify ----
+
+    def _watch_inotify(self):
+        ino = _Inotify()
+        try:
+            images_wd = ino.add(self.images_folder, IN_CREATE | IN_MOVED_TO)
+            items_wd = ino.add(self.items_folder, IN_CLOSE_WRITE | IN_MOVED_TO)
+            sku_wds: Dict[int, str] = {}
+            skus = self._sku_dirs()
+            for sku in skus:
+                # 监听数超出 fs.inotify.max_user_watches 时抛出 ENOSPC，由调用方改为轮询
+                sku_wds[ino.add(os.path.join(self.images_folder, sku), _SKU_MASK)] = sku
+            self.mode = 'inotify'
+            logger.info(f"开始监听文件夹（inotify，{len(sku_wds)} 个子文件夹）: {self.root}")
+            self._mark_unknown(skus, time.monotonic())
+
+            while not self._stop.is_set():
+                readable, _, _ = select.select([ino.fd], [], [], self.settle / 2)
+                now = time.monotonic()
+                if readable:
+                    for wd, mask, name in ino.read():
+                        if mask & IN_Q_OVERFLOW:
+                            # 事件队列溢出：全部 SKU 都可能有变化（有导入索引，重新检查很快）
+                            for sku in self._sku_dirs():
+                                self._mark(sku, now)
+                        elif wd == images_wd:
+                            if mask & IN_ISDIR:
+                                try:
+                                    sku_wds[ino.add(os.path.join(self.images_folder, name), _SKU_MASK)] = name
+                                except OSError as e:
+                                    if e.errno != errno.ENOENT:
+                                        logger.warning(f"无法监听子文件夹 {name}: {e}")
+                                self._mark(name, now)
+                        elif wd == items_wd:
+                            if name.endswith('.json'):
+                                self._mark(name[:-len('.json')], now)
+                        elif mask & IN_IGNORED:
+                            sku_wds.pop(wd, None)
+                        elif wd in sku_wds:
+                            self._mark(sku_wds[wd], now)
+                self._flush(now)
+        finally:
+            ino.close()
+
+    # ---- 轮询 ----
+
+    def _signatures(self) -> Dict[str, Tuple[int, int]]:
+        """各 SKU 的 (文件夹修改时间, JSON 修改时间)"""
+        json_mtimes: Dict[str, int] = {}
+        try:
+            with os.scandir(self.items_folder) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.json'):
+                        json_mtimes[entry.name[:-len('.json')]] = entry.stat().st_mtime_ns
+        except OSError:
+            pass
+        signatures: Dict[str, Tuple[int, int]] = {}
+        try:
+            with os.scandir(self.images_folder) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        signatures[entry.name] = (entry.stat().st_mtime_ns, json_mtimes.get(entry.name, 0))
+        except OSError as e:
+            logger.warning(f"轮询文件夹失败: {e}")
+        return signatures
+
+    def _watch_polling(self):
+        self.mode = 'polling'
+        last = self._signatures()
+        logger.info(f"开始监听文件夹（每 {self.poll_interval:g} 秒轮询，{len(last)} 个子文件夹）: {self.root}")
+        self._mark_unknown(last, time.monotonic())
+        while not self._stop.wait(self.poll_interval):
+            current = self._signatures()
+            now = time.monotonic()
+            for sku, signature in current.items():
+                if last.get(sku) != signature:
+                    self._mark(sku, now)
+            last = current
+            self._flush(now)
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+生成引擎
+在独立进程中运行生成任务（场景、浏览器、数据库记录；下载由下载管理器在后台完成），
+通过本地套接字与 Qt 前端交换紧凑的二进制消息：
+- 前端 -> 引擎：命令（submit / prefetch_scenes / cancel / cancel_row / cancel_all / shutdown）
+- 引擎 -> 前端：事件（row_state / scene_ready / image_saved / video_saved / accounts_changed）
+前端只渲染事件中的状态差量，不再承担任何阻塞工作。
+退出时取消全部任务、把已提交到平台的 task_id 写入检查点，并在数秒内结束。
+超出时间预算仍未结束的任务由回收线程强制取消。
+"""
+
+import os
+import json
+import atexit
+import secrets
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from database import logger
+from job_control import (
+    JobHandle, JobRegistry, JobCancelled, save_task_checkpoint, load_task_checkpoint
+)
+from deadline import Deadline, DeadlineExceeded
+from asset_cache import get_asset_cache
+
+# msgpack 为可选依赖，缺失时回退到 JSON 编码
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+# 消息首字节标记编码方式，保证两端编码不一致时仍可解析
+_CODEC_MSGPACK = b'M'
+_CODEC_JSON = b'J'
+
+# 等待引擎子进程连接的超时时间（秒）
+ENGINE_CONNECT_TIMEOUT = 20
+
+# 退出时等待任务响应取消的宽限时间（秒），超时后直接结束引擎进程
+ENGINE_SHUTDOWN_GRACE = 5
+
+# 回收线程的巡检间隔（秒）
+REAPER_INTERVAL = 5
+
+# 任务超出预算后允许其自行收尾的宽限时间（秒），之后强制取消
+OVERRUN_GRACE = 15
+
+# 场景预取的并发请求数（与生成任务线程池分开，不占用浏览器并发）
+SCENE_PREFETCH_WORKERS = 4
+
+
+def pack_message(message: Dict[str, Any]) -> bytes:
+    """将消息编码为字节串"""
+    if HAS_MSGPACK:
+        return _CODEC_MSGPACK + msgpack.packb(message, use_bin_type=True)
+    return _CODEC_JSON + json.dumps(message, ensure_ascii=False).encode('utf-8')
+
+
+def unpack_message(data: bytes) -> Dict[str, Any]:
+    """将字节串解码为消息"""
+    codec, body = data[:1], data[1:]
+    if codec == _CODEC_MSGPACK:
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body.decode('utf-8'))
+
+
+class GenerationEngine:
+    """引擎服务端：接收命令、在线程池中执行任务并推送事件"""
+
+    def __init__(self, conn, max_threads: int):
+        self.conn = conn
+        self.max_threads = max_threads
+        self._send_lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=max_threads)
+        self.prefetch_pool = ThreadPoolExecutor(max_workers=SCENE_PREFETCH_WORKERS, thread_name_prefix='scene-prefetch')
+        self.registry = JobRegistry()
+        self._stopped = threading.Event()
+        self._reaper = threading.Thread(target=self._reap_overrun_jobs, name='job-reaper', daemon=True)
+
+    def emit(self, event: str, **fields):
+        """向前端推送事件（线程安全）"""
+        message = {'event': event}
+        message.update(fields)
+        try:
+            with self._send_lock:
+                self.conn.send_bytes(pack_message(message))
+        except (OSError, EOFError) as e:
+            logger.warning(f"推送引擎事件失败: {e}")
+
+    def serve_forever(self) -> bool:
+        """
+        循环读取命令，直到收到 shutdown 或连接断开
+        :return: 所有任务是否在宽限时间内结束
+        """
+        logger.info(f"生成引擎已启动，最大线程数: {self.max_threads}")
+        pending = load_task_checkpoint()
+        if pending:
+            logger.info(f"上次退出时有 {len(pending)} 个已提交任务，记录见检查点文件")
+        self._reaper.start()
+        while True:
+            try:
+                command = unpack_message(self.conn.recv_bytes())
+            except (OSError, EOFError):
+                logger.warning("前端连接已断开，引擎退出")
+                break
+            name = command.get('command')
+            if name == 'submit':
+                self._submit(command.get('job') or {})
+            elif name == 'prefetch_scenes':
+                self._prefetch_scenes(command.get('items') or [])
+            elif name == 'cancel':
+                self.registry.cancel(command.get('job_id'))
+            elif name == 'cancel_row':
+                row_id = command.get('row_id')
+                self.registry.cancel_where(lambda h: h.row_id == row_id)
+            elif name == 'cancel_all':
+                self.registry.cancel_all()
+            elif name == 'shutdown':
+                break
+            else:
+                logger.warning(f"未知的引擎命令: {name}")
+        drained = self._shutdown()
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        logger.info("生成引擎已退出")
+        return drained
+
+    def _reap_overrun_jobs(self):
+        """回收超出时间预算且未能自行结束的任务（如卡在阻塞调用中）"""
+        while not self._stopped.wait(REAPER_INTERVAL):
+            for handle in self.registry.handles():
+                deadline = handle.deadline
+                if deadline is None or handle.cancelled:
+                    continue
+                if deadline.remaining() < -OVERRUN_GRACE:
+                    logger.warning(f"任务超出时间预算 {deadline.elapsed():.0f} 秒仍未结束，强制回收: {handle.job_id}")
+                    handle.cancel('timeout')
+
+    def _shutdown(self) -> bool:
+        """取消全部任务并写入检查点，最多等待 ENGINE_SHUTDOWN_GRACE 秒"""
+        self._stopped.set()
+        handles = self.registry.cancel_all()
+        if handles:
+            logger.info(f"正在取消 {len(handles)} 个未完成任务")
+        # 先写检查点：即使随后强制退出，已提交的 task_id 也不会丢失
+        save_task_checkpoint(handles)
+        # 排队中的任务已被标记取消，开始执行时会立即退出并从登记表移除
+        self.pool.shutdown(wait=False)
+        self.prefetch_pool.shutdown(wait=False, cancel_futures=True)
+        from image_preprocess import shutdown_preprocessor
+        shutdown_preprocessor()
+        from download_manager import shutdown_download_manager
+        shutdown_download_manager()
+        get_asset_cache().log_stats()
+        from llm_client import close_llm_client
+        close_llm_client()
+        drained = self.registry.wait_empty(ENGINE_SHUTDOWN_GRACE)
+        if not drained:
+            logger.warning(f"仍有任务未在 {ENGINE_SHUTDOWN_GRACE} 秒内结束，将强制退出")
+        return drained
+
+    def _submit(self, job: Dict[str, Any]):
+        # 延迟导入：仅在引擎中加载 Playwright 等重量级依赖
+        from generation_jobs import JOB_RUNNERS, job_budget_seconds, prefetch_derivatives
+        runner = JOB_RUNNERS.get(job.get('kind'))
+        if runner is None:
+            logger.error(f"未知的任务类型: {job.get('kind')}")
+            return
+        handle = JobHandle(job)
+        self.registry.add(handle)
+        try:
+            prefetch_derivatives(job)
+        except Exception as e:
+            logger.warning(f"预生成派生图失败: {e}")
+        self.pool.submit(self._run_job, runner, job, handle, job_budget_seconds())
+
+    def _prefetch_scenes(self, items):
+        """按批量请求大小切分后并发预取场景"""
+        from generation_jobs import prefetch_scenes
+        from jimeng_utils import SCENE_BATCH_MAX_ITEMS
+        items = [item for item in items if item.get('image_path')]
+        logger.info(f"开始预取 {len(items)} 行的场景")
+        for start in range(0, len(items), SCENE_BATCH_MAX_ITEMS):
+            self.prefetch_pool.submit(self._run_prefetch, prefetch_scenes, items[start:start + SCENE_BATCH_MAX_ITEMS])
+
+    def _run_prefetch(self, prefetch, chunk):
+        if self._stopped.is_set():
+            return
+        try:
+            prefetch(chunk, self.emit)
+        except Exception as e:
+            logger.warning(f"场景预取失败: {e}")
+
+    def _run_job(self, runner, job: Dict[str, Any], handle: JobHandle, budget: float):
+        pending = None
+        try:
+            handle.check()
+            handle.deadline = Deadline(budget)
+            pending = runner(job, self.emit, handle)
+        except Exception as e:
+            self._report_error(job, handle, e)
+        finally:
+            if pending is None:
+                self.registry.remove(handle.job_id)
+        if pending is not None:
+            # 下载在后台进行：任务保留在登记表中（仍可取消），结束后再移除
+            pending.add_done_callback(lambda f: self._finish_pending(job, handle, f))
+
+    def _finish_pending(self, job: Dict[str, Any], handle: JobHandle, future):
+        try:
+            error = future.exception()
+        except CancelledError:
+            error = JobCancelled(f"任务已取消: {job.get('job_id')}")
+        if error is not None:
+            self._report_error(job, handle, error)
+        self.registry.remove(handle.job_id)
+
+    def _report_error(self, job: Dict[str, Any], handle: JobHandle, error: Exception):
+        if isinstance(error, JobCancelled):
+            if handle.cancel_reason == 'timeout':
+                self._emit_overrun(job, handle)
+            else:
+                logger.info(f"任务已取消: {job.get('job_id')}")
+                self.emit('row_state', job_id=job.get('job_id'), row_id=job.get('row_id'),
+                          kind=job.get('kind'), status='cancelled')
+        elif isinstance(error, DeadlineExceeded):
+            logger.warning(f"{error}: {job.get('job_id')}")
+            self._emit_overrun(job, handle)
+        else:
+            logger.error(f"任务执行异常 {job.get('job_id')}: {error}")
+            self.emit('row_state', job_id=job.get('job_id'), row_id=job.get('row_id'),
+                      kind=job.get('kind'), status='failed', error=str(error))
+
+    def _emit_overrun(self, job: Dict[str, Any], handle: JobHandle):
+        budget = handle.deadline.budget if handle.deadline else 0
+        self.emit('accounts_changed')
+        self.emit('row_state', job_id=job.get('job_id'), row_id=job.get('row_id'),
+                  kind=job.get('kind'), status='failed',
+                  error=f"任务超出时间预算（{budget / 60:.0f} 分钟）")
+
+
+def run_engine(address, authkey: bytes, max_threads: int, init_db: bool = True):
+    """
+    引擎进程入口
+    :param address: 前端监听的本地套接字地址
+    :param authkey: 连接认证密钥
+    :param max_threads: 并发任务数
+    :param init_db: 是否在当前进程初始化数据库（进程内回退模式下前端已初始化）
+    """
+    if init_db:
+        from database import init_database
+        init_database()
+    conn = Client(address, authkey=authkey)
+    drained = GenerationEngine(conn, max_threads).serve_forever()
+    if not drained and multiprocessing.parent_process() is not None:
+        # 子进程中仍有卡住的浏览器线程：不等待线程池，直接结束进程
+        os._exit(0)
+
+
+class EngineClient:
+    """前端侧的引擎连接：负责启动引擎、发送命令与接收事件"""
+
+    def __init__(self, max_threads: int):
+        self.max_threads = max_threads
+        self.process: Optional[multiprocessing.Process] = None
+        self._thread: Optional[threading.Thread] = None
+        self._conn = None
+        self._send_lock = threading.Lock()
+
+    def start(self) -> bool:
+        """启动引擎子进程；子进程不可用时回退为进程内线程运行"""
+        authkey = secrets.token_bytes(16)
+        listener = Listener(('127.0.0.1', 0), authkey=authkey)
+        try:
+            try:
+                # 使用 spawn，避免在已创建 Qt 对象的进程中 fork
+                ctx = multiprocessing.get_context('spawn')
+                self.process = ctx.Process(
+                    target=run_engine,
+                    args=(listener.address, authkey, self.max_threads),
+                    name='generation-engine',
+                    # 非守护进程：引擎内的图片预处理需要创建自己的进程池
+                    daemon=False
+                )
+                self.process.start()
+                # 解释器退出时（先于 multiprocessing 等待子进程）通知引擎退出；前端断开时引擎也会自行退出
+                atexit.register(self.shutdown)
+                self._conn = self._accept(listener)
+            except Exception as e:
+                logger.error(f"启动引擎子进程失败: {e}")
+                self._conn = None
+
+            if self._conn is None:
+                if self.process is not None and self.process.is_alive():
+                    self.process.terminate()
+                self.process = None
+                logger.warning("引擎子进程不可用，回退为进程内运行")
+                self._thread = threading.Thread(
+                    target=run_engine,
+                    args=(listener.address, authkey, self.max_threads, False),
+                    name='generation-engine',
+                    daemon=True
+                )
+                self._thread.start()
+                self._conn = self._accept(listener)
+        finally:
+            listener.close()
+
+        if self._conn is None:
+            logger.error("生成引擎启动失败")
+            return False
+        logger.info(f"生成引擎已连接（{'子进程' if self.process else '进程内'}）")
+        return True
+
+    @staticmethod
+    def _accept(listener):
+        """在辅助线程中等待连接，避免子进程启动失败时永久阻塞"""
+        result = {}
+
+        def _do_accept():
+            try:
+                result['conn'] = listener.accept()
+            except Exception as e:
+                result['error'] = e
+
+        t = threading.Thread(target=_do_accept, daemon=True)
+        t.start()
+        t.join(ENGINE_CONNECT_TIMEOUT)
+        if 'error' in result:
+            logger.error(f"等待引擎连接失败: {result['error']}")
+        return result.get('conn')
+
+    def send(self, command: str, **fields) -> bool:
+        """发送命令到引擎"""
+        if self._conn is None:
+            return False
+        message = {'command': command}
+        message.update(fields)
+        try:
+            with self._send_lock:
+                self._conn.send_bytes(pack_message(message))
+            return True
+        except (OSError, EOFError) as e:
+            logger.error(f"发送引擎命令失败: {e}")
+            return False
+
+    def submit(self, job: Dict[str, Any]) -> bool:
+        """提交生成任务"""
+        return self.send('submit', job=job)
+
+    def prefetch_scenes(self, items) -> bool:
+        """预取一批行的场景：items 为 [{'row_id', 'image_path', 'title'}, ...]"""
+        return self.send('prefetch_scenes', items=items)
+
+    def cancel(self, job_id: str) -> bool:
+        """取消指定任务"""
+        return self.send('cancel', job_id=job_id)
+
+    def cancel_row(self, row_id: str) -> bool:
+        """取消某一行的全部任务"""
+        return self.send('cancel_row', row_id=row_id)
+
+    def cancel_all(self) -> bool:
+        """取消全部任务"""
+        return self.send('cancel_all')
+
+    def recv_event(self) -> Optional[Dict[str, Any]]:
+        """阻塞读取下一条事件；连接关闭时返回 None"""
+        if self._conn is None:
+            return None
+        try:
+            return unpack_message(self._conn.recv_bytes())
+        except (OSError, EOFError):
+            return None
+
+    def shutdown(self, timeout: float = ENGINE_SHUTDOWN_GRACE + 3):
+        """通知引擎退出并等待其结束，超时后强制终止子进程"""
+        self.send('shutdown')
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                logger.warning("引擎未在限定时间内退出，强制终止")
+                self.process.terminate()
+                self.process.join(1)
+        elif self._thread is not None:
+            # 进程内回退模式：守护线程随前端退出
+            self._thread.join(timeout)
+        try:
+            if self._conn is not None:
+                self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+生成任务流水线
+在生成引擎中执行：选择账号 -> 图片预处理 -> 生成场景 -> 浏览器生成 -> 记录使用次数 -> 下载结果，
+失败时自动重试（最多三次），并通过 emit 回调把状态差量推送给前端。
+下载交给下载管理器在后台完成，生成线程拿到结果 URL 后即可执行下一个任务。
+每个任务的全部步骤共享一个时间预算（job_timeout 配置，分钟），预算耗尽后不再重试。
+"""
+
+import os
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List, Optional
+
+from database import logger, get_config, add_record
+from accounts_utils import get_image_account, get_video_account
+from jimeng_image_util import generate_image
+from jimeng_utils import generate_scene, generate_scenes, merge_prompt_with_scene
+from jimeng_video_util import generate_video as generate_video_async
+from job_control import JobHandle, JobCancelled
+from deadline import DeadlineExceeded
+from image_preprocess import get_preprocessor
+from download_manager import get_download_manager
+from output_store import get_output_store
+
+# 单个任务失败后的最大重试次数
+MAX_RETRIES = 3
+
+# 单个任务（含重试与下载）的默认时间预算（分钟）
+DEFAULT_JOB_TIMEOUT_MINUTES = 20
+
+# 等待派生图生成的上限（秒），超时则使用原图
+PREPROCESS_TIMEOUT = 60
+
+Emit = Callable[..., None]
+
+
+def job_budget_seconds() -> float:
+    """读取单个任务的时间预算（秒）"""
+    try:
+        minutes = float(get_config('job_timeout', str(DEFAULT_JOB_TIMEOUT_MINUTES)))
+    except (ValueError, TypeError):
+        minutes = DEFAULT_JOB_TIMEOUT_MINUTES
+    if minutes <= 0:
+        minutes = DEFAULT_JOB_TIMEOUT_MINUTES
+    return minutes * 60
+
+
+def upload_target() -> str:
+    """上传派生图类型：开启 image_letterbox 时补边为 9:16"""
+    return 'upload_9x16' if str(get_config('image_letterbox', '0')).strip() == '1' else 'upload'
+
+
+def prefetch_derivatives(job: Dict[str, Any]):
+    """任务排队时提前在进程池中生成派生图"""
+    targets = ('llm', upload_target()) if job.get('kind') == 'image' else (upload_target(),)
+    get_preprocessor().submit(job.get('image_path'), targets)
+
+
+def prefetch_scenes(items: List[Dict[str, Any]], emit: Emit):
+    """
+    场景预取：导入文件夹后为一批行生成场景，逐行推送 scene_ready 事件
+    :param items: [{'row_id', 'image_path', 'title'}, ...]（一次批量请求的商品数）
+    """
+    preprocessor = get_preprocessor()
+    preprocessor.prepare_batch((item.get('image_path') for item in items), ('llm',))
+    scene_inputs = [
+        (preprocessor.prepare(item['image_path'], 'llm', timeout=PREPROCESS_TIMEOUT), str(item.get('title', '')))
+        for item in items
+    ]
+    scenes = generate_scenes(scene_inputs, default=None)
+    for item, scene in zip(items, scenes):
+        if not scene:
+            continue
+        emit('scene_ready', row_id=item.get('row_id'), image_path=item['image_path'],
+             title=str(item.get('title', '')), scene=scene)
+
+
+def _derivative(handle: JobHandle, image_path: str, target: str) -> str:
+    timeout = handle.deadline.timeout(PREPROCESS_TIMEOUT, '图片预处理') if handle.deadline else PREPROCESS_TIMEOUT
+    return get_preprocessor().prepare(image_path, target, timeout=timeout)
+
+
+def _emit_state(emit: Emit, job: Dict[str, Any], status: str, **fields):
+    """推送某一行的任务状态差量"""
+    emit(
+        'row_state',
+        job_id=job['job_id'],
+        row_id=job['row_id'],
+        kind=job['kind'],
+        status=status,
+        **fields
+    )
+
+
+def _generate_image_once(job: Dict[str, Any], handle: JobHandle) -> Dict[str, Any]:
+    """执行一次图片生成（不含重试与下载）"""
+    try:
+        # 获取可用的图片账号
+        account_info = get_image_account()
+        if not account_info:
+            return {"success": False, "error": "没有可用的图片账号"}
+
+        image_path = job['image_path']
+        prompt = job.get('prompt', '')
+        title = str(job.get('title', ''))
+
+        # 在生成图片前，调用AI基于图片（小尺寸派生图）与标题生成展示场景；已预取时直接使用
+        try:
+            scene = job.get('scene')
+            if not scene:
+                scene = generate_scene(_derivative(handle, image_path, 'llm'), title, deadline=handle.deadline)
+            effective_prompt = merge_prompt_with_scene(prompt or '', title, scene or '')
+        except Exception as e:
+            # 若场景生成或占位填充失败，则继续使用原始提示词
+            logger.warning(f"场景生成或占位填充失败，将使用原始提示词: {e}")
+            effective_prompt = prompt
+
+        handle.check('提交图片任务')
+        result = handle.run(generate_image(
+            cookies=account_info['cookies'],
+            username=account_info['username'],
+            password=account_info['password'],
+            prompt=effective_prompt,
+            image_path=_derivative(handle, image_path, upload_target()),
+            headless=job.get('headless', True),
+            account_id=account_info['id'],
+            on_task_id=handle.record_task_id,
+            deadline=handle.deadline
+        ))
+
+        # 如果生成成功，添加记录到数据库
+        if result.get('success'):
+            add_record(account_info['id'], 1)  # 1代表图片类型
+            result.setdefault('account_id', account_info['id'])
+        return result
+    except (JobCancelled, DeadlineExceeded):
+        raise
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def _generate_video_once(job: Dict[str, Any], handle: JobHandle) -> Dict[str, Any]:
+    """执行一次视频生成（不含重试与下载）"""
+    try:
+        # 获取可用的视频账号
+        account_info = get_video_account()
+        if not account_info:
+            return {"success": False, "error": "没有可用的视频账号"}
+
+        # 获取视频时长配置
+        duration_cfg = get_config('video_duration', '5')
+        try:
+            seconds = int(duration_cfg)
+        except (ValueError, TypeError):
+            seconds = 5
+
+        # 使用选中的模特图作为输入
+        image_path = job.get('image_path')
+        if not image_path or not os.path.exists(image_path):
+            return {"success": False, "error": "模特图未生成或未选择，无法生成视频"}
+
+        result = handle.run(generate_video_async(
+            cookies=account_info['cookies'],
+            username=account_info['username'],
+            password=account_info['password'],
+            prompt=job.get('prompt', ''),
+            seconds=seconds,
+            image_path=_derivative(handle, image_path, upload_target()),
+            headless=job.get('headless', True),
+            account_id=account_info['id'],
+            on_task_id=handle.record_task_id,
+            deadline=handle.deadline
+        ))
+
+        # 如果生成成功，添加记录到数据库
+        if result.get('success'):
+            add_record(account_info['id'], 2)  # 2代表视频类型
+            result.setdefault('account_id', account_info['id'])
+        return result
+    except (JobCancelled, DeadlineExceeded):
+        raise
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def _then_done(batch: Future, emit: Emit, job: Dict[str, Any]) -> Future:
+    """下载全部结束后推送 done；返回的 Future 交由引擎在完成后移除任务"""
+    finished: Future = Future()
+
+    def _complete(f: Future):
+        error = f.exception()
+        if error is not None:
+            finished.set_exception(error)
+            return
+        _emit_state(emit, job, 'done')
+        finished.set_result(f.result())
+
+    batch.add_done_callback(_complete)
+    return finished
+
+
+def _publisher(job: Dict[str, Any], kind: str, event: str, emit: Emit, account_id=None):
+    """下载完成后移入内容寻址存储、登记来源并通知前端"""
+    store = get_output_store(job['output_dir'])
+
+    def _on_saved(url: str, tmp_path: str) -> str:
+        path = store.publish(
+            tmp_path, kind, sku=job.get('folder_name'), row_id=job.get('row_id'),
+            job_id=job.get('job_id'), account_id=account_id, source=job.get('image_path'), url=url
+        )
+        emit(event, row_id=job['row_id'], path=path)
+        return path
+    return _on_saved
+
+
+def _download_images(job: Dict[str, Any], image_urls, emit: Emit, handle: JobHandle, account_id=None) -> Future:
+    """把生成的图片交给下载管理器并发下载，每张完成即通知前端"""
+    store = get_output_store(job['output_dir'])
+    items = [(url, store.incoming_path('.jpg')) for url in image_urls]
+    batch = get_download_manager().download_all(
+        items, handle=handle, on_saved=_publisher(job, 'image', 'image_saved', emit, account_id)
+    )
+    return _then_done(batch, emit, job)
+
+
+def _download_video(job: Dict[str, Any], video_url: str, emit: Emit, handle: JobHandle, account_id=None) -> Future:
+    """把生成的视频交给下载管理器下载"""
+    # 推断扩展名，默认.mp4
+    ext = os.path.splitext(os.path.basename(video_url.split('?', 1)[0]))[1] or '.mp4'
+    store = get_output_store(job['output_dir'])
+    batch = get_download_manager().download_all(
+        [(video_url, store.incoming_path(ext))], handle=handle,
+        on_saved=_publisher(job, 'video', 'video_saved', emit, account_id)
+    )
+    return _then_done(batch, emit, job)
+
+
+def run_image_job(job: Dict[str, Any], emit: Emit, handle: JobHandle) -> Optional[Future]:
+    """
+    图片任务：失败自动重试（最多三次），成功后下载图片
+    :param job: 任务参数（job_id、row_id、image_path、title、prompt、headless、output_dir、folder_name）
+    :param emit: 事件推送函数 emit(event, **fields)
+    :param handle: 任务句柄，被取消时抛出 JobCancelled，超出预算时抛出 DeadlineExceeded
+    :return: 成功时返回后台下载的 Future（下载结束后推送 done），失败时返回 None
+    """
+    result: Dict[str, Any] = {}
+    for attempt in range(MAX_RETRIES + 1):
+        handle.check('重试' if attempt else '开始')
+        _emit_state(emit, job, 'running', attempt=attempt)
+        result = _generate_image_once(job, handle)
+        if result.get('success'):
+            # 附带账号与记录类型，前端直接累加当日次数，无需重新查询
+            emit('accounts_changed', account_id=result.get('account_id'), record_type=1)
+            return _download_images(job, result.get('image_urls', []), emit, handle, result.get('account_id'))
+        logger.warning(f"图片生成失败(第{attempt + 1}次): {result.get('error')}")
+    emit('accounts_changed')
+    _emit_state(emit, job, 'failed', error=result.get('error', '未知错误'))
+    return None
+
+
+def run_video_job(job: Dict[str, Any], emit: Emit, handle: JobHandle) -> Optional[Future]:
+    """
+    视频任务：失败自动重试（最多三次），成功后下载视频
+    :param job: 任务参数（job_id、row_id、image_path、prompt、headless、output_dir、folder_name）
+    :param emit: 事件推送函数 emit(event, **fields)
+    :param handle: 任务句柄，被取消时抛出 JobCancelled，超出预算时抛出 DeadlineExceeded
+    :return: 获取到视频 URL 时返回后台下载的 Future（下载结束后推送 done），否则返回 None
+    """
+    result: Dict[str, Any] = {}
+    for attempt in range(MAX_RETRIES + 1):
+        handle.check('重试' if attempt else '开始')
+        _emit_state(emit, job, 'running', attempt=attempt)
+        result = _generate_video_once(job, handle)
+        if result.get('success'):
+            emit('accounts_changed', account_id=result.get('account_id'), record_type=2)
+            video_url = result.get('video_url')
+            if video_url:
+                return _download_video(job, video_url, emit, handle, result.get('account_id'))
+            # 即使未能获取到URL，也更新前端状态为已完成
+            emit('video_saved', row_id=job['row_id'], path='')
+            _emit_state(emit, job, 'done')
+            return None
+        logger.warning(f"视频生成失败(第{attempt + 1}次): {result.get('error')}")
+    emit('accounts_changed')
+    _emit_state(emit, job, 'failed', error=result.get('error', '未知错误'))
+    return None
+
+
+JOB_RUNNERS = {
+    'image': run_image_job,
+    'video': run_video_job,
+}
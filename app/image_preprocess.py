@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+图片预处理
+在上传前为每张源图生成按用途区分的派生图：
+- upload：长边不超过 UPLOAD_MAX_EDGE 的上传版本（即梦/可灵）
+- llm：长边 512 的小尺寸 JPEG，用于场景生成请求
+- upload_9x16：补边为 9:16 的上传版本（image_letterbox 配置开启时使用）
+派生图在进程池中批量生成，按源图内容哈希缓存在应用数据目录，重复导入或重试时直接复用；
+派生图路径同时登记在资源缓存（asset_cache）中，命中时无需再经过进程池。
+Pillow 不可用时回退为使用原图。
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, Iterable, Optional, Tuple
+
+from database import logger, get_app_data_dir
+from asset_cache import get_asset_cache, stat_key, file_digest, StatKey
+
+# Pillow / NumPy 为可选依赖
+try:
+    from PIL import Image, ImageOps
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# 上传版本的长边上限（像素）
+UPLOAD_MAX_EDGE = 2048
+
+# 各用途派生图参数：长边上限、JPEG 质量、是否补边为 9:16
+TARGETS: Dict[str, Dict] = {
+    'upload': {'max_edge': UPLOAD_MAX_EDGE, 'quality': 92, 'letterbox': False},
+    'upload_9x16': {'max_edge': UPLOAD_MAX_EDGE, 'quality': 92, 'letterbox': True},
+    'llm': {'max_edge': 512, 'quality': 80, 'letterbox': False},
+}
+
+# 预取时默认生成的派生图
+DEFAULT_TARGETS = ('llm', 'upload')
+
+# 补边目标宽高比
+LETTERBOX_RATIO = (9, 16)
+
+# 上传版本在原图已满足要求时直接使用原图的格式
+_PASSTHROUGH_FORMATS = ('JPEG', 'PNG')
+
+def derivative_dir() -> str:
+    path = os.path.join(get_app_data_dir("jimeng_script"), "derivatives")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _spec_tag(spec: Dict) -> str:
+    """参数标签写入文件名，参数变化后自动生成新的派生图"""
+    return f"{spec['max_edge']}q{spec['quality']}{'lb' if spec['letterbox'] else ''}"
+
+
+def _derivative_path(cache_dir: str, digest: str, target: str, spec: Dict) -> str:
+    shard = os.path.join(cache_dir, digest[:2])
+    return os.path.join(shard, f"{digest}_{target}_{_spec_tag(spec)}.jpg")
+
+
+def _border_color(img) -> Tuple[int, int, int]:
+    """取图片边缘像素的平均色作为补边颜色"""
+    if not HAS_NUMPY:
+        return (255, 255, 255)
+    arr = np.asarray(img.convert('RGB'), dtype=np.uint8)
+    edges = np.concatenate([arr[0], arr[-1], arr[:, 0], arr[:, -1]])
+    return tuple(int(c) for c in edges.mean(axis=0))
+
+
+def _letterbox(img):
+    w, h = img.size
+    rw, rh = LETTERBOX_RATIO
+    if w * rh == h * rw:
+        return img
+    if w * rh > h * rw:
+        size = (w, (w * rh + rw - 1) // rw)
+    else:
+        size = ((h * rw + rh - 1) // rh, h)
+    return ImageOps.pad(img, size, color=_border_color(img))
+
+
+def _to_rgb(img):
+    """转为 RGB；带透明通道的图片铺白底"""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        rgba = img.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.split()[-1])
+        return background
+    return img.convert('RGB')
+
+
+def _render_derivatives(src_path: str, outputs: Dict[str, Tuple[str, Dict]]) -> Dict[str, str]:
+    """
+    打开源图一次，生成所有缺失的派生图（在工作进程中执行）
+    :param outputs: target -> (输出路径, 参数)
+    :return: target -> 实际使用的文件路径
+    """
+    result: Dict[str, str] = {}
+    with Image.open(src_path) as opened:
+        src_format = opened.format
+        src_size = opened.size
+        needs_rotation = opened.getexif().get(0x0112, 1) != 1
+        # JPEG 按所需最大尺寸降采样解码，大图可节省大量解码时间
+        largest = max(spec['max_edge'] for _, spec in outputs.values())
+        if src_format == 'JPEG' and max(src_size) > largest * 2:
+            opened.draft('RGB', (largest, largest))
+        base = _to_rgb(ImageOps.exif_transpose(opened))
+
+    for target, (out_path, spec) in outputs.items():
+        # 以源图尺寸判断（draft 解码可能已缩小 base）
+        if (target.startswith('upload') and max(src_size) <= spec['max_edge'] and not spec['letterbox']
+                and src_format in _PASSTHROUGH_FORMATS and not needs_rotation):
+            # 原图已满足上传要求，避免重新压缩损失画质
+            result[target] = src_path
+            continue
+        img = _letterbox(base) if spec['letterbox'] else base
+        if max(img.size) > spec['max_edge']:
+            img = img.copy()
+            img.thumbnail((spec['max_edge'], spec['max_edge']), Image.Resampling.LANCZOS)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        tmp_path = f"{out_path}.{os.getpid()}.tmp"
+        img.save(tmp_path, 'JPEG', quality=spec['quality'], optimize=True)
+        os.replace(tmp_path, out_path)
+        result[target] = out_path
+    return result
+
+
+def _prepare_in_worker(src_path: str, digest: Optional[str], targets: Tuple[str, ...],
+                       cache_dir: str) -> Tuple[str, Dict[str, str]]:
+    """
+    工作进程入口：计算内容哈希（调用方未知时），复用已有派生图、生成缺失的派生图
+    :return: (内容哈希, target -> 路径)
+    """
+    if digest is None:
+        digest = file_digest(src_path)
+    result: Dict[str, str] = {}
+    missing: Dict[str, Tuple[str, Dict]] = {}
+    for target in targets:
+        spec = TARGETS[target]
+        out_path = _derivative_path(cache_dir, digest, target, spec)
+        if os.path.exists(out_path):
+            result[target] = out_path
+        else:
+            missing[target] = (out_path, spec)
+    if missing:
+        result.update(_render_derivatives(src_path, missing))
+    return digest, result
+
+
+class ImagePreprocessor:
+    """派生图生成器：进程池批量处理，同一源图的并发请求共享同一个结果"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # (路径, 修改时间, 大小, targets) -> 生成中的 Future[(内容哈希, target -> 路径)]，完成后移除
+        self._pending: Dict[Tuple, Future] = {}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            import multiprocessing
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._pool
+
+    def submit(self, path: str, targets: Iterable[str] = DEFAULT_TARGETS) -> Optional[Future]:
+        """
+        提交一张源图的派生任务；Pillow 不可用或文件不存在时返回 None
+        不阻塞：调用方只 stat 源图，内容哈希在工作进程中计算（已登记过的源图直接复用）
+        """
+        if not HAS_PIL or not path or not os.path.isfile(path):
+            return None
+        targets = tuple(sorted(set(targets)))
+        key = stat_key(path)
+        digest = get_asset_cache().known_hash(key)
+        if digest is not None:
+            cached = self._cached(path, digest, targets)
+            if cached is not None:
+                return cached
+        pending_key = key + (targets,)
+        with self._lock:
+            future = self._pending.get(pending_key)
+            if future is not None:
+                return future
+            future = self._get_pool().submit(_prepare_in_worker, path, digest, targets, derivative_dir())
+            self._pending[pending_key] = future
+        future.add_done_callback(lambda f: self._finish(pending_key, path, f))
+        return future
+
+    @staticmethod
+    def _cached(path: str, digest: str, targets: Tuple[str, ...]) -> Optional[Future]:
+        """所有派生图都已登记且文件仍在时，返回已完成的 Future"""
+        cache = get_asset_cache()
+        result: Dict[str, str] = {}
+        for target in targets:
+            out_path = cache.peek_artifact(path, target)
+            if not out_path or not os.path.exists(out_path):
+                return None
+            result[target] = out_path
+        future: Future = Future()
+        future.set_result((digest, result))
+        return future
+
+    def _finish(self, pending_key: Tuple, path: str, future: Future):
+        """登记内容哈希与派生图路径，并移除生成中的记录"""
+        try:
+            if not future.cancelled() and future.exception() is None:
+                digest, result = future.result()
+                cache = get_asset_cache()
+                key: StatKey = pending_key[:3]
+                cache.record_hash(key, digest)
+                for target, out_path in result.items():
+                    cache.put_artifact(path, target, out_path)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                if self._pending.get(pending_key) is future:
+                    del self._pending[pending_key]
+
+    def prepare_batch(self, paths: Iterable[str], targets: Iterable[str] = DEFAULT_TARGETS):
+        """批量预生成派生图（如导入文件夹或批量提交后调用）"""
+        for path in paths:
+            try:
+                self.submit(path, targets)
+            except Exception as e:
+                logger.warning(f"提交图片预处理失败 {path}: {e}")
+
+    def prepare(self, path: str, target: str, timeout: Optional[float] = None) -> str:
+        """
+        获取某一用途的派生图路径；处理失败时回退为原图
+        :param timeout: 等待派生图生成的最长时间（秒）
+        """
+        targets = tuple(sorted(set(DEFAULT_TARGETS) | {target}))
+        try:
+            if not HAS_PIL or not os.path.isfile(path):
+                return path
+            # 优先复用已登记的派生图或正在生成的预取任务，避免重复读取源图
+            key = stat_key(path)
+            digest = get_asset_cache().known_hash(key)
+            future = ((self._cached(path, digest, (target,)) if digest is not None else None)
+                      or self._find_pending(key, target)
+                      or self.submit(path, targets))
+            if future is None:
+                return path
+            _, result = future.result(timeout=timeout)
+            return result.get(target, path)
+        except Exception as e:
+            logger.warning(f"图片预处理失败，使用原图 {path}: {e}")
+            return path
+
+    def _find_pending(self, key: StatKey, target: str) -> Optional[Future]:
+        with self._lock:
+            for pending_key, future in self._pending.items():
+                if pending_key[:3] == key and target in pending_key[3]:
+                    return future
+        return None
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._pending.clear()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_preprocessor: Optional[ImagePreprocessor] = None
+_preprocessor_lock = threading.Lock()
+
+
+def get_preprocessor() -> ImagePreprocessor:
+    """进程内共享的预处理器"""
+    global _preprocessor
+    with _preprocessor_lock:
+        if _preprocessor is None:
+            _preprocessor = ImagePreprocessor()
+        return _preprocessor
+
+
+def shutdown_preprocessor():
+    global _preprocessor
+    with _preprocessor_lock:
+        preprocessor, _preprocessor = _preprocessor, None
+    if preprocessor is not None:
+        preprocessor.shutdown()
@@ -1,10 +1,19 @@
 import asyncio
 import sys
 import json
-import time
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
-async def generate_image(cookies, username, password, prompt, image_path, headless=True, account_id=None):
+from deadline import Deadline
+from flow_signals import GenerationSignals
+from upload_util import upload_file
+
+# 提交后等待平台返回任务ID的最长时间（秒）
+TASK_ID_TIMEOUT = 120
+
+# 获取到任务ID后刷新页面以拉取结果的间隔（秒）
+RESULT_REFRESH_INTERVAL = 5
+
+async def generate_image(cookies, username, password, prompt, image_path, headless=True, account_id=None, on_task_id=None, deadline=None):
     """
     使用Playwright和已登录的session ID生成图片
     :param cookies: cookies列表
@@ -14,24 +23,28 @@ async def generate_image(cookies, username, password, prompt, image_path, headle
     :param image_path: 图片路径
     :param headless: 是否使用无头模式
     :param account_id: 账号ID，用于保存cookies到数据库
+    :param on_task_id: 获取到平台任务ID时的回调，用于退出时记录已提交任务
+    :param deadline: 任务时间预算，各步骤超时由剩余预算推导；为空时不限总时长
     """
+    if deadline is None:
+        deadline = Deadline()
     print(f"开始生成图片，提示词: {prompt}")
     
     async with async_playwright() as p:
         # 启动浏览器
         print("启动浏览器...")
-        browser = await p.chromium.launch(headless=headless)
+        browser = await p.chromium.launch(headless=headless, timeout=deadline.timeout_ms(60, '启动浏览器'))
         page = await browser.new_page()
+        page.set_default_timeout(deadline.timeout_ms(30))
         print("浏览器启动成功")
         
-        # 初始化监听器变量
-        task_id = None
+        # 初始化监听器状态：响应到达时直接触发事件
+        signals = GenerationSignals()
         image_urls = []
-        generation_completed = False
         
         # 设置响应监听器
         async def handle_response(response):
-            nonlocal task_id, image_urls, generation_completed
+            nonlocal image_urls
             
             if "aigc_draft/generate" in response.url:
                 try:
@@ -40,16 +53,22 @@ async def generate_image(cookies, username, password, prompt, image_path, headle
                     if data.get("ret") == "0" and "data" in data and "aigc_data" in data["data"]:
                         task_id = data["data"]["aigc_data"]["task"]["task_id"]
                         print(f"获取到任务ID: {task_id}")
+                        signals.set_task_id(task_id)
+                        if on_task_id:
+                            on_task_id(task_id)
+                    elif "ret" in data and data.get("ret") != "0":
+                        # 提交被平台拒绝（如积分不足），无需再等待任务ID
+                        signals.fail(f"提交失败: {data.get('errmsg') or data.get('ret')}")
                 except:
                     pass
             
-            if "/v1/get_asset_list" in response.url and task_id:
+            if "/v1/get_asset_list" in response.url and signals.task_id:
                 try:
                     data = await response.json()
                     if "data" in data and "asset_list" in data["data"]:
                         asset_list = data["data"]["asset_list"]
                         for asset in asset_list:
-                            if "id" in asset and asset.get("id") == task_id:
+                            if "id" in asset and asset.get("id") == signals.task_id:
                                 if "image" in asset and asset["image"].get("finish_time", 0) != 0:
                                     try:
                                         image_urls = []
@@ -64,13 +83,13 @@ async def generate_image(cookies, username, password, prompt, image_path, headle
                                             print(f"图片生成完成，共{len(image_urls)}张图片")
                                             for i, url in enumerate(image_urls):
                                                 print(f"图片{i+1} URL: {url}")
-                                            generation_completed = True
+                                            signals.complete()
                                         else:
                                             print("图片已完成但无法获取任何URL")
-                                            generation_completed = True  # 标记为完成，即使没有URL
+                                            signals.complete()  # 标记为完成，即使没有URL
                                     except (KeyError, IndexError):
                                         print("图片已完成但无法获取URL")
-                                        generation_completed = True  # 标记为完成，即使没有URL
+                                        signals.complete()  # 标记为完成，即使没有URL
                                 else:
                                     print("图片生成尚未完成，继续等待")
                 except:
@@ -85,10 +104,10 @@ async def generate_image(cookies, username, password, prompt, image_path, headle
                 await page.context.add_cookies(cookies)
             # 访问登录页面
             print("访问登录页面...")
-            await page.goto("https://dreamina.capcut.com/ai-tool/login", timeout=60000)
+            await page.goto("https://dreamina.capcut.com/ai-tool/login", timeout=deadline.timeout_ms(60, '打开登录页'))
             print("登录页面加载完成")
             try:
-                await page.wait_for_selector("img.dreamina-component-avatar", timeout=30000)
+                await page.wait_for_selector("img.dreamina-component-avatar", timeout=deadline.timeout_ms(30, '检查登录状态'))
             except Exception:
                 # <div class="lv-checkbox-mask lv-checkbox-mask"><svg class="lv-checkbox-mask-icon lv-checkbox-mask-icon" aria-hidden="true" focusable="false" viewBox="0 0 24 24" width="24" height="24" fill="currentColor"><path d="M18.8536 8.35355C19.0489 8.54882 19.0489 8.8654 18.8536 9.06066L10.8536 17.0607C10.6584 17.2559 10.3418 17.2559 10.1465 17.0607L5.14651 12.0607C4.95125 11.8654 4.95125 11.5488 5.14651 11.3536L5.85361 10.6464C6.04888 10.4512 6.36546 10.4512 6.56072 10.6464L10.5001 14.5858L17.4394 7.64645C17.6347 7.45118 17.9512 7.45118 18.1465 7.64645L18.8536 8.35355Z" p-id="840"></path></svg></div>
                 # 勾选这个
@@ -130,12 +149,14 @@ async def generate_image(cookies, username, password, prompt, image_path, headle
                 # 等待登录成功的标识元素出现 (使用更稳定的定位方式)
                 # 等待包含积分显示的容器出现，表示登录成功
                 print("等待登录成功...")
-                await page.wait_for_selector("[class*='credit-display-container']", timeout=60000)
+                await page.wait_for_selector("[class*='credit-display-container']", timeout=deadline.timeout_ms(60, '登录'))
                 print("登录成功")
             # 跳转https://dreamina.capcut.com/ai-tool/generate?type=image
             print("跳转到图片生成页面...")
-            await page.goto("https://dreamina.capcut.com/ai-tool/generate?type=image", timeout=60000)
+            await page.goto("https://dreamina.capcut.com/ai-tool/generate?type=image", timeout=deadline.timeout_ms(60, '打开生成页'))
             print("图片生成页面加载完成")
+            # 后续未显式指定超时的操作同样受剩余预算约束
+            page.set_default_timeout(deadline.timeout_ms(30, '设置生成参数'))
 
             # <button class="lv-btn lv-btn-secondary lv-btn-size-default lv-btn-shape-square button-oBBmQ2" type="button"><svg width="1em" height="1em" viewBox="0 0 24 24" preserveAspectRatio="xMidYMid meet" fill="none" role="presentation" xmlns="http://www.w3.org/2000/svg" class=""><g><path data-follow-fill="currentColor" d="M19.25 17.25V6.75a2 2 0 0 0-2-2H6.75a2 2 0 0 0-2 2v10.5a2 2 0 0 0 2 2h10.5a2 2 0 0 0 2-2Zm2-10.5a4 4 0 0 0-4-4H6.75a4 4 0 0 0-4 4v10.5a4 4 0 0 0 4 4h10.5a4 4 0 0 0 4-4V6.75Z" clip-rule="evenodd" fill-rule="evenodd" fill="currentColor"></path></g></svg><span class="button-text-H4VSVJ">1:1<div class="divider-ys3wAF"></div><div class="commercial-content-ha0tzp">High (2K)</div></span></button>
             # 点击这个
@@ -186,12 +207,9 @@ async def generate_image(cookies, username, password, prompt, image_path, headle
             # 查找文件上传输入框
             print("查找文件上传输入框...")
             upload_selector = 'input[type="file"][accept*="image"]'
-            await page.wait_for_selector(upload_selector, timeout=10000, state='attached')
-            print("文件上传输入框找到")
-                    
-            # 上传图片文件
+            # 上传图片文件（原生文件通道，等待输入框出现后直接设置文件）
             print(f"上传图片文件: {image_path}")
-            await page.set_input_files(upload_selector, image_path)
+            await upload_file(page, upload_selector, image_path, timeout_ms=deadline.timeout_ms(10, '上传'))
             print("图片文件上传完成")
 
             # 输入提示词 (使用更稳定的选择器，避免随机类名)
@@ -204,15 +222,25 @@ async def generate_image(cookies, username, password, prompt, image_path, headle
 
             # 使用更稳定的选择器并强制点击提交按钮
 
-            time.sleep(3)
+            # 等待提交按钮可点击（上传与提示词校验完成），不再固定休眠阻塞事件循环
+            print("等待提交按钮可用...")
+            submit_selector = 'button[class*="submit-button-"]:not(.lv-btn-disabled)'
+            try:
+                await page.wait_for_selector(submit_selector, state='visible',
+                                             timeout=deadline.timeout_ms(30, '等待提交按钮'))
+            except PlaywrightTimeoutError:
+                # 按钮状态无法判断时退化为等待网络空闲
+                print("提交按钮未在预期时间内可用，等待网络空闲...")
+                try:
+                    await page.wait_for_load_state("networkidle", timeout=deadline.timeout_ms(10, '等待网络空闲'))
+                except PlaywrightTimeoutError:
+                    pass
             print("点击提交按钮...")
-            # 等待提交按钮可点击
             
             # 重置状态变量
             print("重置任务状态变量...")
-            task_id = None
+            signals.reset()
             image_urls = []
-            generation_completed = False
             print("任务状态变量重置完成")
             
             # 尝试多种方式点击按钮
@@ -236,7 +264,7 @@ async def generate_image(cookies, username, password, prompt, image_path, headle
             if not clicked:
                 print("方法1失败，尝试方法2: 直接使用click...")
                 try:
-                    await page.click('button[class*="submit-button-"]:not(.lv-btn-disabled)', timeout=5000)
+                    await page.click('button[class*="submit-button-"]:not(.lv-btn-disabled)', timeout=deadline.timeout_ms(5, '提交'))
                     clicked = True
                     print("方法2点击成功")
                 except Exception as click_error:
@@ -266,32 +294,24 @@ async def generate_image(cookies, username, password, prompt, image_path, headle
             
             print("提交按钮点击流程完成")
             
-            # 等待图片生成完成，最多等待15分钟；等待任务ID最多60次
+            # 等待图片生成完成，最多等待15分钟，且不超过任务剩余预算
             print("等待图片生成完成...")
-            start_time = time.time()
-            wait_count = 0
-            max_wait_without_taskid = 60
-            no_taskid_attempts = 0
+            wait_deadline = deadline.child(900)
             taskid_wait_exceeded = False
-            while not generation_completed and (time.time() - start_time) < 900:  # 15分钟超时
-                wait_count += 1
-                # 如果已获取到任务ID，每5秒刷新一次页面
-                if task_id:
-                    print(f"已获取任务ID: {task_id}，每5秒刷新一次页面... (等待次数: {wait_count})")
-                    await asyncio.sleep(5)
-                    print("刷新页面...")
-                    await page.reload()
-                    print("页面刷新完成")
-                else:
-                    no_taskid_attempts += 1
-                    print(f"尚未获取任务ID，继续等待... (等待次数: {wait_count}，未获ID计数: {no_taskid_attempts}/{max_wait_without_taskid})")
-                    await asyncio.sleep(2)
-                    if no_taskid_attempts >= max_wait_without_taskid:
-                        print(f"超过最大等待次数({max_wait_without_taskid})，未获取到任务ID")
-                        taskid_wait_exceeded = True
+            if not await signals.wait_task_id(min(TASK_ID_TIMEOUT, wait_deadline.remaining())):
+                if not signals.done:
+                    print(f"超过{TASK_ID_TIMEOUT}秒未获取到任务ID")
+                    taskid_wait_exceeded = True
+            else:
+                print(f"已获取任务ID: {signals.task_id}，等待生成结果...")
+                # 结果由刷新页面触发的 get_asset_list 响应带回，响应到达即刻唤醒
+                while not wait_deadline.expired:
+                    if await signals.wait_done(min(RESULT_REFRESH_INTERVAL, wait_deadline.remaining())):
                         break
+                    print("刷新页面...")
+                    await page.reload(timeout=deadline.timeout_ms(30, '刷新结果'))
             
-            if generation_completed:
+            if signals.completed:
                 print("图片生成完成")
                 if image_urls:
                     print(f"成功获取{len(image_urls)}张图片URL")
@@ -299,6 +319,8 @@ async def generate_image(cookies, username, password, prompt, image_path, headle
                         print(f"图片{i+1}: {url}")
                 else:
                     print("未获取到图片URL，但任务已完成")
+            elif signals.error:
+                print(f"图片生成失败: {signals.error}")
             else:
                 print("图片生成超时")
           
@@ -320,10 +342,17 @@ async def generate_image(cookies, username, password, prompt, image_path, headle
                     print(f"保存cookies到数据库时出错: {e}")
 
             # 根据等待结果返回成功或失败
-            if generation_completed:
+            if signals.completed:
                 return {"success": True, "cookies": cookies, "image_urls": image_urls}
             else:
-                err_msg = "等待任务ID超过最大次数(60)" if taskid_wait_exceeded else "图片生成超时"
+                if signals.error:
+                    err_msg = signals.error
+                elif taskid_wait_exceeded:
+                    err_msg = f"等待任务ID超时({TASK_ID_TIMEOUT}秒)"
+                elif deadline.expired:
+                    err_msg = "任务超出时间预算"
+                else:
+                    err_msg = "图片生成超时"
                 return {"success": False, "error": err_msg, "cookies": cookies}
                 
         except Exception as e:
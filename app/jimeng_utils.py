@@ -8,14 +8,12 @@
 
 # 注释掉未使用的导入
 # from cmd import PROMPT
-import threading
-import time
-import requests
 import json
 # 注释掉未使用的导入
 # from openai import OpenAI
 import base64
-from typing import Dict, Any, Optional, Callable, List
+import hashlib
+from typing import Dict, Any, Optional, List, Tuple
 import logging
 import sys
 import os
@@ -23,20 +21,48 @@ import re
 
 # 使用相对导入
 try:
-    from database import get_config
+    from database import get_config, get_cached_scene, save_cached_scene
     from accounts_utils import get_available_account
+    from asset_cache import get_asset_cache
+    from llm_client import get_llm_client
+    from prompt_template import compile_prompt
 except ImportError:
     # 如果相对导入失败，尝试使用绝对导入
     try:
-        from app.database import get_config
+        from app.database import get_config, get_cached_scene, save_cached_scene
         from app.accounts_utils import get_available_account
+        from app.asset_cache import get_asset_cache
+        from app.llm_client import get_llm_client
+        from app.prompt_template import compile_prompt
     except ImportError:
         # 如果都失败了，添加项目根目录到sys.path
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         if project_root not in sys.path:
             sys.path.insert(0, project_root)
-        from database import get_config
+        from database import get_config, get_cached_scene, save_cached_scene
         from accounts_utils import get_available_account
+        from asset_cache import get_asset_cache
+        from llm_client import get_llm_client
+        from prompt_template import compile_prompt
+
+# 场景生成失败时的默认场景
+DEFAULT_SCENE = "唯美街拍"
+
+# 场景生成的系统提示词（单个/批量）；修改任一提示词时需递增版本号，使旧缓存失效
+SCENE_SYSTEM_PROMPT = (
+    "你是产品展示场景生成助手。只输出中文场景短语，不要解释、标点或引号。"
+    "长度不超过10个汉字。"
+)
+SCENE_BATCH_SYSTEM_PROMPT = (
+    "你是产品展示场景生成助手。用户会按编号给出多个产品的标题与图片，"
+    "请为每个产品生成一个适合电商展示的中文场景短语（不超过10个汉字，仅场景，不含标题、品牌、引号或标点）。"
+    "只输出一个 JSON 字符串数组，按产品编号顺序排列，数组长度与产品数量一致，不要输出其他内容。"
+)
+SCENE_PROMPT_VERSION = 1
+
+# 批量场景生成：单次请求的最大商品数与图片载荷上限（base64 字节）
+SCENE_BATCH_MAX_ITEMS = 8
+SCENE_BATCH_MAX_BYTES = 2 * 1024 * 1024
 
 def generate_image(prompt: str, image_path: str):
     account = get_available_account(1)
@@ -53,53 +79,249 @@ def generate_video(prompt: str, image_path: str):
     # 暂时返回一个模拟结果
     return {"success": False, "error": "视频生成功能暂时不可用"}
 
-def generate_scene(image_path: str, title: str = "") -> str:
+def _int_config(key: str, default: int) -> int:
+    try:
+        return int(get_config(key, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def scene_cache_key(image_path: str, title: str, model: str) -> str:
+    """场景缓存键：图片内容哈希 + 标题 + 模型 + 系统提示词版本"""
+    digest = get_asset_cache().content_hash(image_path)
+    raw = json.dumps([digest, title or "", model, SCENE_PROMPT_VERSION], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def generate_scene(image_path: str, title: str = "", deadline=None) -> str:
     """
     使用 GPT-4 模型，根据产品图片和标题生成一个适合展示的场景描述。
 
-    - 使用数据库配置中的 api_key、api_proxy、model
+    - 结果按 (图片内容哈希, 标题, 模型, 提示词版本) 缓存在数据库中，重试与重跑直接复用
+    - 缓存有效期与条数上限见配置 scene_cache_ttl_days / scene_cache_max_entries
+    - 生成失败时返回默认场景，且不写入缓存
+    """
+    model = (get_config("model", "gpt-4") or "").strip() or "gpt-4"
+    ttl_days = _int_config("scene_cache_ttl_days", 7)
+    cache_key = None
+    if ttl_days > 0:
+        try:
+            cache_key = scene_cache_key(image_path, title, model)
+        except OSError as e:
+            logging.warning(f"计算场景缓存键失败: {e}")
+    if cache_key:
+        cached = get_cached_scene(cache_key, ttl_days)
+        if cached:
+            logging.info(f"场景缓存命中: {cached}")
+            return cached
+
+    scene = _request_scene(image_path, title, model, deadline)
+    if not scene:
+        return DEFAULT_SCENE
+    if cache_key:
+        save_cached_scene(cache_key, scene, _int_config("scene_cache_max_entries", 5000))
+    return scene
+
+
+def generate_scenes(items: List[Tuple[str, str]], deadline=None, default: Optional[str] = DEFAULT_SCENE) -> List[Optional[str]]:
+    """
+    批量生成场景描述：一次请求发送多个商品（小图 + 标题），要求返回 JSON 数组。
+
+    - 先查场景缓存，只为未命中的商品发请求
+    - 每批商品数按图片载荷自动确定（不超过 SCENE_BATCH_MAX_ITEMS 个、SCENE_BATCH_MAX_BYTES 字节）
+    - 批量回复无法解析或数量不符时，该批回退为逐个请求
+    :param items: [(图片路径, 标题), ...]
+    :param default: 生成失败的商品使用的场景（预取时传 None，留待任务执行时重试）
+    :return: 与 items 顺序一致的场景列表
+    """
+    model = (get_config("model", "gpt-4") or "").strip() or "gpt-4"
+    ttl_days = _int_config("scene_cache_ttl_days", 7)
+    scenes: List[Optional[str]] = [None] * len(items)
+    keys: List[Optional[str]] = [None] * len(items)
+    # (序号, base64 图片或 None)
+    pending: List[Tuple[int, Optional[str]]] = []
+    for i, (image_path, title) in enumerate(items):
+        if ttl_days > 0:
+            try:
+                keys[i] = scene_cache_key(image_path, title, model)
+            except OSError as e:
+                logging.warning(f"计算场景缓存键失败: {e}")
+        if keys[i]:
+            cached = get_cached_scene(keys[i], ttl_days)
+            if cached:
+                scenes[i] = cached
+                continue
+        try:
+            encoded = _encode_image(image_path)
+        except Exception as e:
+            logging.warning(f"读取图片失败，该商品仅按标题生成场景: {e}")
+            encoded = None
+        pending.append((i, encoded))
+
+    max_entries = _int_config("scene_cache_max_entries", 5000)
+    for batch in _scene_batches(pending):
+        results = None
+        if len(batch) > 1:
+            results = _request_scene_batch([(items[i][1], encoded) for i, encoded in batch], model, deadline)
+        if results is None:
+            # 单个商品或批量回复异常：逐个请求
+            results = [_request_scene(items[i][0], items[i][1], model, deadline) for i, _ in batch]
+        for (i, _), scene in zip(batch, results):
+            scenes[i] = scene
+            if scene and keys[i]:
+                save_cached_scene(keys[i], scene, max_entries)
+    return [scene or default for scene in scenes]
+
+
+def _scene_batches(pending: List[Tuple[int, Optional[str]]]):
+    """按商品数与图片载荷大小切分批次"""
+    batch: List[Tuple[int, Optional[str]]] = []
+    size = 0
+    for entry in pending:
+        cost = len(entry[1] or "")
+        if batch and (len(batch) >= SCENE_BATCH_MAX_ITEMS or size + cost > SCENE_BATCH_MAX_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append(entry)
+        size += cost
+    if batch:
+        yield batch
+
+
+def _request_scene_batch(entries: List[Tuple[str, Optional[str]]], model: str, deadline=None) -> Optional[List[str]]:
+    """一次请求生成多个商品的场景；失败或回复格式不符时返回 None"""
+    content: List[Dict[str, Any]] = [{
+        "type": "text",
+        "text": f"共 {len(entries)} 个产品，请按编号顺序返回 {len(entries)} 个场景短语组成的 JSON 数组。"
+    }]
+    for n, (title, encoded) in enumerate(entries, 1):
+        content.append({"type": "text", "text": f"产品{n} 标题：{title or '未知产品'}"})
+        if encoded:
+            content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded}"}})
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": SCENE_BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": content}
+        ],
+        "max_tokens": 32 * len(entries) + 16
+    }
+    try:
+        url, headers = _chat_endpoint()
+        logging.info(f"GPT 批量场景生成请求 URL: {url}，商品数: {len(entries)}")
+        resp = get_llm_client().post(url, headers, payload, timeout=60, deadline=deadline, step='批量场景生成')
+        if resp.status_code != 200:
+            logging.warning(f"批量场景生成失败，HTTP {resp.status_code}: {resp.text[:500]}")
+            return None
+        text = (
+            resp.json().get("choices", [{}])[0]
+                .get("message", {})
+                .get("content", "")
+        )
+        scenes = parse_scene_array(text, len(entries))
+        if scenes is None:
+            logging.warning(f"批量场景回复格式不符，回退为逐个生成: {text[:500]}")
+        return scenes
+    except Exception as e:
+        logging.warning(f"批量场景生成请求异常，回退为逐个生成: {e}")
+        return None
+
+
+def parse_scene_array(text: str, count: int) -> Optional[List[str]]:
+    """解析批量回复中的 JSON 字符串数组（允许包裹在代码块中）；数量不符或含空项时返回 None"""
+    if not isinstance(text, str):
+        return None
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(data, list) or len(data) != count:
+        return None
+    scenes = [shorten_scene_text(item, 10) if isinstance(item, str) else "" for item in data]
+    return scenes if all(scenes) else None
+
+
+def build_chat_url(base: str) -> str:
+    """构建请求 URL（兼容传入 base_url 为根域或 /v1 或完整路径的情况）"""
+    b = (base or "").strip().rstrip("/")
+    if not b:
+        return "https://api.openai.com/v1/chat/completions"
+    # 已提供完整 chat/completions 路径
+    if b.endswith("/chat/completions") or b.endswith("/responses"):
+        return b
+    # 已到 /v1 根
+    if b.endswith("/v1"):
+        return f"{b}/chat/completions"
+    # 其他情况，补齐 /v1/chat/completions
+    return f"{b}/v1/chat/completions"
+
+
+def _chat_endpoint():
+    """按数据库配置返回 (对话补全 URL, 请求头)"""
+    apikey = (get_config("api_key", "") or "").strip()
+    base_url = ((get_config("api_proxy", "https://api.openai.com/v1") or "").strip() or "https://api.openai.com/v1").rstrip("/")
+    headers = {
+        "Authorization": f"Bearer {apikey}",
+        "Content-Type": "application/json",
+        "Accept": "application/json"
+    }
+    return build_chat_url(base_url), headers
+
+
+def _hedge_target(payload: Dict[str, Any]):
+    """对冲副本请求：配置了备用地址/模型时发往备用端点，否则返回 None（向主端点重复发送）"""
+    proxy = (get_config("llm_hedge_proxy", "") or "").strip()
+    model = (get_config("llm_hedge_model", "") or "").strip()
+    if not proxy and not model:
+        return None
+    url, headers = _chat_endpoint()
+    if proxy:
+        url = build_chat_url(proxy)
+    return url, headers, dict(payload, model=model) if model else payload
+
+
+def _has_reply(resp) -> bool:
+    """对冲请求的有效响应：HTTP 200 且回复内容非空"""
+    if resp.status_code != 200:
+        return False
+    try:
+        return bool(resp.json().get("choices", [{}])[0].get("message", {}).get("content", "").strip())
+    except Exception:
+        return False
+
+
+def _encode_image(image_path: str) -> str:
+    with get_asset_cache().open_bytes(image_path) as data:
+        return base64.b64encode(data).decode("utf-8")
+
+
+def _request_scene(image_path: str, title: str, model: str, deadline=None) -> Optional[str]:
+    """
+    请求对话补全接口生成场景描述，失败时返回 None。
+
+    - 使用数据库配置中的 api_key、api_proxy
     - 优先尝试图像+文本输入的对话补全接口
     - 若失败则回退为仅文本输入（不包含图片）
     - 最终仅返回一句中文场景描述
+    - 请求经共享的 LLM 客户端发送（连接复用、429/5xx 退避重试、慢请求对冲）
+    - 传入 deadline 时，请求超时取 30 秒与任务剩余预算的较小值
     """
-    try:
-        apikey = get_config("api_key", "").strip()
-        base_url = (get_config("api_proxy", "https://api.openai.com/v1").strip() or "https://api.openai.com/v1").rstrip("/")
-        model = (get_config("model", "gpt-4").strip() or "gpt-4")
+    client = get_llm_client()
 
-        # 读取图片并转换为base64编码
+    try:
+        # 读取图片（经资源缓存，重试时不重复读盘）并转换为base64编码
         encoded_image = None
         try:
-            with open(image_path, "rb") as image_file:
-                encoded_image = base64.b64encode(image_file.read()).decode("utf-8")
+            encoded_image = _encode_image(image_path)
         except Exception as e:
             logging.warning(f"读取图片失败，将使用文本模式生成场景: {e}")
 
-        # 构建请求 URL（兼容传入 base_url 为根域或 /v1 或完整路径的情况）
-        def build_chat_url(base: str) -> str:
-            b = (base or "").strip().rstrip("/")
-            if not b:
-                return "https://api.openai.com/v1/chat/completions"
-            # 已提供完整 chat/completions 路径
-            if b.endswith("/chat/completions") or b.endswith("/responses"):
-                return b
-            # 已到 /v1 根
-            if b.endswith("/v1"):
-                return f"{b}/chat/completions"
-            # 其他情况，补齐 /v1/chat/completions
-            return f"{b}/v1/chat/completions"
-
-        url = build_chat_url(base_url)
-        headers = {
-            "Authorization": f"Bearer {apikey}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+        url, headers = _chat_endpoint()
 
-        system_prompt = (
-            "你是产品展示场景生成助手。只输出中文场景短语，不要解释、标点或引号。"
-            "长度不超过10个汉字。"
-        )
+        system_prompt = SCENE_SYSTEM_PROMPT
         user_text = (
             f"产品标题：{title or '未知产品'}\n"
             f"基于产品图片与标题，生成适合电商展示的中文场景短语。要求：不超过10个汉字，仅场景，不含标题、品牌、引号或任何标点。"
@@ -155,7 +377,8 @@ def generate_scene(image_path: str, title: str = "") -> str:
                 except Exception as log_e:
                     logging.warning(f"打印图像+文本请求内容失败: {log_e}")
 
-                resp = requests.post(url, headers=headers, json=payload, timeout=30)
+                resp = client.post_hedged(url, headers, payload, timeout=30, deadline=deadline, step='场景生成',
+                                          hedge=_hedge_target(payload), accept=_has_reply)
                 logging.info(f"图像+文本响应状态: {resp.status_code}")
                 # 打印部分响应文本以便排错
                 try:
@@ -180,7 +403,7 @@ def generate_scene(image_path: str, title: str = "") -> str:
                             logging.info(f"场景(图像+文本)截断: 原='{content}' -> 短='{short}'")
                         except Exception:
                             short = content[:10]
-                        return short or "唯美街拍"
+                        return short or None
                 else:
                     logging.warning(f"图像+文本场景生成失败，HTTP {resp.status_code}: {resp.text[:500]}")
             except Exception as e:
@@ -205,7 +428,8 @@ def generate_scene(image_path: str, title: str = "") -> str:
             except Exception as log_e2:
                 logging.warning(f"打印文本请求内容失败: {log_e2}")
 
-            resp2 = requests.post(url, headers=headers, json=payload_text_only, timeout=30)
+            resp2 = client.post_hedged(url, headers, payload_text_only, timeout=30, deadline=deadline, step='场景生成',
+                                       hedge=_hedge_target(payload_text_only), accept=_has_reply)
             logging.info(f"文本响应状态: {resp2.status_code}")
             try:
                 logging.info(f"文本响应文本预览: {resp2.text[:500]}")
@@ -229,16 +453,16 @@ def generate_scene(image_path: str, title: str = "") -> str:
                         logging.info(f"场景(文本)截断: 原='{content2}' -> 短='{short2}'")
                     except Exception:
                         short2 = content2[:10]
-                    return short2 or "唯美街拍"
+                    return short2 or None
             else:
                 logging.error(f"文本场景生成失败，HTTP {resp2.status_code}: {resp2.text[:500]}")
         except Exception as e:
             logging.error(f"文本场景生成请求异常: {e}")
 
-        return "唯美街拍"
+        return None
     except Exception as e:
         logging.error(f"生成场景失败: {e}")
-        return "唯美街拍"
+        return None
 
 
 def generate_sence(image_path: str) -> str:
@@ -252,47 +476,17 @@ def merge_prompt_with_scene(prompt: str, title: str, scene: str) -> str:
     - 支持占位符：`<scene>`、`<场景>`、`<title>`、`<标题>`，以及包含“标题”的中文词（如`<产品标题>`、`<商品名>`）。
     - 未识别的占位符将保留原状。
     - 如果提示词中没有场景占位符，则在末尾追加一行场景，确保场景被包含。
+    - 模板只在提示词文本变化时重新解析（见 prompt_template）。
     """
     try:
-        if not prompt:
-            return (scene or "")
-
-        def normalize_token(tok: str) -> str:
-            t = tok.strip().lower()
-            if t in ("scene", "场景"):
-                return "scene"
-            if t in ("title", "标题"):
-                return "title"
-            # 宽松匹配：包含“标题”的中文词都视为 title
-            if ("标题" in tok) or ("title" in t) or ("产品名" in tok) or ("商品名" in tok):
-                return "title"
-            return t
-
-        def replacer(m: re.Match) -> str:
-            raw = m.group(0)
-            token = m.group(1)
-            key = normalize_token(token)
-            if key == "scene":
-                return scene or ""
-            if key == "title":
-                return title or ""
-            return raw  # 未识别的占位符保持不变
-
-        # 先将空占位符 <> 视为场景占位符
-        filled = re.sub(r"<\s*>", scene or "", prompt)
-        # 再替换具名占位符
-        filled = re.sub(r"<\s*([^<>]+?)\s*>", replacer, filled)
-
-        # 如果填充后不包含场景文本（说明没有场景占位符），在末尾追加场景。
-        if scene and (scene not in filled):
-            filled = f"{filled}\n{scene}".strip()
-
-        return filled
+        return compile_prompt(prompt or "").render(title, scene)
     except Exception as e:
         logging.warning(f"合并提示词与场景失败，使用原始提示词: {e}")
         # 退化：原始提示词 + 场景
         base = prompt or ""
         return f"{base}\n{scene}".strip()
+
+
 def shorten_scene_text(text: str, max_chars: int = 10) -> str:
     """
     规范化并截断场景文本：
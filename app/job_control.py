@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+任务控制
+提供可取消的任务句柄与任务登记表：
+- 取消时立即中断任务所在事件循环中的协程，触发浏览器关闭
+- 记录任务已提交到平台的 task_id，退出时写入检查点文件
+- 持有任务的时间预算（Deadline），超出预算的任务由引擎回收
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from database import logger, get_app_data_dir
+from deadline import Deadline
+from loop_monitor import install_loop_monitor
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+class JobHandle:
+    """单个生成任务的句柄，可跨线程取消"""
+
+    def __init__(self, job: Dict[str, Any]):
+        self.job_id = job.get('job_id')
+        self.row_id = job.get('row_id')
+        self.kind = job.get('kind')
+        self.job = job
+        self.task_ids: List[str] = []
+        # 任务开始执行时设置；排队时间不计入预算
+        self.deadline: Optional[Deadline] = None
+        self.cancel_reason: Optional[str] = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self, reason: str = 'user'):
+        """
+        请求取消；若协程正在运行则立即中断
+        :param reason: 取消原因（user 用户取消 / timeout 超出时间预算）
+        """
+        if self.cancel_reason is None:
+            self.cancel_reason = reason
+        self._cancel_event.set()
+        with self._lock:
+            loop, task = self._loop, self._task
+        if loop is not None and task is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    def check(self, step: str = ''):
+        """
+        协作式检查点：已取消时抛出 JobCancelled，超出预算时抛出 DeadlineExceeded
+        """
+        if self.cancelled:
+            raise JobCancelled(f"任务已取消: {self.job_id}")
+        if self.deadline is not None:
+            self.deadline.check(step)
+
+    def sleep(self, seconds: float, step: str = ''):
+        """
+        可中断的等待（替代 time.sleep）：不超过剩余预算，期间被取消立即结束
+        :raises JobCancelled / DeadlineExceeded: 同 check
+        """
+        if self.deadline is not None:
+            seconds = min(seconds, max(self.deadline.remaining(), 0))
+        self._cancel_event.wait(seconds)
+        self.check(step)
+
+    def record_task_id(self, task_id):
+        """记录平台返回的 task_id（供退出时写入检查点）"""
+        if task_id and task_id not in self.task_ids:
+            self.task_ids.append(str(task_id))
+
+    def run(self, coro):
+        """
+        在新的事件循环中运行协程（替代 asyncio.run），运行期间可被 cancel() 中断
+        :raises JobCancelled: 任务被取消
+        """
+        self.check()
+        loop = asyncio.new_event_loop()
+        try:
+            asyncio.set_event_loop(loop)
+            install_loop_monitor(loop)
+            task = loop.create_task(coro)
+            with self._lock:
+                self._loop, self._task = loop, task
+            # 防止在登记前已经请求取消
+            if self.cancelled:
+                task.cancel()
+            try:
+                return loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                raise JobCancelled(f"任务已取消: {self.job_id}")
+        finally:
+            with self._lock:
+                self._loop, self._task = None, None
+            try:
+                _cancel_pending_tasks(loop)
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                asyncio.set_event_loop(None)
+                loop.close()
+
+
+def _cancel_pending_tasks(loop: asyncio.AbstractEventLoop):
+    """取消并等待循环中剩余的任务（与 asyncio.run 的收尾逻辑一致）"""
+    pending = asyncio.all_tasks(loop)
+    if not pending:
+        return
+    for task in pending:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+
+
+class JobRegistry:
+    """引擎内所有未结束任务的登记表"""
+
+    def __init__(self):
+        self._jobs: Dict[str, JobHandle] = {}
+        self._cond = threading.Condition()
+
+    def add(self, handle: JobHandle):
+        with self._cond:
+            self._jobs[handle.job_id] = handle
+
+    def remove(self, job_id):
+        with self._cond:
+            self._jobs.pop(job_id, None)
+            self._cond.notify_all()
+
+    def handles(self) -> List[JobHandle]:
+        with self._cond:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id) -> bool:
+        """取消指定任务"""
+        with self._cond:
+            handle = self._jobs.get(job_id)
+        if handle is None:
+            return False
+        handle.cancel()
+        return True
+
+    def cancel_where(self, predicate: Callable[[JobHandle], bool]) -> List[JobHandle]:
+        """取消所有满足条件的任务，返回被取消的句柄"""
+        targets = [h for h in self.handles() if predicate(h)]
+        for handle in targets:
+            handle.cancel()
+        return targets
+
+    def cancel_all(self) -> List[JobHandle]:
+        return self.cancel_where(lambda h: True)
+
+    def wait_empty(self, timeout: float) -> bool:
+        """等待所有任务结束，超时返回 False"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._jobs:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+
+def _checkpoint_path() -> str:
+    return os.path.join(get_app_data_dir("jimeng_script"), "engine_checkpoint.json")
+
+
+def save_task_checkpoint(handles: List[JobHandle]) -> int:
+    """
+    将已提交到平台的任务写入检查点文件，便于重启后追查结果
+    :return: 写入的任务数
+    """
+    entries = []
+    for handle in handles:
+        if not handle.task_ids:
+            continue
+        entries.append({
+            'job_id': handle.job_id,
+            'row_id': handle.row_id,
+            'kind': handle.kind,
+            'task_ids': handle.task_ids,
+            'image_path': handle.job.get('image_path'),
+            'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+    try:
+        path = _checkpoint_path()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        logger.info(f"已写入任务检查点: {len(entries)} 个已提交任务 -> {path}")
+    except Exception as e:
+        logger.error(f"写入任务检查点失败: {e}")
+    return len(entries)
+
+
+def load_task_checkpoint() -> List[Dict[str, Any]]:
+    """读取上次退出时保存的检查点"""
+    try:
+        with open(_checkpoint_path(), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        logger.warning(f"读取任务检查点失败: {e}")
+        return []
@@ -6,6 +6,14 @@ import threading
 from playwright.async_api import async_playwright
 import requests
 from proxy_manager import get_one_proxy
+from flow_signals import GenerationSignals
+from upload_util import upload_file
+
+# 提交后等待任务ID的最长时间（秒）
+TASK_ID_TIMEOUT = 60
+
+# 获取任务ID后等待视频生成完成的最长时间（秒）
+GENERATION_TIMEOUT = 300
 
 async def gen_video_from_images(
     username,
@@ -58,13 +66,12 @@ async def gen_video_from_images(
         """)
         print(f"已向 localStorage 写入时间戳: {ts1}, {ts2}")
 
-        # 初始化监听器变量
-        task_id = None
+        # 初始化监听器状态：响应到达时直接触发事件
+        signals = GenerationSignals()
         video_url = None
-        generation_completed = False
         # 设置响应监听器
         async def handle_response(response):
-            nonlocal task_id, video_url, generation_completed
+            nonlocal video_url
             if "api/task/submit" in response.url:
                 try:
                     data = await response.json()
@@ -72,16 +79,16 @@ async def gen_video_from_images(
                     # 优先使用新的 task.id 字段
                     if data.get("ret") == "0" and "data" in data:
                         if "task" in data["data"] and "id" in data["data"]["task"]:
-                            task_id = data["data"]["task"]["id"]
-                            print(f"[监听器] 获取到任务ID: {task_id}")
+                            signals.set_task_id(data["data"]["task"]["id"])
+                            print(f"[监听器] 获取到任务ID: {signals.task_id}")
                         # 兼容旧字段 aigc_data.task.task_id
                         elif "aigc_data" in data["data"] and "task" in data["data"]["aigc_data"]:
-                            task_id = data["data"]["aigc_data"]["task"]["task_id"]
-                            print(f"[监听器] 获取到任务ID: {task_id}")
+                            signals.set_task_id(data["data"]["aigc_data"]["task"]["task_id"])
+                            print(f"[监听器] 获取到任务ID: {signals.task_id}")
                 except Exception as e:
                     print(f"[监听器] 解析 api/task/submit 响应失败: {e}")
             
-            if "api/user/works/personal/feeds" in response.url and task_id:
+            if "api/user/works/personal/feeds" in response.url and signals.task_id:
                 try:
                     data = await response.json()
                     print("[监听器] 监测到个人作品 feeds 响应")
@@ -91,8 +98,8 @@ async def gen_video_from_images(
                     for item in history:
                         works = item.get("works", [])
                         for asset in works:
-                            print(f"[监听器] 检查 asset taskId: {asset.get('taskId')} vs 本地 task_id: {task_id}")
-                            if asset.get("taskId") == task_id:
+                            print(f"[监听器] 检查 asset taskId: {asset.get('taskId')} vs 本地 task_id: {signals.task_id}")
+                            if asset.get("taskId") == signals.task_id:
                                 status = asset.get("status")
                                 print(f"[监听器] 匹配到任务，status={status}")
                                 # 99 表示完成
@@ -103,12 +110,12 @@ async def gen_video_from_images(
                                         print(f"[监听器] 视频生成完成: {video_url}")
                                     else:
                                         print("[监听器] 视频已完成但 resource 为空")
-                                    generation_completed = True
+                                    signals.complete()
                                     return
                                 # 10 表示失败
                                 elif status == 10:
                                     print("[监听器] 视频生成失败，任务异常")
-                                    generation_completed = True
+                                    signals.fail("视频生成失败，任务异常")
                                     return
                                 else:
                                     print(f"[监听器] 视频生成尚未完成，status={status}，继续等待")
@@ -162,26 +169,10 @@ async def gen_video_from_images(
         print("等待页面稳定 2 秒...")
         await asyncio.sleep(2)
 
-        # 统一使用 JS 方式上传，兼容旧版和新版 input
-        print(f"读取图片文件: {image_path}")
-        with open(image_path, "rb") as f:
-            file_buffer = f.read()
-        print(f"读取图片完成，大小: {len(file_buffer)} 字节")
-        file_name = image_path.split(r'[\\/]').pop()
-        print(f"准备上传文件: {file_name}")
-        await page.evaluate(
-            """([buffer, name]) => {
-                const inputs = document.querySelectorAll('input[type="file"][accept=".jpg,.jpeg,.png"]');
-                if (inputs.length === 0) throw new Error('未找到上传 input');
-                const dt = new DataTransfer();
-                const file = new File([new Uint8Array(buffer)], name, { type: 'image/jpeg' });
-                dt.items.add(file);
-                inputs[0].files = dt.files;
-                inputs[0].dispatchEvent(new Event('change', { bubbles: true }));
-            }""",
-            [file_buffer, file_name]
-        )
-        print(f"已使用 JS 方式上传图片: {image_path}")
+        # 通过原生文件通道上传，避免把图片字节序列化为 JSON 传入页面
+        print(f"上传图片: {image_path}")
+        await upload_file(page, 'input[type="file"][accept=".jpg,.jpeg,.png"]', image_path, timeout_ms=10000)
+        print(f"已上传图片: {image_path}")
 
         print("等待上传后 5 秒...")
         await asyncio.sleep(5)
@@ -205,28 +196,23 @@ async def gen_video_from_images(
         await generate_btn.click()
         print("已点击 Generate 按钮，开始生成视频")
 
-        # 等待 task_id，最多60次，每次1秒
+        # 等待 task_id，响应到达即返回
         print("等待 task_id 中...")
-        for i in range(60):
-            if task_id is not None:
-                print(f"成功获取 task_id: {task_id} (耗时 {i+1} 秒)")
-                break
-            await asyncio.sleep(1)
+        started = time.monotonic()
+        if await signals.wait_task_id(TASK_ID_TIMEOUT):
+            print(f"成功获取 task_id: {signals.task_id} (耗时 {time.monotonic() - started:.1f} 秒)")
         else:
-            print("未能在60秒内获取到任务ID，退出")
+            print(f"未能在{TASK_ID_TIMEOUT}秒内获取到任务ID，退出")
             await browser.close()
             return
 
-        # 循环判断是否完成，5秒一次，最多60次
+        # 等待完成或失败事件
         print("等待视频生成完成...")
-        for i in range(60):
-            if generation_completed:
-                print(f"视频生成完成或失败 (耗时 {(i+1)*5} 秒)")
-                break
-            print(f"第 {i+1} 次轮询，继续等待...")
-            await asyncio.sleep(5)
+        started = time.monotonic()
+        if await signals.wait_done(GENERATION_TIMEOUT):
+            print(f"视频生成完成或失败 (耗时 {time.monotonic() - started:.1f} 秒)")
         else:
-            print("未能在300秒内完成视频生成，退出")
+            print(f"未能在{GENERATION_TIMEOUT}秒内完成视频生成，退出")
 
         # 输出视频链接
         if video_url:
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+LLM 接口客户端
+所有行的场景生成请求共用一个 requests.Session：
+- 连接池大小与任务并发数（max_threads）一致，保持 keep-alive，避免每次重新 DNS/TCP/TLS
+- 429 / 5xx / 连接错误按指数退避重试（优先使用 Retry-After），不超出任务剩余预算
+- 对冲请求（llm_hedge，默认关闭）：主请求超过该端点 p90 耗时仍未返回时，再发一个副本（可指向备用端点/模型），
+  取先返回的有效结果并中断落败的一路；对冲次数不超过请求总数的 HEDGE_BUDGET_RATIO
+- 按端点记录耗时直方图，关闭时输出统计
+"""
+
+import time
+import queue
+import bisect
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from database import logger, get_config
+
+# 需要重试的 HTTP 状态码
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# 默认重试次数（不含首次请求）
+DEFAULT_MAX_RETRIES = 2
+
+# 退避基数与上限（秒）
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 8.0
+
+# 耗时直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 3, 5, 8, 12, 20, 30, 60)
+
+# 对冲阈值使用的耗时分位数；样本不足时使用默认阈值
+HEDGE_QUANTILE = 0.9
+HEDGE_MIN_SAMPLES = 10
+HEDGE_DEFAULT_DELAY = 8.0
+HEDGE_MIN_DELAY = 1.0
+
+# 对冲预算：对冲请求数不超过已发出请求数的该比例
+HEDGE_BUDGET_RATIO = 0.1
+
+# (URL, 请求头, 请求体)
+RequestTarget = Tuple[str, Dict[str, str], Dict[str, Any]]
+
+
+def _config_int(key: str, default: int) -> int:
+    try:
+        return int(get_config(key, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
+class LatencyHistogram:
+    """固定分桶的耗时直方图"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += 1
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """分位数（取所在桶的上界，不超过观测到的最大值）"""
+        if not self.total:
+            return 0.0
+        target = q * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+
+class _TrackedAdapter(HTTPAdapter):
+    """连接池适配器：记录各线程正在使用的连接，可中断指定线程的进行中请求"""
+
+    def __init__(self, *args, **kwargs):
+        self._in_use: Dict[int, Any] = {}
+        self._in_use_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self._track(self.poolmanager)
+
+    def proxy_manager_for(self, *args, **kwargs):
+        return self._track(super().proxy_manager_for(*args, **kwargs))
+
+    def _track(self, manager):
+        if not getattr(manager, '_tracked', False):
+            # 替换为本实例的连接池类（不修改 urllib3 的全局映射）
+            manager.pool_classes_by_scheme = {scheme: self._tracked_pool(cls)
+                                              for scheme, cls in manager.pool_classes_by_scheme.items()}
+            manager._tracked = True
+        return manager
+
+    def _tracked_pool(self, base):
+        adapter = self
+
+        class TrackedPool(base):
+            def _get_conn(self, timeout=None):
+                conn = super()._get_conn(timeout)
+                with adapter._in_use_lock:
+                    adapter._in_use[threading.get_ident()] = conn
+                return conn
+
+            def _put_conn(self, conn):
+                with adapter._in_use_lock:
+                    adapter._in_use.pop(threading.get_ident(), None)
+                super()._put_conn(conn)
+
+        return TrackedPool
+
+    def abort(self, thread_id: int):
+        """关闭该线程正在使用的连接，使其阻塞中的请求立即以连接错误结束"""
+        with self._in_use_lock:
+            conn = self._in_use.pop(thread_id, None)
+        sock = getattr(conn, 'sock', None)
+        if sock is None:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class LLMClient:
+    """带连接池与重试的 LLM 请求客户端（线程安全，进程内共享）"""
+
+    def __init__(self, pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                 hedge: Optional[bool] = None):
+        self.pool_size = max(1, pool_size or _config_int('max_threads', 5))
+        self.max_retries = max(0, max_retries if max_retries is not None
+                               else _config_int('llm_max_retries', DEFAULT_MAX_RETRIES))
+        self.hedge_enabled = hedge if hedge is not None else _config_int('llm_hedge', 0) == 1
+        self.session = requests.Session()
+        # 重试由本类处理，适配器不再自动重试
+        self._adapter = _TrackedAdapter(pool_connections=2, pool_maxsize=self.pool_size * 2, max_retries=0)
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+        # 对冲请求在线程池中并发执行（主请求与副本各占一个线程）
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size * 2, thread_name_prefix='llm-request')
+        self._lock = threading.Lock()
+        # 端点 URL -> 耗时直方图（仅统计成功返回的请求）
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._counts: Dict[str, int] = {'requests': 0, 'retries': 0, 'errors': 0, 'hedges': 0, 'hedge_wins': 0}
+
+    # ---------- 统计 ----------
+
+    def _record(self, url: str, latency: Optional[float], retried: bool = False, error: bool = False):
+        with self._lock:
+            self._counts['requests'] += 1
+            if retried:
+                self._counts['retries'] += 1
+            if error:
+                self._counts['errors'] += 1
+            if latency is not None and not error:
+                histogram = self._histograms.get(url)
+                if histogram is None:
+                    histogram = self._histograms[url] = LatencyHistogram()
+                histogram.add(latency)
+
+    def _bump(self, key: str):
+        with self._lock:
+            self._counts[key] += 1
+
+    def _take_hedge_budget(self) -> bool:
+        """对冲预算未用完时记一次对冲并返回 True"""
+        with self._lock:
+            if self._counts['hedges'] + 1 > self._counts['requests'] * HEDGE_BUDGET_RATIO:
+                return False
+            self._counts['hedges'] += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            result: Dict[str, Any] = dict(self._counts)
+            result['endpoints'] = {
+                url: {'count': h.total, 'p50': h.quantile(0.5), 'p90': h.quantile(0.9), 'max': h.max}
+                for url, h in self._histograms.items()
+            }
+        return result
+
+    def log_stats(self):
+        stats = self.stats()
+        if not stats['requests']:
+            return
+        logger.info(f"LLM 请求 {stats['requests']} 次（重试 {stats['retries']}，失败 {stats['errors']}，"
+                    f"对冲 {stats['hedges']}，副本胜出 {stats['hedge_wins']}）")
+        for url, h in stats['endpoints'].items():
+            logger.info(f"  {url}: {h['count']} 次，耗时 p50≤{h['p50']:.2f}s / p90≤{h['p90']:.2f}s / max {h['max']:.2f}s")
+
+    def hedge_delay(self, url: str, cap: float) -> float:
+        """对冲阈值：该端点的 p90 耗时；样本不足时使用默认值"""
+        with self._lock:
+            histogram = self._histograms.get(url)
+            if histogram is None or histogram.total < HEDGE_MIN_SAMPLES:
+                delay = HEDGE_DEFAULT_DELAY
+            else:
+                delay = histogram.quantile(HEDGE_QUANTILE)
+        return min(max(delay, HEDGE_MIN_DELAY), cap)
+
+    # ---------- 请求 ----------
+
+    @staticmethod
+    def _retry_delay(attempt: int, resp: Optional[requests.Response]) -> float:
+        if resp is not None:
+            retry_after = resp.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), BACKOFF_MAX)
+        return min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX)
+
+    def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+             timeout=30, deadline=None, step: str = 'LLM 请求',
+             cancel: Optional[threading.Event] = None) -> requests.Response:
+        """
+        发送 JSON POST 请求，429/5xx/连接错误时退避重试
+        :param timeout: 单次请求超时上限（秒）
+        :param deadline: 任务时间预算；每次请求的超时与退避等待都不超过剩余时间
+        :param cancel: 置位后不再重试（对冲落败的一路）
+        :return: 最后一次响应（可能为非 200），重试耗尽的连接错误会直接抛出
+        """
+        attempt = 0
+        cancel = cancel or threading.Event()
+        while True:
+            req_timeout = deadline.request_timeout(timeout, step) if deadline is not None else timeout
+            started = time.monotonic()
+            resp = None
+            try:
+                resp = self.session.post(url, headers=headers, json=payload, timeout=req_timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(url, time.monotonic() - started, retried=attempt > 0, error=True)
+                if cancel.is_set() or not self._should_retry(attempt, None, deadline):
+                    raise
+                logger.warning(f"{step}连接失败，准备重试: {e}")
+            else:
+                failed = resp.status_code in RETRY_STATUS
+                self._record(url, time.monotonic() - started, retried=attempt > 0, error=failed)
+                if not failed or cancel.is_set() or not self._should_retry(attempt, resp, deadline):
+                    return resp
+                logger.warning(f"{step}返回 HTTP {resp.status_code}，准备重试")
+            if cancel.wait(self._retry_delay(attempt, resp)):
+                if resp is not None:
+                    return resp
+                raise requests.ConnectionError(f"{step}已取消")
+            attempt += 1
+
+    def _should_retry(self, attempt: int, resp: Optional[requests.Response], deadline) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if deadline is not None and deadline.remaining() <= self._retry_delay(attempt, resp):
+            return False
+        return True
+
+    def post_hedged(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                    timeout=30, deadline=None, step: str = 'LLM 请求',
+                    hedge: Optional[RequestTarget] = None,
+                    accept: Optional[Callable[[requests.Response], bool]] = None) -> requests.Response:
+        """
+        对冲请求：主请求超过端点 p90 耗时仍未返回时发出副本，返回先到达的有效响应，并中断落败的一路
+        未开启对冲或对冲预算已用完时等同于 post
+        :param hedge: 副本请求 (URL, 请求头, 请求体)；为 None 时向同一端点重复发送
+        :param accept: 判断响应是否有效，默认 HTTP 200
+        :return: 有效响应；均无效时返回最后一个响应，均异常时抛出主请求的异常
+        """
+        if not self.hedge_enabled:
+            return self.post(url, headers, payload, timeout=timeout, deadline=deadline, step=step)
+        accept = accept or (lambda r: r.status_code == 200)
+        delay = self.hedge_delay(url, timeout)
+        if deadline is not None and deadline.remaining() <= delay + HEDGE_MIN_DELAY:
+            return self.post(url, headers, payload, timeout=timeout, deadline=deadline, step=step)
+
+        results: 'queue.Queue[Tuple[str, Optional[requests.Response], Optional[BaseException]]]' = queue.Queue()
+        settled = threading.Event()
+        # 各路请求所在线程，结果确定后据此中断仍在进行的一路
+        threads: Dict[str, int] = {}
+        threads_lock = threading.Lock()
+
+        def call(target: RequestTarget, tag: str):
+            with threads_lock:
+                if settled.is_set():
+                    return
+                threads[tag] = threading.get_ident()
+            try:
+                resp = self.post(*target, timeout=timeout, deadline=deadline, step=step, cancel=settled)
+            except BaseException as e:
+                results.put((tag, None, e))
+                return
+            finally:
+                with threads_lock:
+                    threads.pop(tag, None)
+            if settled.is_set():
+                # 另一路已返回有效结果，丢弃本次响应并释放连接
+                resp.close()
+                return
+            results.put((tag, resp, None))
+
+        def settle():
+            with threads_lock:
+                settled.set()
+                losers = list(threads.values())
+            for thread_id in losers:
+                self._adapter.abort(thread_id)
+
+        self._executor.submit(call, (url, headers, payload), 'primary')
+        launched = 1
+        try:
+            first = results.get(timeout=delay)
+        except queue.Empty:
+            if not self._take_hedge_budget():
+                first = results.get()
+            else:
+                logger.info(f"{step}超过 {delay:.1f}s 未返回，发出对冲请求")
+                self._executor.submit(call, hedge or (url, headers, payload), 'hedge')
+                launched = 2
+                first = results.get()
+
+        last_resp, errors = None, {}
+        received = [first]
+        while True:
+            tag, resp, error = received[-1]
+            if resp is not None and accept(resp):
+                settle()
+                if tag == 'hedge':
+                    self._bump('hedge_wins')
+                return resp
+            if resp is not None:
+                last_resp = resp
+            if error is not None:
+                errors[tag] = error
+            if len(received) >= launched:
+                break
+            received.append(results.get())
+        settle()
+        if last_resp is not None:
+            return last_resp
+        raise errors.get('primary') or next(iter(errors.values()))
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """进程内共享的 LLM 客户端"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
+
+
+def close_llm_client():
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.log_stats()
+        client.close()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+事件循环阻塞监控（调试用）
+设置环境变量 JIMENG_DEBUG=1 后，生成任务的事件循环开启监控：
+- asyncio 调试模式记录执行超过阈值的具体回调
+- 心跳协程测量循环调度延迟，超过阈值时输出日志
+默认阈值 100ms；正常运行时不开启，无额外开销。
+"""
+
+import os
+import asyncio
+import logging
+from typing import Optional
+
+from database import logger
+
+# 回调阻塞事件循环超过该时长（秒）即报告
+LOOP_LAG_THRESHOLD = 0.1
+
+# 心跳间隔（秒）
+HEARTBEAT_INTERVAL = 0.05
+
+_asyncio_log_bridged = False
+
+
+def loop_debug_enabled() -> bool:
+    """是否开启事件循环监控（环境变量 JIMENG_DEBUG）"""
+    return os.environ.get('JIMENG_DEBUG', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class _AsyncioLogBridge(logging.Handler):
+    """把 asyncio 调试日志（慢回调）转发到应用日志"""
+
+    def emit(self, record):
+        try:
+            logger.warning(f"[asyncio] {record.getMessage()}")
+        except Exception:
+            pass
+
+
+def _bridge_asyncio_log():
+    global _asyncio_log_bridged
+    if _asyncio_log_bridged:
+        return
+    asyncio_logger = logging.getLogger('asyncio')
+    asyncio_logger.addHandler(_AsyncioLogBridge(level=logging.WARNING))
+    asyncio_logger.setLevel(logging.WARNING)
+    _asyncio_log_bridged = True
+
+
+def install_loop_monitor(loop: asyncio.AbstractEventLoop,
+                         threshold: float = LOOP_LAG_THRESHOLD) -> Optional[asyncio.Task]:
+    """
+    在指定事件循环上开启阻塞监控；未开启调试时不做任何事
+    :return: 心跳任务（循环结束时随其他任务一起取消）
+    """
+    if not loop_debug_enabled():
+        return None
+    _bridge_asyncio_log()
+    loop.set_debug(True)
+    loop.slow_callback_duration = threshold
+    return loop.create_task(_heartbeat(threshold))
+
+
+async def _heartbeat(threshold: float):
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lag = loop.time() - started - HEARTBEAT_INTERVAL
+        if lag > threshold:
+            logger.warning(f"事件循环被阻塞 {lag * 1000:.0f} ms（阈值 {threshold * 1000:.0f} ms）")
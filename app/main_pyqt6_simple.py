@@ -9,15 +9,13 @@ PyQt6版本的Jimeng Scripts应用
 import sys
 import os
 import json
-import glob
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
 import threading
+import multiprocessing
 import time
 import uuid
 from functools import partial
-import asyncio
-import requests
+from collections import OrderedDict, deque
 from typing import Optional
 
 try:
@@ -29,10 +27,10 @@ try:
         QCheckBox, QGroupBox, QFormLayout, QLineEdit, QSpinBox,
         QRadioButton, QButtonGroup, QProgressBar, QScrollArea,
         QSplitter, QFrame, QDialog, QDialogButtonBox, QGridLayout,
-        QScrollArea, QSizePolicy
+        QScrollArea, QSizePolicy, QComboBox, QTableView, QAbstractItemView, QPlainTextEdit
     )
     from PyQt6.QtCore import Qt, pyqtSignal, QObject, QThread, QTimer, QUrl
-    from PyQt6.QtGui import QPixmap, QIcon, QDesktopServices
+    from PyQt6.QtGui import QPixmap, QImage, QIcon, QDesktopServices
     PYQT6_AVAILABLE = True
 except ImportError:
     PYQT6_AVAILABLE = False
@@ -55,21 +53,172 @@ except Exception:
     pass
 
 # 导入现有的模块
-from database import init_database, close_database, logger, get_config, set_config, get_all_configs, add_account, batch_add_accounts, delete_accounts, get_accounts_with_usage, add_record, add_keling_account, batch_add_keling_accounts, get_keling_accounts, delete_keling_accounts
-from accounts_utils import get_image_account, get_video_account
-# 导入图片生成工具
-from jimeng_image_util import generate_image
-from jimeng_utils import generate_scene, merge_prompt_with_scene
-from jimeng_video_util import generate_video as generate_video_async
-
-# 全局线程池变量
-thread_pool = None
+from database import init_database, close_database, logger, get_config, set_config, get_all_configs, add_account, batch_add_accounts, delete_accounts, get_accounts_with_usage, add_keling_account, batch_add_keling_accounts, get_keling_accounts, delete_keling_accounts
+from accounts_utils import get_video_account
+# 生成引擎（独立进程运行浏览器自动化与下载）
+from generation_engine import EngineClient
+from asset_cache import get_asset_cache
+from thumbnail_cache import get_thumbnail_cache, shutdown_thumbnail_cache
+from folder_scanner import scan_product_folder, folder_images
+from folder_watcher import FolderWatcher, DEFAULT_POLL_INTERVAL
+from ui_events import UiEventAggregator, format_eta
+from account_table import AccountTableModel, ACCOUNTS_REFRESH_INTERVAL_MS
+from row_store import ProductRow, STATUSES, STATUS_IMAGING
+from product_table import (
+    ProductTableModel, ProductDelegate, ROW_HEIGHT, MODEL_SLOTS, COLUMN_WIDTHS,
+    COL_MAIN, COL_MODELS, COL_VIDEO, COL_ACTIONS,
+    ACTION_IMAGE, ACTION_VIDEO, ACTION_CANCEL, ACTION_DELETE, video_enabled,
+)
+
 handless = False
 
+# 批量与自动提交时复用视频账号可用性检查结果的时长（秒），避免逐行查询数据库
+VIDEO_ACCOUNT_CHECK_TTL = 5.0
+
 # 全局字典用于存储生成的图片和视频信息
 generated_images_dict = {}
 generated_videos_dict = {}
 
+
+class ThumbnailLoader(QObject):
+    """
+    缩略图异步加载：后台线程解码并缓存到磁盘，完成后在主线程设置到标签，之前显示占位文字
+    内存缓存按 (路径, 尺寸) 保存，界面线程不访问文件系统：源文件的修改时间在后台请求时检查，
+    行的图片更新后由 invalidate 丢弃旧缩略图
+    """
+    thumbnail_ready = pyqtSignal(object, object)  # (源图路径, 尺寸), QImage
+    thumbnail_loaded = pyqtSignal(str)  # 源图路径（供表格委托重绘）
+
+    # 内存中保留的缩略图上限（字节）
+    MAX_BYTES = 64 * 1024 * 1024
+    # 记录的加载失败的缩略图上限，超出后淘汰最早的记录
+    MAX_FAILED = 1024
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pixmaps = OrderedDict()
+        self._bytes = 0
+        self._waiting = {}
+        self._failed = OrderedDict()
+        self._sizes = set()
+        self.thumbnail_ready.connect(self._on_ready, Qt.ConnectionType.QueuedConnection)
+
+    def _request(self, key):
+        self._sizes.add(key[1])
+        get_thumbnail_cache().request(*key).add_done_callback(
+            lambda f, k=key: self._emit_ready(k, f)
+        )
+
+    def load(self, label, image_path, size, placeholder="加载中..."):
+        label._thumb_source = image_path
+        key = (image_path, size)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            label.setPixmap(pixmap)
+            return
+        label.clear()
+        label.setText(placeholder)
+        waiters = self._waiting.setdefault(key, [])
+        waiters.append(label)
+        if len(waiters) == 1:
+            self._request(key)
+
+    def pixmap(self, image_path, size):
+        """
+        供表格委托绘制时调用：返回已加载的缩略图；未就绪时在后台加载并返回 None，
+        加载完成后发出 thumbnail_loaded；加载失败返回空 QPixmap
+        """
+        key = (image_path, size)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            return pixmap
+        if key in self._failed:
+            return QPixmap()
+        waiters = self._waiting.setdefault(key, [])
+        if not waiters:
+            waiters.append(None)
+            self._request(key)
+        return None
+
+    def invalidate(self, paths):
+        """丢弃这些图片的缩略图与失败记录（图片更新或所在文件夹变化后调用），下次显示时重新加载"""
+        for path in paths:
+            if not path:
+                continue
+            for size in self._sizes:
+                key = (path, size)
+                pixmap = self._pixmaps.pop(key, None)
+                if pixmap is not None:
+                    self._bytes -= pixmap.width() * pixmap.height() * 4
+                self._failed.pop(key, None)
+
+    def forget_failures(self):
+        """清空加载失败记录（表格重新填充时调用），失败的图片下次显示时重试"""
+        self._failed.clear()
+
+    def _emit_ready(self, key, future):
+        """在解码线程中调用：读取缩略图；没有缩略图（无 Pillow 或解码失败）时回退为原图加载后缩放"""
+        image_path, size = key
+        thumb_path = None
+        if not future.cancelled() and future.exception() is None:
+            thumb_path = future.result()
+        image = QImage(thumb_path) if thumb_path else QImage()
+        if image.isNull() and os.path.exists(image_path):
+            image = QImage(image_path)
+            if not image.isNull():
+                image = image.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        try:
+            self.thumbnail_ready.emit(key, image)
+        except RuntimeError:
+            # 窗口已关闭
+            pass
+
+    def _on_ready(self, key, image):
+        image_path, _ = key
+        pixmap = QPixmap.fromImage(image) if not image.isNull() else QPixmap()
+        if not pixmap.isNull():
+            self._pixmaps[key] = pixmap
+            self._bytes += pixmap.width() * pixmap.height() * 4
+            while self._bytes > self.MAX_BYTES and self._pixmaps:
+                _, old = self._pixmaps.popitem(last=False)
+                self._bytes -= old.width() * old.height() * 4
+        else:
+            self._failed[key] = None
+            while len(self._failed) > self.MAX_FAILED:
+                self._failed.popitem(last=False)
+        for label in self._waiting.pop(key, []):
+            if label is None:
+                self.thumbnail_loaded.emit(image_path)
+                continue
+            try:
+                if getattr(label, '_thumb_source', None) != image_path:
+                    continue  # 标签已改为显示其他图片
+                if pixmap.isNull():
+                    label.setText("无图片")
+                else:
+                    label.setPixmap(pixmap)
+            except RuntimeError:
+                # 标签已被删除（如表格已刷新）
+                pass
+
+
+_thumbnail_loader = None
+
+
+def get_thumbnail_loader() -> ThumbnailLoader:
+    """主线程共享的缩略图加载器"""
+    global _thumbnail_loader
+    if _thumbnail_loader is None:
+        _thumbnail_loader = ThumbnailLoader()
+    return _thumbnail_loader
+
+
+def load_thumbnail(label, image_path, size, placeholder="加载中..."):
+    """异步设置标签的缩略图（需在主线程调用）"""
+    get_thumbnail_loader().load(label, image_path, size, placeholder)
+
 class WorkerSignals(QObject):
     """工作线程信号类"""
     finished = pyqtSignal(object)
@@ -92,6 +241,52 @@ class Worker(QThread):
         except Exception as e:
             self.signals.error.emit(str(e))
 
+class EngineEventReader(QThread):
+    """引擎事件读取线程：阻塞读取引擎事件并缓存，主线程按批取出（一批只发一次信号）"""
+    events_ready = pyqtSignal()
+
+    def __init__(self, client, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def run(self):
+        while True:
+            event = self.client.recv_event()
+            if event is None:
+                break
+            with self._lock:
+                notify = not self._pending
+                self._pending.append(event)
+            if notify:
+                self.events_ready.emit()
+
+    def drain(self):
+        """取出已到达的全部事件"""
+        with self._lock:
+            events = list(self._pending)
+            self._pending.clear()
+        return events
+
+class FolderScanThread(QThread):
+    """文件夹扫描线程：扫描到的行分块转发到主线程"""
+    chunk_ready = pyqtSignal(object)
+    scan_finished = pyqtSignal(int)
+    scan_failed = pyqtSignal(str)
+
+    def __init__(self, folder_path, parent=None):
+        super().__init__(parent)
+        self.folder_path = folder_path
+
+    def run(self):
+        try:
+            rows = scan_product_folder(self.folder_path, on_chunk=self.chunk_ready.emit)
+            self.scan_finished.emit(len(rows))
+        except Exception as e:
+            logger.error(f"扫描文件夹失败: {e}")
+            self.scan_failed.emit(str(e))
+
 class ClickableLabel(QLabel):
     """可点击的标签"""
     clicked = pyqtSignal(str)  # 发送选中的图片路径
@@ -148,11 +343,8 @@ class ImageSelectionDialog(QDialog):
         
     def load_images(self):
         """加载文件夹中的所有图片"""
-        # 查找所有图片文件
-        image_files = []
-        for ext in ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.gif', '*.webp']:
-            pattern = os.path.join(self.folder_path, ext)
-            image_files.extend(glob.glob(pattern))
+        # 查找所有图片文件（文件夹未变化时使用导入索引）
+        image_files = folder_images([self.folder_path])[self.folder_path]
         
         # 按网格布局显示图片
         self.image_labels = []
@@ -179,9 +371,7 @@ class ImageSelectionDialog(QDialog):
             
             # 加载图片
             if os.path.exists(image_path):
-                pixmap = QPixmap(image_path)
-                pixmap = pixmap.scaled(140, 140, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                image_label.setPixmap(pixmap)
+                load_thumbnail(image_label, image_path, 140)
             
             # 如果是当前主图，添加选中样式
             if image_path == self.current_image:
@@ -388,12 +578,8 @@ class NumberSelectDialog(QDialog):
             return 1
 class MainWindow(QMainWindow):
     """主窗口类"""
-    image_generated_signal = pyqtSignal(int, str)
-    video_generated_signal = pyqtSignal(int, str)
     status_message_signal = pyqtSignal(str)
-    # 新增：主线程重置按钮与刷新账号列表的信号
-    reset_button_signal = pyqtSignal(object, str, str)
-    refresh_accounts_signal = pyqtSignal()
+    folder_rows_signal = pyqtSignal(object, object)
     
     
     def __init__(self):
@@ -414,17 +600,23 @@ class MainWindow(QMainWindow):
             max_threads = 5
             logger.warning(f"无法解析线程池大小配置，使用默认值: {max_threads}")
         
-        # 创建线程池
-        global thread_pool
-        thread_pool = ThreadPoolExecutor(max_workers=max_threads)
-        logger.info(f"线程池已创建，最大线程数: {max_threads}")
+        # 启动生成引擎（独立进程），前端只接收状态事件
+        self.engine = EngineClient(max_threads)
+        if not self.engine.start():
+            QMessageBox.critical(self, "错误", "生成引擎启动失败，程序退出")
+            sys.exit(1)
         
         # 初始化变量
-        self.current_files = []
+        self.product_model = ProductTableModel()
+        # 表格行（按 uniqueId 保存，带状态索引）
+        self.row_store = self.product_model.store
         self.current_folder_path = ""
-        # 失败重试计数器（每行独立，最多重试三次）
-        self._image_retry_counts = {}
-        self._video_retry_counts = {}
+        self._scan_thread = None
+        self._folder_watcher = None
+        # 引擎中未结束的任务：row_id -> {job_id}
+        self._active_jobs = {}
+        # 最近一次视频账号可用性检查（时间, 结果）
+        self._video_account_check = (float('-inf'), False)
 
         # 统一生成文件的保存目录：
         # - 打包为 EXE 时使用 EXE 同级目录
@@ -454,12 +646,20 @@ class MainWindow(QMainWindow):
         # 加载配置
         self.load_configs()
 
-        self.image_generated_signal.connect(self.add_image_to_gallery, Qt.ConnectionType.QueuedConnection)
-        self.video_generated_signal.connect(self._update_video_cell, Qt.ConnectionType.QueuedConnection)
-        self.status_message_signal.connect(self._update_status_bar, Qt.ConnectionType.QueuedConnection)
-        # 新增：确保在主线程执行按钮重置与账号刷新
-        self.reset_button_signal.connect(self._reset_generate_button, Qt.ConnectionType.QueuedConnection)
-        self.refresh_accounts_signal.connect(self.refresh_accounts, Qt.ConnectionType.QueuedConnection)
+        # 任务进度与提示按帧汇总刷新，不再逐个任务更新界面或弹窗
+        self.ui_events = UiEventAggregator(self)
+        self.ui_events.status_updated.connect(self._update_status_bar)
+        self.ui_events.progress_updated.connect(self._render_progress)
+        self.ui_events.notifications_ready.connect(self._append_notifications)
+        self.ui_events.batch_finished.connect(self._on_batch_finished)
+
+        self.status_message_signal.connect(self.ui_events.status, Qt.ConnectionType.QueuedConnection)
+        self.folder_rows_signal.connect(self._on_watched_rows, Qt.ConnectionType.QueuedConnection)
+
+        # 引擎事件统一在主线程处理
+        self.engine_reader = EngineEventReader(self.engine, self)
+        self.engine_reader.events_ready.connect(self._on_engine_events, Qt.ConnectionType.QueuedConnection)
+        self.engine_reader.start()
 
     def _update_status_bar(self, message):
         status_bar = self.statusBar()
@@ -567,6 +767,24 @@ class MainWindow(QMainWindow):
         """)
         self.batch_video_btn.clicked.connect(self.batch_generate_videos)
 
+        # 全部取消按钮
+        self.cancel_all_btn = QPushButton("全部取消")
+        self.cancel_all_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #6c757d;
+                color: white;
+                border: none;
+                border-radius: 4px;
+                padding: 8px 16px;
+                font-size: 14px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #5a6268;
+            }
+        """)
+        self.cancel_all_btn.clicked.connect(self.cancel_all_jobs)
+
         # 批量选择主图按钮
         self.batch_select_main_btn = QPushButton("批量选择主图")
         self.batch_select_main_btn.setStyleSheet("""
@@ -602,12 +820,27 @@ class MainWindow(QMainWindow):
             }
         """)
         self.batch_select_model_btn.clicked.connect(self.batch_select_model_images)
+
+        # 文件夹监听：自动追加采集程序新写入的商品
+        self.watch_checkbox = QCheckBox("监听文件夹")
+        self.watch_checkbox.setToolTip("自动导入导入目录中新增或变化的商品文件夹")
+        self.watch_checkbox.toggled.connect(self.toggle_folder_watch)
+        self.auto_generate_combo = QComboBox()
+        self.auto_generate_combo.addItems(["新商品不自动生成", "新商品自动生成图片", "新商品自动生成图片和视频"])
+        try:
+            self.auto_generate_combo.setCurrentIndex(min(max(int(get_config('watch_auto_generate', '0')), 0), 2))
+        except (ValueError, TypeError):
+            self.auto_generate_combo.setCurrentIndex(0)
+        self.auto_generate_combo.currentIndexChanged.connect(lambda i: set_config('watch_auto_generate', str(i)))
         
         control_layout.addWidget(self.import_btn)
         control_layout.addWidget(self.batch_image_btn)
         control_layout.addWidget(self.batch_video_btn)
+        control_layout.addWidget(self.cancel_all_btn)
         control_layout.addWidget(self.batch_select_main_btn)
         control_layout.addWidget(self.batch_select_model_btn)
+        control_layout.addWidget(self.watch_checkbox)
+        control_layout.addWidget(self.auto_generate_combo)
         control_layout.addStretch()
         
         # 文件列表区域 - 占据更多空间
@@ -629,28 +862,33 @@ class MainWindow(QMainWindow):
         files_layout = QVBoxLayout(files_group)
         files_layout.setContentsMargins(10, 10, 10, 10)
         
-        # 创建表格
-        self.files_table = QTableWidget(0, 4)
-        self.files_table.setHorizontalHeaderLabels(["主图", "模特图", "视频", "操作"])
-        header = self.files_table.horizontalHeader()
-        if header is not None:
-            header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # 创建表格（模型/视图：只绘制可见行）
+        self.files_table = QTableView()
+        self.files_table.setModel(self.product_model)
+        self.product_delegate = ProductDelegate(get_thumbnail_loader(), self.files_table)
+        self.files_table.setItemDelegate(self.product_delegate)
+        self.product_delegate.main_image_clicked.connect(self.on_main_image_clicked)
+        self.product_delegate.model_slot_clicked.connect(self.on_model_image_clicked)
+        self.product_delegate.model_slot_double_clicked.connect(self.on_model_image_double_clicked)
+        self.product_delegate.video_clicked.connect(self.on_video_label_clicked)
+        self.product_delegate.action_triggered.connect(self._on_row_action)
+        get_thumbnail_loader().thumbnail_loaded.connect(self._on_thumbnail_loaded)
+        self.product_model.modelReset.connect(get_thumbnail_loader().forget_failures)
+        self.files_table.setMouseTracking(True)
+        self.files_table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.files_table.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
         v_header = self.files_table.verticalHeader()
         if v_header is not None:
             v_header.setVisible(False)
+            v_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+            v_header.setDefaultSectionSize(ROW_HEIGHT)
         self.files_table.setAlternatingRowColors(True)
         self.files_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 gridline-color: #dee2e6;
                 border: 1px solid #dee2e6;
                 border-radius: 4px;
             }
-            QTableWidget::item {
-                padding: 5px;
-            }
-            QTableWidget::item:selected {
-                background-color: #cce5ff;
-            }
             QHeaderView::section {
                 background-color: #e9ecef;
                 color: #495057;
@@ -663,19 +901,42 @@ class MainWindow(QMainWindow):
         # 设置表格列宽比例
         header = self.files_table.horizontalHeader()
         if header is not None:
-            header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)  # 主图列
-            header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)  # 模特图列
-            header.setSectionResizeMode(2, QHeaderView.ResizeMode.Fixed)  # 视频列
-            header.setSectionResizeMode(3, QHeaderView.ResizeMode.Fixed)  # 操作列
-        self.files_table.setColumnWidth(0, 160)  # 主图列宽度
-        self.files_table.setColumnWidth(2, 140)  # 视频列宽度
-        self.files_table.setColumnWidth(3, 140)  # 操作列宽度
+            header.setSectionResizeMode(COL_MAIN, QHeaderView.ResizeMode.Fixed)  # 主图列
+            header.setSectionResizeMode(COL_MODELS, QHeaderView.ResizeMode.Stretch)  # 模特图列
+            header.setSectionResizeMode(COL_VIDEO, QHeaderView.ResizeMode.Fixed)  # 视频列
+            header.setSectionResizeMode(COL_ACTIONS, QHeaderView.ResizeMode.Fixed)  # 操作列
+        for column, width in COLUMN_WIDTHS.items():
+            self.files_table.setColumnWidth(column, width)
         
         files_layout.addWidget(self.files_table)
+
+        # 任务进度与通知记录
+        progress_group = QGroupBox("任务进度")
+        progress_group.setStyleSheet(files_group.styleSheet())
+        progress_layout = QVBoxLayout(progress_group)
+        progress_layout.setContentsMargins(10, 10, 10, 10)
+        progress_row = QHBoxLayout()
+        self.batch_progress = QProgressBar()
+        self.batch_progress.setRange(0, 1)
+        self.batch_progress.setValue(0)
+        self.batch_progress.setFormat("%v/%m")
+        self.batch_counters = QLabel("当前没有进行中的任务")
+        self.batch_counters.setStyleSheet("font-weight: normal; color: #495057;")
+        progress_row.addWidget(self.batch_progress, 1)
+        progress_row.addWidget(self.batch_counters)
+        progress_layout.addLayout(progress_row)
+        self.notification_log = QPlainTextEdit()
+        self.notification_log.setReadOnly(True)
+        self.notification_log.setMaximumBlockCount(500)
+        self.notification_log.setFixedHeight(90)
+        self.notification_log.setPlaceholderText("通知记录（失败原因、批次汇总）")
+        self.notification_log.setStyleSheet("font-weight: normal;")
+        progress_layout.addWidget(self.notification_log)
         
         # 添加到主布局 - 移除了提示词区域
         layout.addWidget(control_group)
         layout.addWidget(files_group, 1)  # 文件列表区域占据更多空间
+        layout.addWidget(progress_group)
         
         self.tab_widget.addTab(home_widget, "首页")
         
@@ -771,7 +1032,7 @@ class MainWindow(QMainWindow):
                 background-color: #1e7e34;
             }
         """)
-        self.refresh_accounts_btn.clicked.connect(self.refresh_accounts)
+        self.refresh_accounts_btn.clicked.connect(lambda: self.refresh_accounts())
         
         # 新增：全选复选框
         self.select_all_checkbox = QCheckBox("全选")
@@ -804,9 +1065,12 @@ class MainWindow(QMainWindow):
         accounts_list_layout = QVBoxLayout(accounts_list_group)
         accounts_list_layout.setContentsMargins(10, 10, 10, 10)
         
-        # 账号表格
-        self.accounts_table = QTableWidget(0, 5)
-        self.accounts_table.setHorizontalHeaderLabels(["选择", "ID", "用户名", "当日图片数", "当日视频数"])
+        # 账号表格（模型/视图：勾选状态保存在模型中，次数按事件增量更新）
+        self.accounts_model = AccountTableModel(self)
+        self.accounts_table = QTableView()
+        self.accounts_table.setModel(self.accounts_model)
+        self.accounts_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.accounts_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         header = self.accounts_table.horizontalHeader()
         if header is not None:
             header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
@@ -815,15 +1079,15 @@ class MainWindow(QMainWindow):
             v_header.setVisible(False)
         self.accounts_table.setAlternatingRowColors(True)
         self.accounts_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 gridline-color: #dee2e6;
                 border: 1px solid #dee2e6;
                 border-radius: 4px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #cce5ff;
             }
             QHeaderView::section {
@@ -854,6 +1118,12 @@ class MainWindow(QMainWindow):
         layout.addWidget(accounts_list_group)
         
         self.tab_widget.addTab(accounts_widget, "账号管理")
+
+        # 引擎事件触发的刷新合并执行，两次间隔不少于 ACCOUNTS_REFRESH_INTERVAL_MS
+        self._accounts_refresh_timer = QTimer(self)
+        self._accounts_refresh_timer.setSingleShot(True)
+        self._accounts_refresh_timer.timeout.connect(lambda: self.refresh_accounts(silent=True))
+        self._accounts_refreshed_at = 0.0
         
         # 新增：首次打开自动加载账号列表
         try:
@@ -1194,6 +1464,12 @@ class MainWindow(QMainWindow):
         self.browser_headless_checkbox.setStyleSheet("font-size: 13px;")
         config_layout.addRow(QLabel("运行模式:"), self.browser_headless_checkbox)
 
+        # 上传前补边为 9:16
+        self.image_letterbox_checkbox = QCheckBox("上传前将图片补边为 9:16")
+        self.image_letterbox_checkbox.setToolTip("开启后，上传到生成平台的图片会按边缘颜色补边为 9:16 竖图")
+        self.image_letterbox_checkbox.setStyleSheet("font-size: 13px;")
+        config_layout.addRow(QLabel("图片预处理:"), self.image_letterbox_checkbox)
+
         # 图片和视频提示词
         self.settings_image_prompt_edit = QTextEdit()
         self.settings_image_prompt_edit.setMaximumHeight(80)
@@ -1295,6 +1571,20 @@ class MainWindow(QMainWindow):
             }
         """)
         limits_layout.addRow(QLabel("单账号单日图片数:"), self.daily_image_limit_spin)
+
+        self.job_timeout_spin = QSpinBox()
+        self.job_timeout_spin.setRange(1, 120)
+        self.job_timeout_spin.setValue(20)
+        self.job_timeout_spin.setSuffix(" 分钟")
+        self.job_timeout_spin.setStyleSheet("""
+            QSpinBox {
+                border: 1px solid #ced4da;
+                border-radius: 4px;
+                padding: 6px;
+                font-size: 13px;
+            }
+        """)
+        limits_layout.addRow(QLabel("单任务超时:"), self.job_timeout_spin)
         
         # 保存按钮
         save_btn = QPushButton("保存设置")
@@ -1329,374 +1619,183 @@ class MainWindow(QMainWindow):
         self.tab_widget.addTab(settings_widget, "设置")
         
     def import_folder(self):
-        """导入文件夹"""
+        """导入文件夹：后台扫描，扫描到的行分块追加到表格"""
         folder_path = QFileDialog.getExistingDirectory(self, "选择文件夹")
-        if folder_path:
-            try:
-                files = self._get_folder_images(folder_path)
-                if files:
-                    self.current_folder_path = folder_path
-                    self.current_files = files
-                    self.display_folder_content(files)
-                    status_bar = self.statusBar()
-                    if status_bar is not None:
-                        status_bar.showMessage(f"成功导入文件夹，找到 {len(files)} 个子文件夹")
-                else:
-                    QMessageBox.warning(self, "警告", "未找到有效的图片文件")
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"导入文件夹失败: {str(e)}")
-                
-    def _get_folder_images(self, folder_path):
-        """获取文件夹中的图片文件"""
-        import os
-        import glob
-        import json
-        
-        logger.info(f"开始遍历文件夹: {folder_path}")
-        
-        # 验证文件夹路径是否存在
-        if not os.path.exists(folder_path):
-            logger.error(f"文件夹路径不存在: {folder_path}")
-            return []
-        
-        # 验证是否为文件夹
-        if not os.path.isdir(folder_path):
-            logger.error(f"路径不是文件夹: {folder_path}")
-            return []
-        
-        # 查找 images 文件夹
-        images_folder = os.path.join(folder_path, "images")
-        items_folder = os.path.join(folder_path, "items")
-        
-        logger.info(f"images文件夹路径: {images_folder}")
-        logger.info(f"items文件夹路径: {items_folder}")
-        
-        if not os.path.exists(images_folder):
-            logger.error(f"未找到 images 文件夹: {images_folder}")
-            return []
-        
-        if not os.path.exists(items_folder):
-            logger.error(f"未找到 items 文件夹: {items_folder}")
-            return []
-        
-        files = []
-        
-        # 遍历 images 文件夹中的所有子文件夹
+        if not folder_path:
+            return
+        if self._scan_thread is not None and self._scan_thread.isRunning():
+            QMessageBox.information(self, "提示", "正在导入文件夹，请稍候")
+            return
+        self._stop_folder_watch()
+        self.product_model.set_rows([])
+        self._scan_thread = FolderScanThread(folder_path, self)
+        self._scan_thread.chunk_ready.connect(self._on_scan_chunk, Qt.ConnectionType.QueuedConnection)
+        self._scan_thread.scan_finished.connect(
+            lambda count, path=folder_path: self._on_scan_finished(path, count), Qt.ConnectionType.QueuedConnection
+        )
+        self._scan_thread.scan_failed.connect(
+            lambda error: QMessageBox.critical(self, "错误", f"导入文件夹失败: {error}"), Qt.ConnectionType.QueuedConnection
+        )
+        self._scan_thread.start()
+        status_bar = self.statusBar()
+        if status_bar is not None:
+            status_bar.showMessage(f"正在扫描文件夹: {folder_path}")
+
+    def _on_scan_chunk(self, files):
+        """扫描到一批行：追加显示并预取场景"""
+        self.append_folder_rows(files)
+        self._prefetch_scenes(files)
+        status_bar = self.statusBar()
+        if status_bar is not None:
+            status_bar.showMessage(f"正在导入，已找到 {len(self.row_store)} 个子文件夹")
+
+    def _on_scan_finished(self, folder_path, count):
+        if count:
+            self.current_folder_path = folder_path
+            status_bar = self.statusBar()
+            if status_bar is not None:
+                status_bar.showMessage(f"成功导入文件夹，找到 {count} 个子文件夹")
+            if self.watch_checkbox.isChecked():
+                self._start_folder_watch()
+        else:
+            QMessageBox.warning(self, "警告", "未找到有效的图片文件")
+
+    def toggle_folder_watch(self, checked):
+        """开启/关闭文件夹监听"""
+        if not checked:
+            self._stop_folder_watch()
+            self._update_status_bar("已停止监听文件夹")
+            return
+        if not self.current_folder_path:
+            QMessageBox.warning(self, "警告", "请先导入文件夹")
+            self.watch_checkbox.setChecked(False)
+            return
+        self._start_folder_watch()
+
+    def _start_folder_watch(self):
+        self._stop_folder_watch()
+        images_folder = os.path.abspath(os.path.join(self.current_folder_path, "images"))
+        known = [
+            os.path.basename(record.folder_path) for record in self.row_store
+            if record.folder_path and os.path.dirname(os.path.abspath(record.folder_path)) == images_folder
+        ]
         try:
-            subdirs = os.listdir(images_folder)
-            logger.info(f"images文件夹中的子文件夹数量: {len(subdirs)}")
-            
-            for subdir in subdirs:
-                subdir_path = os.path.join(images_folder, subdir)
-                if os.path.isdir(subdir_path):
-                    logger.info(f"处理子文件夹: {subdir_path}")
-                    
-                    # 查找该子文件夹中的所有图片文件
-                    image_files = []
-                    for ext in ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.gif', '*.webp']:
-                        pattern = os.path.join(subdir_path, ext)
-                        image_files.extend(glob.glob(pattern))
-                    
-                    logger.info(f"子文件夹 {subdir} 中找到图片文件数量: {len(image_files)}")
-                    
-                    if image_files:
-                        # 取第一张图片作为默认主图
-                        main_image = image_files[0]
-                        file_name = os.path.basename(subdir_path)
-                        
-                        logger.info(f"子文件夹 {subdir} 的主图: {main_image}")
-                        
-                        # 查找对应的 JSON 文件（如果存在）
-                        json_file = os.path.join(items_folder, f"{subdir}.json")
-                        title = subdir  # 默认使用文件夹名作为标题
-                        if os.path.exists(json_file):
-                            try:
-                                with open(json_file, 'r', encoding='utf-8') as f:
-                                    data = json.load(f)
-                                    # 尝试从 JSON 中获取标题
-                                    if isinstance(data, dict):
-                                        title = data.get('title', data.get('name', subdir))
-                                logger.info(f"从JSON文件 {json_file} 中获取标题: {title}")
-                            except Exception as e:
-                                logger.warning(f"读取 JSON 文件失败 {json_file}: {e}")
-                        else:
-                            logger.info(f"未找到对应的JSON文件: {json_file}")
-                        
-                        # 添加文件夹路径信息
-                        file_info = {
-                            'name': title,
-                            'main_image': main_image,
-                            'folder_path': subdir_path,
-                            'uniqueId': f"{subdir}_{int(time.time())}",  # 生成唯一ID
-                            'selected_model_image': None  # 当前选中的模特图（未选择/未生成时为None）
-                        }
-                        
-                        files.append(file_info)
-                        logger.info(f"添加文件信息: {file_info}")
-                    else:
-                        logger.info(f"子文件夹 {subdir} 中没有找到图片文件")
-        except Exception as e:
-            logger.error(f"遍历 images 文件夹时出错: {e}")
-            return []
-        
-        logger.info(f"总共找到 {len(files)} 个文件夹")
-        return files
-                
-    def display_folder_content(self, files):
-        """显示文件夹内容"""
-        self.files_table.setRowCount(len(files))
-        
-        # 设置表格行高
-        v_header = self.files_table.verticalHeader()
-        if v_header is not None:
-            v_header.setDefaultSectionSize(180)
-        
-        for row, file in enumerate(files):
-            # 主图列 - 改进布局和样式
-            main_image_widget = QWidget()
-            main_layout = QVBoxLayout(main_image_widget)
-            main_layout.setContentsMargins(5, 5, 5, 5)
-            main_layout.setSpacing(5)
-            
-            # 图片显示区域
-            image_label = ClickableLabel(file['main_image'])
-            image_label.setFixedSize(140, 140)
-            image_label.setStyleSheet("""
-                QLabel {
-                    border: 2px solid #dee2e6;
-                    border-radius: 8px;
-                    background-color: #f8f9fa;
-                    padding: 5px;
-                }
-            """)
-            image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            image_label.setCursor(Qt.CursorShape.PointingHandCursor)
-            
-            # 连接点击信号
-            image_label.clicked.connect(lambda path, r=row, f=file: self.on_main_image_clicked(r, f))
-            
-            # 加载图片
-            if os.path.exists(file['main_image']):
-                pixmap = QPixmap(file['main_image'])
-                pixmap = pixmap.scaled(130, 130, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                image_label.setPixmap(pixmap)
-            else:
-                image_label.setText("无图片")
-                image_label.setStyleSheet("""
-                    QLabel {
-                        border: 2px dashed #ced4da;
-                        border-radius: 8px;
-                        background-color: #f8f9fa;
-                        color: #6c757d;
-                        font-size: 12px;
-                        padding: 5px;
-                    }
-                """)
-            
-            # 文件名显示
-            name_label = QLabel(file['name'][:20] + "..." if len(file['name']) > 20 else file['name'])
-            name_label.setStyleSheet("""
-                QLabel {
-                    font-size: 12px;
-                    color: #495057;
-                    qproperty-alignment: AlignCenter;
-                }
-            """)
-            name_label.setWordWrap(True)
-            
-            main_layout.addWidget(image_label, 0, Qt.AlignmentFlag.AlignCenter)
-            main_layout.addWidget(name_label, 0, Qt.AlignmentFlag.AlignCenter)
-            
-            self.files_table.setCellWidget(row, 0, main_image_widget)
-            
-            # 模特图列 - 水平排列
-            model_images_widget = QWidget()
-            model_layout = QHBoxLayout(model_images_widget)
-            model_layout.setContentsMargins(5, 5, 5, 5)
-            model_layout.setSpacing(10)
-            
-            # 创建4个水平排列的模特图展示区域
-            for i in range(4):
-                model_label = ClickableLabel("")
-                model_label.setProperty("row", row)
-                model_label.setProperty("slot_index", i)
-                model_label.setFixedSize(100, 100)  # 增大尺寸到100x100
-                model_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                model_label.setStyleSheet("""
-                    QLabel {
-                        border: 1px dashed #ced4da;
-                        border-radius: 4px;
-                        background-color: #f8f9fa;
-                        color: #6c757d;
-                        font-size: 11px;
-                    }
-                """)
-                model_label.setText(f"模特图{i+1}\n待生成")
-                # 连接单击和双击事件
-                model_label.clicked.connect(lambda path, r=row, lbl=model_label: self.on_model_image_clicked(r, lbl, path))
-                model_label.double_clicked.connect(lambda path, r=row, lbl=model_label: self.on_model_image_double_clicked(r, lbl, path))
-                model_layout.addWidget(model_label)
-            
-            self.files_table.setCellWidget(row, 1, model_images_widget)
+            interval = float(get_config('watch_poll_interval', str(DEFAULT_POLL_INTERVAL)))
+        except (ValueError, TypeError):
+            interval = DEFAULT_POLL_INTERVAL
+        self._folder_watcher = FolderWatcher(self.current_folder_path, known, self.folder_rows_signal.emit,
+                                             poll_interval=interval)
+        self._folder_watcher.start()
+        self._update_status_bar(f"正在监听文件夹: {self.current_folder_path}")
+
+    def _stop_folder_watch(self):
+        watcher, self._folder_watcher = self._folder_watcher, None
+        if watcher is not None:
+            watcher.stop()
+
+    def _on_watched_rows(self, new_rows, changed_rows):
+        """监听到新增/变化的商品：追加新行、更新标题，按设置自动提交生成任务"""
+        by_folder = {record.folder_path: record for record in self.row_store}
+        for row_info in changed_rows:
+            record = by_folder.get(row_info['folder_path'])
+            if record is None:
+                new_rows.append(row_info)
+                continue
+            if record.name != row_info['name']:
+                record.name = str(row_info['name'])
+            # 文件夹有变化，主图可能被替换
+            get_thumbnail_loader().invalidate([record.main_image])
+            self.product_model.row_id_changed(record.row_id, COL_MAIN)
+        if not new_rows:
+            return
+        records = self.append_folder_rows(new_rows)
+        self._prefetch_scenes(new_rows)
+        self._update_status_bar(f"监听到 {len(new_rows)} 个新商品，共 {len(self.row_store)} 个")
 
-            # 默认选择第一个模型图
-            first_item = model_layout.itemAt(0)
-            if first_item is not None and first_item.widget():
-                self._set_model_label_selected(first_item.widget(), True)
-            
-            # 视频列 - 改进布局
-            video_widget = QWidget()
-            video_layout = QVBoxLayout(video_widget)
-            video_layout.setContentsMargins(5, 20, 5, 20)
-            video_layout.setSpacing(10)
-            
-            # 视频展示区域（可点击打开系统播放器）
-            video_label = ClickableLabel("")
-            video_label.setFixedSize(100, 80)
-            video_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            video_label.setStyleSheet("""
-                QLabel {
-                    border: 1px dashed #ced4da;
-                    border-radius: 4px;
-                    background-color: #f8f9fa;
-                    color: #6c757d;
-                    font-size: 11px;
-                }
-            """)
-            video_label.setText("视频\n待生成")
-            # 连接点击事件：打开系统默认视频播放器
-            video_label.clicked.connect(lambda path, r=row: self.on_video_label_clicked(r, path))
-            
-            # 视频状态
-            video_status = QLabel("未生成")
-            video_status.setStyleSheet("""
-                QLabel {
-                    font-size: 11px;
-                    color: #6c757d;
-                    qproperty-alignment: AlignCenter;
-                }
-            """)
-            
-            video_layout.addWidget(video_label, 0, Qt.AlignmentFlag.AlignCenter)
-            video_layout.addWidget(video_status, 0, Qt.AlignmentFlag.AlignCenter)
-            
-            self.files_table.setCellWidget(row, 2, video_widget)
-            
-            # 操作列
-            action_widget = QWidget()
-            action_layout = QVBoxLayout(action_widget)
-            action_layout.setContentsMargins(5, 15, 5, 15)
-            action_layout.setSpacing(10)
-            
-            # 创建按钮并保存引用以避免lambda闭包问题
-            generate_image_btn = QPushButton("生成图片")
-            generate_image_btn.setFixedWidth(100)
-            generate_image_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #007bff;
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    padding: 8px;
-                    font-size: 11px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background-color: #0056b3;
-                }
-            """)
-            # 设定对象名称，便于批量操作检索
-            generate_image_btn.setObjectName("generate_image_btn")
-            # 保存按钮引用以便后续更新状态
-            generate_image_btn.setProperty("row", row)
-            # 使用functools.partial避免闭包问题
-            from functools import partial
-            generate_image_btn.clicked.connect(partial(self.generate_image, row, generate_image_btn))
-            
-            generate_video_btn = QPushButton("生成视频")
-            generate_video_btn.setFixedWidth(100)
-            generate_video_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #28a745;
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    padding: 8px;
-                    font-size: 11px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background-color: #1e7e34;
-                }
-            """)
-            # 设定对象名称，便于批量操作检索
-            generate_video_btn.setObjectName("generate_video_btn")
-            generate_video_btn.setProperty("row", row)
-            generate_video_btn.clicked.connect(partial(self.generate_video, row, generate_video_btn))
-            # 初始状态：未有模特图，禁用视频生成按钮
-            try:
-                init_selected = file.get('selected_model_image')
-                enabled = bool(init_selected and os.path.exists(init_selected))
-                generate_video_btn.setEnabled(enabled)
-                if not enabled:
-                    generate_video_btn.setToolTip("请先生成并选择模特图")
-            except Exception:
-                generate_video_btn.setEnabled(False)
-                generate_video_btn.setToolTip("请先生成并选择模特图")
-            
-            delete_btn = QPushButton("删除")
-            delete_btn.setFixedWidth(100)
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #dc3545;
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    padding: 8px;
-                    font-size: 11px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background-color: #c82333;
-                }
-            """)
-            delete_btn.clicked.connect(partial(self.delete_item, row))
-            
-            action_layout.addWidget(generate_image_btn, 0, Qt.AlignmentFlag.AlignCenter)
-            action_layout.addWidget(generate_video_btn, 0, Qt.AlignmentFlag.AlignCenter)
-            action_layout.addWidget(delete_btn, 0, Qt.AlignmentFlag.AlignCenter)
-            action_layout.addStretch()
-            
-            self.files_table.setCellWidget(row, 3, action_widget)
-            
-            # 设置行的样式
-            self.files_table.setRowHeight(row, 180)
+        mode = str(get_config('watch_auto_generate', '0')).strip()
+        if mode not in ('1', '2'):
+            return
+        if not get_config('image_prompt', ''):
+            self._update_status_bar("未设置图片提示词，新商品未自动生成")
+            return
+        for record in records:
+            if not record.image_busy:
+                # 图片完成后自动生成视频（见 _apply_row_state）
+                record.auto_video = mode == '2'
+                self.generate_image(record.row_id, interactive=False)
 
-    def on_main_image_clicked(self, row, file_info):
+    def _get_folder_images(self, folder_path):
+        """获取文件夹中的图片文件（同步扫描）"""
+        return scan_product_folder(folder_path)
+
+    def _prefetch_scenes(self, files):
+        """导入后在引擎中并发预取各行场景，生成图片时无需再等待 GPT"""
+        items = [
+            {'row_id': f['uniqueId'], 'image_path': f['main_image'], 'title': str(f.get('name', ''))}
+            for f in files if f.get('main_image')
+        ]
+        if items and getattr(self, 'engine', None):
+            self.engine.prefetch_scenes(items)
+
+    def display_folder_content(self, files):
+        """显示文件夹内容"""
+        records = [ProductRow.from_scan(file) for file in files]
+        self.product_model.set_rows(records)
+        return records
+
+    def append_folder_rows(self, files):
+        """追加一批行（导入扫描过程中分块到达）"""
+        records = [ProductRow.from_scan(file) for file in files]
+        self.product_model.append_rows(records)
+        return records
+
+    def _on_thumbnail_loaded(self, image_path):
+        """缩略图加载完成：只重绘可见行中显示该图片的单元格"""
+        table = self.files_table
+        first = table.rowAt(0)
+        if first < 0:
+            return
+        last = table.rowAt(table.viewport().height() - 1)
+        self.product_model.image_loaded(image_path, first, last if last >= 0 else self.product_model.rowCount() - 1)
+
+    def _update_row(self, record, column=None, **changes):
+        """修改行字段（同步状态索引与文件存在标志）并重绘该行"""
+        # 新的图片路径可能指向已变化的文件：丢弃内存中的旧缩略图
+        paths = [changes['main_image']] if 'main_image' in changes else []
+        paths += [path for path in changes.get('model_images', ()) if path not in record.model_images]
+        if paths:
+            get_thumbnail_loader().invalidate(paths)
+        self.row_store.update(record, **changes)
+        if 'main_image' in changes or 'selected_model_image' in changes:
+            record.check_files()
+        self.product_model.row_id_changed(record.row_id, column)
+
+    def _on_row_action(self, row, action):
+        """操作列按钮点击"""
+        if not 0 <= row < len(self.row_store):
+            return
+        row_id = self.row_store.at(row).row_id
+        if action == ACTION_IMAGE:
+            self.generate_image(row_id)
+        elif action == ACTION_VIDEO:
+            self.generate_video(row_id)
+        elif action == ACTION_CANCEL:
+            self.cancel_row_jobs(row_id)
+        elif action == ACTION_DELETE:
+            self.delete_item(row_id)
+
+    def on_main_image_clicked(self, row):
         """处理主图点击事件"""
+        if not 0 <= row < len(self.row_store):
+            return
+        record = self.row_store.at(row)
         # 创建图片选择对话框
-        dialog = ImageSelectionDialog(file_info['folder_path'], file_info['main_image'], self)
+        dialog = ImageSelectionDialog(record.folder_path, record.main_image, self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             # 更新选中的图片
             selected_image = dialog.selected_image
-            if selected_image != file_info['main_image']:
-                # 更新文件信息
-                self.current_files[row]['main_image'] = selected_image
-                
-                # 更新表格中的图片显示
-                main_image_widget = self.files_table.cellWidget(row, 0)
-                if main_image_widget:
-                    # 找到图片标签并更新图片
-                    layout = main_image_widget.layout()
-                    if layout and layout.count() > 0:
-                        item = layout.itemAt(0)
-                        if item is not None:
-                            image_label = item.widget()
-                            if isinstance(image_label, ClickableLabel) and os.path.exists(selected_image):
-                                pixmap = QPixmap(selected_image)
-                                pixmap = pixmap.scaled(130, 130, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                                image_label.setPixmap(pixmap)
-                                image_label.image_path = selected_image
+            if selected_image != record.main_image:
+                self._update_row(record, COL_MAIN, main_image=selected_image)
 
     def batch_select_main_images(self):
         """批量选择主图：根据选择的序号为所有项目设置主图，超出则选择最后一张"""
@@ -1705,39 +1804,27 @@ class MainWindow(QMainWindow):
             number = dialog.get_selected_number()
             updated = 0
             try:
-                for row in range(len(self.current_files)):
-                    info = self.current_files[row]
-                    folder_path = info.get('folder_path')
+                # 一次查询导入索引，只重新列出有变化的文件夹
+                images_by_folder = folder_images(
+                    {record.folder_path for record in self.row_store if record.folder_path}
+                )
+                for record in self.row_store:
+                    folder_path = record.folder_path
                     if not folder_path or not os.path.isdir(folder_path):
                         continue
-                    image_files = []
-                    for ext in ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.gif', '*.webp']:
-                        pattern = os.path.join(folder_path, ext)
-                        image_files.extend(glob.glob(pattern))
+                    image_files = images_by_folder.get(folder_path, [])
                     if not image_files:
                         continue
                     image_files = sorted(image_files)
                     idx = min(number, len(image_files)) - 1
-                    selected_image = image_files[idx]
-                    self.current_files[row]['main_image'] = selected_image
-                    main_image_widget = self.files_table.cellWidget(row, 0)
-                    if main_image_widget:
-                        layout = main_image_widget.layout()
-                        if layout and layout.count() > 0:
-                            item = layout.itemAt(0)
-                            if item and item.widget():
-                                image_label = item.widget()
-                                if os.path.exists(selected_image):
-                                    pixmap = QPixmap(selected_image)
-                                    pixmap = pixmap.scaled(130, 130, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                                    image_label.setPixmap(pixmap)
-                                    try:
-                                        image_label.image_path = selected_image
-                                    except Exception:
-                                        pass
+                    # 图片来自目录列表，必然存在
+                    record.main_image = image_files[idx]
+                    record.main_exists = True
+                    get_thumbnail_loader().invalidate([record.main_image])
                     updated += 1
             except Exception:
                 pass
+            self.product_model.rows_changed()
             status_bar = self.statusBar()
             if status_bar is not None:
                 status_bar.showMessage(f"批量选择主图完成，更新 {updated} 行")
@@ -1750,180 +1837,217 @@ class MainWindow(QMainWindow):
             number = dialog.get_selected_number()
             updated = 0
             try:
-                for row in range(len(self.current_files)):
-                    model_widget = self.files_table.cellWidget(row, 1)
-                    if not model_widget:
-                        continue
-                    layout = model_widget.layout()
-                    if not layout:
-                        continue
-
-                    filled_labels = []
-                    for i in range(layout.count()):
-                        it = layout.itemAt(i)
-                        if it and it.widget():
-                            lbl = it.widget()
-                            if isinstance(lbl, QLabel):
-                                pix = lbl.pixmap()
-                                if pix is not None and not getattr(pix, 'isNull', lambda: True)():
-                                    filled_labels.append(lbl)
-                    if not filled_labels:
-                        continue
-
-                    idx = min(number, len(filled_labels)) - 1
-                    target_label = filled_labels[idx]
-
-                    for i in range(layout.count()):
-                        it = layout.itemAt(i)
-                        if it and it.widget():
-                            self._set_model_label_selected(it.widget(), False)
-                    self._set_model_label_selected(target_label, True)
-
-                    image_path = getattr(target_label, 'image_path', None)
-                    if image_path and os.path.exists(image_path):
-                        self.current_files[row]['selected_model_image'] = image_path
-                    else:
-                        self.current_files[row]['selected_model_image'] = None
-                    self._update_video_button_state(row)
+                # 只访问已有模特图的行
+                for record in self.row_store.with_images():
+                    idx = min(number, len(record.model_images)) - 1
+                    image_path = record.model_images[idx]
+                    exists = os.path.exists(image_path)
+                    self.row_store.update(
+                        record, selected_slot=idx,
+                        selected_model_image=image_path if exists else None, selected_exists=exists,
+                    )
                     updated += 1
             except Exception as e:
                 logger.error(f"批量选择模特图失败: {e}")
+            self.product_model.rows_changed()
             status_bar = self.statusBar()
             if status_bar is not None:
                 status_bar.showMessage(f"批量选择模特图完成，更新 {updated} 行")
             QMessageBox.information(self, "完成", f"已为 {updated} 个项目设置模特图")
 
-    def generate_image(self, row, button):
-        """生成图片"""
-        if row < len(self.current_files):
-            file = self.current_files[row]
+    def generate_image(self, row_id, interactive=True):
+        """
+        生成图片
+        :param interactive: 按钮点击为 True（检查未通过时弹窗）；批量与自动提交为 False（记入通知记录并跳过）
+        :return: 任务已提交到生成引擎时返回 True
+        """
+        record = self.row_store.get(row_id)
+        if record is not None:
             # 从数据库获取提示词
             prompt = get_config('image_prompt', '')
             
             if not prompt:
-                QMessageBox.warning(self, "警告", "请输入图片提示词")
-                return
-                
-            # 重置该行的重试计数
-            try:
-                self._image_retry_counts[row] = 0
-            except Exception:
-                pass
+                self._skip_job(record, "请输入图片提示词", interactive)
+                return False
 
             # 更新按钮状态
-            button.setText("正在生成")
-            button.setEnabled(False)
-            button.setStyleSheet("""
-                QPushButton {
-                    background-color: #6c757d;
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    padding: 8px;
-                    font-size: 11px;
-                    font-weight: bold;
-                }
-            """)
+            self._set_row_busy(record, 'image', True)
             
             # 显示进度提示
-            status_bar = self.statusBar()
-            if status_bar is not None:
-                status_bar.showMessage("正在生成图片...")
-
-            # 使用线程池执行任务
-            global thread_pool
-            if thread_pool:
-                # 提交任务到线程池
-                future = thread_pool.submit(self._generate_image_task, file['main_image'], prompt, row)
-                # 添加回调处理结果（保持在主线程更新UI）
-                future.add_done_callback(lambda f, btn=button, r=row: self._on_image_generate_finished(f, btn, r))
-            else:
-                QMessageBox.critical(self, "错误", "线程池不可用")
+            self.ui_events.status("正在生成图片...")
+
+            # 提交任务到生成引擎（场景生成、浏览器、下载与重试均在引擎中执行）
+            job = {
+                'job_id': uuid.uuid4().hex,
+                'kind': 'image',
+                'row_id': record.row_id,
+                'image_path': record.main_image,
+                'title': record.name,
+                'folder_name': os.path.basename(record.folder_path) if record.folder_path else None,
+                # 预取的场景仅在主图未更换时使用
+                'scene': record.scene if record.scene_image == record.main_image else None,
+                'prompt': prompt,
+                'headless': self._get_browser_headless(),
+                'output_dir': str(self.generated_images_dir),
+            }
+            if not self.engine.submit(job):
+                self._skip_job(record, "生成引擎不可用", interactive, critical=True)
                 # 恢复按钮状态
-                self._reset_generate_button(button, "生成图片", "#007bff")
-
-    def _set_model_label_selected(self, label: QLabel, selected: bool):
-        """设置模型图标签选中/未选中样式"""
-        if selected:
-            label.setStyleSheet("""
-                QLabel {
-                    border: 2px solid #007bff;
-                    border-radius: 4px;
-                    background-color: #f8f9fa;
-                    color: #495057;
-                    font-size: 11px;
-                }
-            """)
+                self._set_row_busy(record, 'image', False)
+                return False
+            self._track_job(job)
+            return True
+        return False
+
+    def _skip_job(self, record, reason, interactive, critical=False):
+        """任务不能提交：按钮点击时弹窗提示，批量与自动提交只记入通知记录"""
+        if not interactive:
+            self.ui_events.notify(f"{record.name}：{reason}，已跳过")
+        elif critical:
+            QMessageBox.critical(self, "错误", reason)
         else:
-            label.setStyleSheet("""
-                QLabel {
-                    border: 1px dashed #ced4da;
-                    border-radius: 4px;
-                    background-color: #f8f9fa;
-                    color: #6c757d;
-                    font-size: 11px;
-                }
-            """)
+            QMessageBox.warning(self, "警告", reason)
+
+    def _video_job_problem(self, record, account_max_age=0.0):
+        """
+        视频任务的提交前检查：返回不能提交的原因，可以提交时返回 None
+        :param account_max_age: 可复用上次账号检查结果的时长（秒）
+        """
+        if not get_config('video_prompt', ''):
+            return "请输入视频提示词"
+        checked_at, available = self._video_account_check
+        if account_max_age <= 0 or time.monotonic() - checked_at > account_max_age:
+            try:
+                available = bool(get_video_account())
+            except Exception as e:
+                available = False
+                logger.error(f"获取视频账号失败: {e}")
+            self._video_account_check = (time.monotonic(), available)
+        if not available:
+            return "没有可用的视频账号"
+        image_path = record.selected_model_image
+        if not image_path or not os.path.exists(image_path):
+            return "请先选择已生成的模特图，才能生成视频"
+        return None
+
+    def _track_job(self, job):
+        """登记已提交的任务"""
+        self._active_jobs.setdefault(job['row_id'], set()).add(job['job_id'])
+        self.ui_events.job_submitted(job['job_id'])
+
+    def _untrack_job(self, row_id, job_id):
+        jobs = self._active_jobs.get(row_id)
+        if jobs is not None:
+            jobs.discard(job_id)
+            if not jobs:
+                del self._active_jobs[row_id]
+
+    def _set_row_busy(self, record, kind, busy):
+        """设置行的生成中状态（按钮显示“正在生成”并禁用，取消按钮随之启用）"""
+        changes = {f'{kind}_busy': busy}
+        if busy:
+            changes['failed'] = False
+        self._update_row(record, **changes)
+
+    def cancel_row_jobs(self, row_id):
+        """取消某一行正在进行的生成任务"""
+        if not self._active_jobs.get(row_id):
+            return
+        if self.engine.cancel_row(row_id):
+            self._update_status_bar("正在取消任务...")
+
+    def cancel_all_jobs(self):
+        """取消全部正在进行和排队中的生成任务"""
+        count = sum(len(jobs) for jobs in self._active_jobs.values())
+        if not count:
+            self._update_status_bar("当前没有进行中的任务")
+            return
+        if self.engine.cancel_all():
+            self._update_status_bar(f"正在取消 {count} 个任务...")
 
-    def _update_video_button_state(self, row: int):
-        """根据是否选择/生成模特图，动态启用/禁用该行视频生成按钮"""
-        try:
-            action_widget = self.files_table.cellWidget(row, 3)
-            if not action_widget:
-                return
-            layout = action_widget.layout()
-            if not layout:
-                return
-            video_btn = None
-            for i in range(layout.count()):
-                item = layout.itemAt(i)
-                if item and item.widget() and isinstance(item.widget(), QPushButton):
-                    w = item.widget()
-                    if w.objectName() == "generate_video_btn":
-                        video_btn = w
-                        break
-            if video_btn is None:
-                return
+    def _on_engine_events(self):
+        """处理一批已到达的引擎事件"""
+        for event in self.engine_reader.drain():
+            self._on_engine_event(event)
 
-            selected_path = None
-            if 0 <= row < len(self.current_files):
-                selected_path = self.current_files[row].get('selected_model_image')
-            enabled = bool(selected_path and os.path.exists(selected_path))
-            video_btn.setEnabled(enabled)
-            video_btn.setToolTip("生成视频" if enabled else "请先生成并选择模特图")
+    def _on_engine_event(self, event):
+        """处理生成引擎推送的事件（主线程）"""
+        name = event.get('event')
+        try:
+            if name == 'row_state':
+                self._apply_row_state(event)
+            elif name == 'scene_ready':
+                record = self.row_store.get(event.get('row_id'))
+                if record is not None:
+                    record.scene = event.get('scene')
+                    record.scene_image = event.get('image_path')
+            elif name == 'image_saved':
+                self.add_image_to_gallery(event.get('row_id'), event.get('path', ''))
+            elif name == 'video_saved':
+                self._update_video_cell(event.get('row_id'), event.get('path', ''))
+            elif name == 'accounts_changed':
+                self._on_accounts_changed(event)
         except Exception as e:
-            logger.error(f"更新视频按钮状态失败: {e}")
+            logger.error(f"处理引擎事件失败 {name}: {e}")
+
+    def _apply_row_state(self, event):
+        """将任务状态差量渲染到对应行"""
+        kind = event.get('kind')
+        status = event.get('status')
+        label = "图片" if kind == 'image' else "视频"
+        record = self.row_store.get(event.get('row_id'))
+        self.ui_events.job_state(event.get('job_id'), status)
+        if status == 'running':
+            attempt = int(event.get('attempt') or 0)
+            if attempt > 0:
+                self.ui_events.status(f"{label}生成失败，重试第{attempt}次")
+            return
 
-    def on_model_image_clicked(self, row: int, label: QLabel, image_path: str):
+        if status == 'done':
+            self.ui_events.status(f"{label}生成完成")
+        elif status == 'failed':
+            err = event.get('error') or '未知错误'
+            name = record.name if record is not None else event.get('row_id')
+            self.ui_events.status(f"{label}生成失败，已达最大重试次数")
+            self.ui_events.notify(f"{name}：{label}生成失败(已重试3次): {err}")
+        elif status == 'cancelled':
+            self.ui_events.status(f"{label}生成已取消")
+        else:
+            return
+        self._untrack_job(event.get('row_id'), event.get('job_id'))
+
+        # 在成功、最终失败或取消后，才重置按钮
+        if record is None:
+            return
+        self._update_row(record, **{f'{kind}_busy': False, 'failed': status == 'failed'})
+        # 监听自动生成：图片完成后继续生成视频
+        if kind == 'image' and record.auto_video:
+            record.auto_video = False
+            if status == 'done' and video_enabled(record) and not record.video_busy:
+                self.generate_video(record.row_id, interactive=False)
+
+    def on_model_image_clicked(self, row: int, slot: int):
         """单击选择模型图"""
         try:
-            model_widget = self.files_table.cellWidget(row, 1)
-            if not model_widget:
-                return
-            layout = model_widget.layout()
-            if not layout:
+            if not 0 <= row < len(self.row_store):
                 return
-            # 清除该行所有标签的选中状态
-            for i in range(layout.count()):
-                item = layout.itemAt(i)
-                if item and item.widget():
-                    self._set_model_label_selected(item.widget(), False)
-            # 设置当前标签为选中
-            self._set_model_label_selected(label, True)
-            # 记录所选模型图路径（仅当存在有效路径时）
-            try:
-                if 0 <= row < len(self.current_files):
-                    self.current_files[row]['selected_model_image'] = image_path if (image_path and os.path.exists(image_path)) else None
-                    # 选择变化后，更新该行的视频生成按钮状态
-                    self._update_video_button_state(row)
-            except Exception as e:
-                logger.error(f"记录选中模型图路径失败: {e}")
+            record = self.row_store.at(row)
+            image_path = record.model_images[slot] if slot < len(record.model_images) else None
+            # 记录所选模型图路径（仅当存在有效路径时）；视频生成按钮状态随之更新
+            self._update_row(
+                record, selected_slot=slot,
+                selected_model_image=image_path if (image_path and os.path.exists(image_path)) else None,
+            )
         except Exception as e:
             logger.error(f"选择模型图失败: {e}")
 
-    def on_model_image_double_clicked(self, row: int, label: QLabel, image_path: str):
+    def on_model_image_double_clicked(self, row: int, slot: int):
         """双击打开预览对话框查看模型图"""
         try:
+            image_path = None
+            if 0 <= row < len(self.row_store):
+                images = self.row_store.at(row).model_images
+                image_path = images[slot] if slot < len(images) else None
             if image_path and os.path.exists(image_path):
                 dialog = ImagePreviewDialog(image_path, self)
                 dialog.exec()
@@ -1932,230 +2056,34 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logger.error(f"预览模型图失败: {e}")
 
-    def _generate_image_task(self, image_path, prompt, row):
-        """在子线程中执行的实际图片生成任务"""
-        try:
-            # 获取可用的图片账号
-            account_info = get_image_account()
-            if not account_info:
-                return {"success": False, "error": "没有可用的图片账号"}
-
-            # 在生成图片前，调用AI基于图片与标题生成展示场景
-            try:
-                title = ""
-                if 0 <= row < len(self.current_files):
-                    title = str(self.current_files[row].get('name', ''))
-                scene = generate_scene(image_path, title)
-                effective_prompt = merge_prompt_with_scene(prompt or '', title, scene or '')
-            except Exception as e:
-                # 若场景生成或占位填充失败，则继续使用原始提示词
-                logger.warning(f"场景生成或占位填充失败，将使用原始提示词: {e}")
-                effective_prompt = prompt
-
-            # 调用实际的图片生成函数
-            # 使用asyncio.run()运行异步函数
-            result = asyncio.run(generate_image(
-                cookies=account_info['cookies'],
-                username=account_info['username'],
-                password=account_info['password'],
-                prompt=effective_prompt,
-                image_path=image_path,
-                headless=self._get_browser_headless(),
-                account_id=account_info['id']
-            ))
-            
-            # 如果生成成功，添加记录到数据库
-            if result.get('success'):
-                add_record(account_info['id'], 1)  # 1代表图片类型
-            
-            return result
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-
-    def _on_image_generate_finished(self, future, button, row):
-        """图片生成完成回调（支持失败自动重试，最多三次）"""
-        try:
-            result = future.result()
-            if result.get('success'):
-                self.status_message_signal.emit("图片生成完成")
-                self._show_message_in_main_thread("成功", "图片生成完成")
-                # 如果有生成的图片URL，更新UI显示
-                image_urls = result.get('image_urls', [])
-                if image_urls:
-                    if row < len(self.current_files):
-                        file_info = self.current_files[row]
-                        folder_path = str(self.generated_images_dir)
-                        # 下载并保存图片
-                        for i, url in enumerate(image_urls):
-                            try:
-                                response = requests.get(url, stream=True)
-                                if response.status_code == 200:
-                                    new_image_name = f"generated_{int(time.time())}_{i+1}.jpg"
-                                    new_image_path = os.path.join(folder_path, new_image_name)
-                                    with open(new_image_path, 'wb') as f:
-                                        for chunk in response.iter_content(1024):
-                                            f.write(chunk)
-                                    # 发出信号，在主线程中更新UI
-                                    self.image_generated_signal.emit(row, new_image_path)
-                            except Exception as e:
-                                logger.error(f"下载或保存图片失败: {e}")
-            else:
-                # 失败：尝试重试（最多三次）
-                attempts = self._image_retry_counts.get(row, 0)
-                if attempts < 3:
-                    self._image_retry_counts[row] = attempts + 1
-                    try:
-                        prompt = get_config('image_prompt', '')
-                        if not prompt or row >= len(self.current_files):
-                            raise RuntimeError('缺少提示词或行越界')
-                        image_path = self.current_files[row].get('main_image')
-                        if not image_path or not os.path.exists(image_path):
-                            raise RuntimeError('主图路径无效，无法重试')
-                        global thread_pool
-                        if not thread_pool:
-                            raise RuntimeError('线程池不可用')
-                        # 保持按钮禁用与“正在生成”状态，不进行重置
-                        self.status_message_signal.emit(f"图片生成失败，重试第{attempts + 1}次")
-                        future2 = thread_pool.submit(self._generate_image_task, image_path, prompt, row)
-                        future2.add_done_callback(lambda f, btn=button, r=row: self._on_image_generate_finished(f, btn, r))
-                        return
-                    except Exception as e:
-                        err = result.get('error', '未知错误')
-                        self.status_message_signal.emit(f"图片生成失败，无法重试: {err}")
-                        self._show_message_in_main_thread("失败", f"图片生成失败: {err}")
-                else:
-                    err = result.get('error', '未知错误')
-                    self.status_message_signal.emit("图片生成失败，已达最大重试次数")
-                    self._show_message_in_main_thread("失败", f"图片生成失败(已重试3次): {err}")
-        except Exception as e:
-            self._show_message_in_main_thread("失败", f"处理生成结果时出错: {e}")
-            self.status_message_signal.emit("处理结果失败")
-        # 在成功或最终失败后，才重置按钮与刷新账号列表
-        try:
-            is_success = False
-            try:
-                is_success = bool(future.result().get('success'))
-            except Exception:
-                is_success = False
-            attempts = self._image_retry_counts.get(row, 0)
-            if is_success or attempts >= 3:
-                if row in self._image_retry_counts:
-                    del self._image_retry_counts[row]
-                self.reset_button_signal.emit(button, "生成图片", "#007bff")
-                self.refresh_accounts_signal.emit()
-        except Exception:
-            pass
-
-    def add_image_to_gallery(self, row, image_path):
+    def add_image_to_gallery(self, row_id, image_path):
         """将图片添加到指定行的图库中"""
-        logger.info(f"add_image_to_gallery called on thread: {threading.current_thread().name} for row {row}")
         try:
-            model_widget = self.files_table.cellWidget(row, 1)
-            if not model_widget:
-                logger.error(f"No cell widget found at row {row}, column 1.")
+            record = self.row_store.get(row_id)
+            if record is None:
                 return
-
-            layout = model_widget.layout()
-            if not layout:
-                logger.error(f"No layout found in cell widget at row {row}, column 1.")
+            if len(record.model_images) >= MODEL_SLOTS:
+                logger.warning(f"No empty image slot found in row {row_id}.")
                 return
-
-            for i in range(layout.count()):
-                item = layout.itemAt(i)
-                if item and item.widget():
-                    image_label = item.widget()
-                    if isinstance(image_label, ClickableLabel):
-                        current_pixmap = image_label.pixmap()
-                        is_empty = (current_pixmap is None) or getattr(current_pixmap, "isNull", lambda: True)()
-                        if is_empty:
-                            logger.info(f"Found empty image label at index {i} in row {row}. Setting pixmap.")
-                            pixmap = QPixmap(image_path)
-                            pixmap = pixmap.scaled(130, 130, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                            image_label.setPixmap(pixmap)
-                            image_label.setText("")
-                            image_label.image_path = image_path
-                            # 若尚未选择模特图，则自动选择第一个生成的
-                            try:
-                                if 0 <= row < len(self.current_files):
-                                    current_selected = self.current_files[row].get('selected_model_image')
-                                    if not current_selected or not os.path.exists(current_selected):
-                                        # 清除其他选中样式
-                                        for j in range(layout.count()):
-                                            it2 = layout.itemAt(j)
-                                            if it2 and it2.widget():
-                                                self._set_model_label_selected(it2.widget(), False)
-                                        # 设置当前为选中
-                                        self._set_model_label_selected(image_label, True)
-                                        self.current_files[row]['selected_model_image'] = image_path
-                                        # 更新该行的视频生成按钮状态
-                                        self._update_video_button_state(row)
-                            except Exception as e:
-                                logger.error(f"自动选择首个生成模特图失败: {e}")
-                            return
-
-            logger.warning(f"No empty image label found in row {row}.")
-
+            changes = {'model_images': record.model_images + [image_path]}
+            # 若尚未选择模特图，则自动选择第一个生成的
+            if not record.selected_model_image or not record.selected_exists:
+                changes['selected_slot'] = len(record.model_images)
+                changes['selected_model_image'] = image_path
+            self._update_row(record, **changes)
         except Exception as e:
             logger.error(f"添加图片到图库失败: {e}")
 
-    def _update_video_cell(self, row, video_path):
+    def _update_video_cell(self, row_id, video_path):
         """在主线程更新指定行的视频单元格展示与状态"""
-        try:
-            # 记录到数据结构中，便于后续操作
-            if 0 <= row < len(self.current_files):
-                self.current_files[row]['video_path'] = video_path
+        record = self.row_store.get(row_id)
+        if record is not None:
+            self._update_row(record, video_path=video_path)
 
-            video_widget = self.files_table.cellWidget(row, 2)
-            if video_widget is None:
-                logger.error(f"Row {row} 的视频单元未找到")
-                return
-
-            v_layout = video_widget.layout()
-            if v_layout is None or v_layout.count() < 2:
-                logger.error(f"Row {row} 的视频单元布局异常")
-                return
-
-            video_label = v_layout.itemAt(0).widget()
-            video_status = v_layout.itemAt(1).widget()
-            if isinstance(video_status, QLabel):
-                video_status.setText("已生成")
-            if isinstance(video_label, QLabel):
-                # 展示用于生成视频的图片作为预览
-                preview_path = None
-                if 0 <= row < len(self.current_files):
-                    preview_path = self.current_files[row].get('selected_model_image')
-                    if not preview_path or not os.path.exists(preview_path):
-                        preview_path = self.current_files[row].get('main_image')
-                if preview_path and os.path.exists(preview_path):
-                    try:
-                        pixmap = QPixmap(preview_path)
-                        pixmap = pixmap.scaled(video_label.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                        video_label.setPixmap(pixmap)
-                        video_label.setText("")
-                        video_label.setToolTip("点击播放")
-                    except Exception as e:
-                        logger.error(f"设置视频预览图失败: {e}")
-                        video_label.setText("视频\n已生成")
-                else:
-                    video_label.setText("视频\n已生成")
-
-                # 记录路径以便点击时打开
-                setattr(video_label, 'video_path', video_path)
-                # 对于可点击标签，设置其image_path用于clicked信号传递
-                try:
-                    video_label.image_path = video_path
-                except Exception:
-                    pass
-        except Exception as e:
-            logger.error(f"更新视频单元格失败: {e}")
-
-    def on_video_label_clicked(self, row: int, video_path: str):
+    def on_video_label_clicked(self, row: int):
         """点击视频标签后，调用系统播放器播放该视频"""
         try:
-            # 如果未通过信号获取到路径，回退到当前行记录
-            if not video_path and 0 <= row < len(self.current_files):
-                video_path = self.current_files[row].get('video_path', '')
-
+            video_path = self.row_store.at(row).video_path if 0 <= row < len(self.row_store) else None
             if video_path and os.path.exists(video_path):
                 QDesktopServices.openUrl(QUrl.fromLocalFile(video_path))
             else:
@@ -2164,304 +2092,78 @@ class MainWindow(QMainWindow):
             logger.error(f"打开视频失败: {e}")
             QMessageBox.critical(self, "错误", f"打开视频失败: {e}")
 
-    def _reset_generate_button(self, button, text, color):
-        """重置生成按钮状态"""
-        if button:
-            button.setText(text)
-            button.setEnabled(True)
-            button.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {color};
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    padding: 8px;
-                    font-size: 11px;
-                    font-weight: bold;
-                }}
-                QPushButton:hover {{
-                    background-color: {self._darken_color(color)};
-                }}
-            """)
-
-    def _darken_color(self, color):
-        """简单颜色加深函数"""
-        if color == "#007bff":
-            return "#0056b3"
-        elif color == "#28a745":
-            return "#1e7e34"
-        else:
-            return color
-
-    def generate_video(self, row, button):
-        """生成视频"""
-        if row < len(self.current_files):
-            file = self.current_files[row]
-            # 从数据库获取提示词
+    def generate_video(self, row_id, interactive=True):
+        """
+        生成视频
+        :param interactive: 按钮点击为 True（检查未通过时弹窗）；批量与自动提交为 False（记入通知记录并跳过，
+                            账号检查结果在 VIDEO_ACCOUNT_CHECK_TTL 内复用）
+        :return: 任务已提交到生成引擎时返回 True
+        """
+        record = self.row_store.get(row_id)
+        if record is not None:
+            # 预检查：提示词、账号可用性、选中模特图存在性
+            problem = self._video_job_problem(record, 0.0 if interactive else VIDEO_ACCOUNT_CHECK_TTL)
+            if problem:
+                self._skip_job(record, problem, interactive)
+                return False
             prompt = get_config('video_prompt', '')
-            
-            if not prompt:
-                QMessageBox.warning(self, "警告", "请输入视频提示词")
-                return
-
-            # 重置该行的重试计数
-            try:
-                self._video_retry_counts[row] = 0
-            except Exception:
-                pass
-
-            # 预检查：账号可用性
-            try:
-                account_check = get_video_account()
-            except Exception as e:
-                account_check = None
-                logger.error(f"获取视频账号失败: {e}")
-            if not account_check:
-                QMessageBox.warning(self, "警告", "没有可用的视频账号")
-                return
-
-            # 预检查：选中模特图存在性
-            image_path = file.get('selected_model_image')
-            if not image_path or not os.path.exists(image_path):
-                QMessageBox.warning(self, "警告", "请先选择已生成的模特图，才能生成视频")
-                return
+            image_path = record.selected_model_image
                 
             # 更新按钮状态
-            button.setText("正在生成")
-            button.setEnabled(False)
-            button.setStyleSheet("""
-                QPushButton {
-                    background-color: #6c757d;
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    padding: 8px;
-                    font-size: 11px;
-                    font-weight: bold;
-                }
-            """)
+            self._set_row_busy(record, 'video', True)
             
             # 显示进度提示
-            self.status_message_signal.emit("正在生成视频...")
-            
-            # 在线程中执行视频生成
-            def _generate_video_task():
-                try:
-                    # 获取可用的视频账号
-                    account_info = get_video_account()
-                    if not account_info:
-                        return {"success": False, "error": "没有可用的视频账号"}
-
-                    # 获取视频时长配置
-                    duration_cfg = get_config('video_duration', '5')
-                    try:
-                        seconds = int(duration_cfg)
-                    except (ValueError, TypeError):
-                        seconds = 5
-
-                    # 使用选中的模特图作为输入
-                    image_path = file.get('selected_model_image')
-                    if not image_path or not os.path.exists(image_path):
-                        return {"success": False, "error": "模特图未生成或未选择，无法生成视频"}
-
-                    # 调用实际的视频生成函数（异步）
-                    result = asyncio.run(generate_video_async(
-                        cookies=account_info['cookies'],
-                        username=account_info['username'],
-                        password=account_info['password'],
-                        prompt=prompt,
-                        seconds=seconds,
-                        image_path=image_path,
-                        headless=self._get_browser_headless(),
-                        account_id=account_info['id']
-                    ))
-
-                    # 如果生成成功，添加记录到数据库
-                    if result.get('success'):
-                        add_record(account_info['id'], 2)  # 2代表视频类型
-
-                    return result
-                except Exception as e:
-                    return {"success": False, "error": str(e)}
-            
-            # 使用线程池执行任务
-            global thread_pool
-            if thread_pool:
-                future = thread_pool.submit(_generate_video_task)
-                # 添加回调处理结果（带行号）
-                future.add_done_callback(lambda f, btn=button, r=row: self._on_video_generate_finished(f, btn, r))
-            else:
-                QMessageBox.critical(self, "错误", "线程池不可用")
+            self.ui_events.status("正在生成视频...")
+
+            # 使用主图的文件夹名作为视频文件名
+            folder_name = None
+            if record.folder_path:
+                folder_name = os.path.basename(record.folder_path)
+            elif record.main_image:
+                folder_name = os.path.basename(os.path.dirname(record.main_image))
+
+            # 提交任务到生成引擎
+            job = {
+                'job_id': uuid.uuid4().hex,
+                'kind': 'video',
+                'row_id': record.row_id,
+                'image_path': image_path,
+                'prompt': prompt,
+                'headless': self._get_browser_headless(),
+                'output_dir': str(self.generated_videos_dir),
+                'folder_name': folder_name,
+            }
+            if not self.engine.submit(job):
+                self._skip_job(record, "生成引擎不可用", interactive, critical=True)
                 # 恢复按钮状态
-                self._reset_generate_button(button, "生成视频", "#28a745")
-
-    def _on_video_generate_finished(self, future, button, row):
-        """视频生成完成回调（支持失败自动重试，最多三次）"""
-        try:
-            result = future.result()
-            if result.get('success'):
-                # 通过信号更新状态栏，确保在主线程执行
-                self.status_message_signal.emit("视频生成完成")
-                # 使用信号在主线程中显示消息框
-                self._show_message_in_main_thread("成功", "视频生成完成")
-
-                # 如有视频URL，下载并保存到项目根目录 generated_videos
-                video_url = result.get('video_url')
-                if video_url:
-                    try:
-                        response = requests.get(video_url, stream=True)
-                        if response.status_code == 200:
-                            # 推断扩展名，默认.mp4
-                            base = os.path.basename(video_url)
-                            ext = os.path.splitext(base)[1] or '.mp4'
-                            # 使用主图的文件夹名作为视频文件名
-                            folder_name = None
-                            try:
-                                if 0 <= row < len(self.current_files):
-                                    folder_path = self.current_files[row].get('folder_path')
-                                    if folder_path:
-                                        folder_name = os.path.basename(folder_path)
-                                # 兜底：从主图路径推断父文件夹名
-                                if not folder_name:
-                                    main_image_path = self.current_files[row].get('main_image') if 0 <= row < len(self.current_files) else None
-                                    if main_image_path:
-                                        folder_name = os.path.basename(os.path.dirname(main_image_path))
-                            except Exception:
-                                folder_name = None
-
-                            base_name = folder_name or f"generated_{int(time.time())}"
-                            new_video_name = f"{base_name}{ext}"
-                            new_video_path = os.path.join(str(self.generated_videos_dir), new_video_name)
-                            # 如果文件已存在，追加序号避免覆盖
-                            if os.path.exists(new_video_path):
-                                idx = 1
-                                while True:
-                                    alt_name = f"{base_name}_{idx}{ext}"
-                                    alt_path = os.path.join(str(self.generated_videos_dir), alt_name)
-                                    if not os.path.exists(alt_path):
-                                        new_video_name = alt_name
-                                        new_video_path = alt_path
-                                        break
-                                    idx += 1
-                            with open(new_video_path, 'wb') as f:
-                                for chunk in response.iter_content(1024 * 64):
-                                    f.write(chunk)
-                            # 通过信号在主线程更新UI
-                            self.video_generated_signal.emit(row, new_video_path)
-                    except Exception as e:
-                        logger.error(f"下载或保存视频失败: {e}")
-                else:
-                    # 即使未能获取到URL，也更新前端状态为已完成
-                    self.video_generated_signal.emit(row, "")
-            else:
-                # 失败：尝试重试（最多三次）
-                attempts = self._video_retry_counts.get(row, 0)
-                if attempts < 3:
-                    self._video_retry_counts[row] = attempts + 1
-                    try:
-                        # 准备重试所需参数
-                        account_info = get_video_account()
-                        if not account_info:
-                            raise RuntimeError('没有可用的视频账号')
-                        duration_cfg = get_config('video_duration', '5')
-                        try:
-                            seconds = int(duration_cfg)
-                        except (ValueError, TypeError):
-                            seconds = 5
-                        prompt = get_config('video_prompt', '')
-                        if not prompt:
-                            raise RuntimeError('请输入视频提示词')
-                        if row >= len(self.current_files):
-                            raise RuntimeError('行越界')
-                        file = self.current_files[row]
-                        image_path = file.get('selected_model_image')
-                        if not image_path or not os.path.exists(image_path):
-                            raise RuntimeError('模特图未生成或未选择，无法生成视频')
-
-                        global thread_pool
-                        if not thread_pool:
-                            raise RuntimeError('线程池不可用')
-
-                        # 保持按钮禁用与“正在生成”状态，不进行重置
-                        self.status_message_signal.emit(f"视频生成失败，重试第{attempts + 1}次")
-
-                        def _retry_video_task():
-                            try:
-                                result_local = asyncio.run(generate_video_async(
-                                    cookies=account_info['cookies'],
-                                    username=account_info['username'],
-                                    password=account_info['password'],
-                                    prompt=prompt,
-                                    seconds=seconds,
-                                    image_path=image_path,
-                                    headless=self._get_browser_headless(),
-                                    account_id=account_info['id']
-                                ))
-                                if result_local.get('success'):
-                                    add_record(account_info['id'], 2)
-                                return result_local
-                            except Exception as e:
-                                return {"success": False, "error": str(e)}
-
-                        future2 = thread_pool.submit(_retry_video_task)
-                        future2.add_done_callback(lambda f, btn=button, r=row: self._on_video_generate_finished(f, btn, r))
-                        return
-                    except Exception as e:
-                        err = result.get('error', '未知错误')
-                        status_bar = self.statusBar()
-                        if status_bar is not None:
-                            status_bar.showMessage(f"视频生成失败，无法重试: {err}")
-                        self._show_message_in_main_thread("错误", f"视频生成失败: {err}")
-                else:
-                    err = result.get('error', '未知错误')
-                    status_bar = self.statusBar()
-                    if status_bar is not None:
-                        status_bar.showMessage("视频生成失败，已达最大重试次数")
-                    self._show_message_in_main_thread("错误", f"视频生成失败(已重试3次): {err}")
-        except Exception as e:
-            status_bar = self.statusBar()
-            if status_bar is not None:
-                status_bar.showMessage(f"视频生成异常: {str(e)}")
-            self._show_message_in_main_thread("错误", f"视频生成异常: {str(e)}")
-        # 在成功或最终失败后，才重置按钮与刷新账号列表
-        try:
-            is_success = False
-            try:
-                is_success = bool(future.result().get('success'))
-            except Exception:
-                is_success = False
-            attempts = self._video_retry_counts.get(row, 0)
-            if is_success or attempts >= 3:
-                if row in self._video_retry_counts:
-                    del self._video_retry_counts[row]
-                self.reset_button_signal.emit(button, "生成视频", "#28a745")
-                self.refresh_accounts_signal.emit()
-        except Exception:
-            pass
+                self._set_row_busy(record, 'video', False)
+                return False
+            self._track_job(job)
+            return True
+        return False
 
-    def delete_item(self, row):
+    def delete_item(self, row_id):
         """删除项目"""
-        if row < len(self.current_files):
+        record = self.row_store.get(row_id)
+        if record is not None:
             reply = QMessageBox.question(self, "确认", "确定要删除这个项目吗？", 
                                        QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
             if reply == QMessageBox.StandardButton.Yes:
+                # 先取消该行的生成任务，避免继续占用账号额度并为已删除的行发布结果
+                self.cancel_row_jobs(row_id)
                 try:
                     # 删除文件系统中的文件
-                    file = self.current_files[row]
-                    if os.path.exists(file['main_image']):
+                    if os.path.exists(record.main_image):
                         # 删除主图文件
-                        os.remove(file['main_image'])
+                        os.remove(record.main_image)
                         # 同时删除对应的文件夹
-                        folder_path = os.path.dirname(file['main_image'])
+                        folder_path = os.path.dirname(record.main_image)
                         if os.path.exists(folder_path) and os.path.isdir(folder_path):
                             import shutil
                             shutil.rmtree(folder_path)
                     
-                    # 从列表中移除
-                    del self.current_files[row]
-                    
-                    # 重新显示
-                    self.display_folder_content(self.current_files)
+                    # 从表格中移除（只通知被删除的行；其他行按 ID 记录的状态不受影响）
+                    self.product_model.remove_row(self.row_store.index_of(row_id))
                     status_bar = self.statusBar()
                     if status_bar is not None:
                         status_bar.showMessage("项目已删除")
@@ -2470,7 +2172,7 @@ class MainWindow(QMainWindow):
                     
     def batch_generate_images(self):
         """批量生成图片"""
-        if not self.current_files:
+        if not len(self.row_store):
             QMessageBox.warning(self, "警告", "请先导入文件夹")
             return
             
@@ -2482,48 +2184,20 @@ class MainWindow(QMainWindow):
             
         # 直接在主线程触发每一行的图片生成（生成过程仍在线程池中执行）
         triggered = 0
-        for row in range(len(self.current_files)):
+        # 按状态索引取图片未在生成中的行（视频生成中的行也可以重新生成图片）
+        for record in self.row_store.query(*(status for status in STATUSES if status != STATUS_IMAGING)):
             try:
-                action_widget = self.files_table.cellWidget(row, 3)
-                if not action_widget:
-                    continue
-                layout = action_widget.layout()
-                if not layout:
-                    continue
-                image_btn = None
-                for i in range(layout.count()):
-                    itm = layout.itemAt(i)
-                    if itm and itm.widget() and isinstance(itm.widget(), QPushButton):
-                        w = itm.widget()
-                        if w.objectName() == "generate_image_btn":
-                            image_btn = w
-                            break
-                if image_btn is not None and image_btn.isEnabled():
-                    self.generate_image(row, image_btn)
+                if not record.image_busy and self.generate_image(record.row_id, interactive=False):
                     triggered += 1
             except Exception as e:
-                logger.error(f"触发第{row}行图片生成失败: {e}")
+                logger.error(f"触发 {record.row_id} 图片生成失败: {e}")
 
         # 通过状态栏/信号提示批量触发完成
         self.status_message_signal.emit(f"图片批量生成已触发: {triggered} 行")
             
-    def _on_batch_images_finished(self, future):
-        """批量图片生成完成回调"""
-        try:
-            result = future.result()
-            if result.get('success'):
-                success_count = result.get('success_count', 0)
-                failed_count = result.get('failed_count', 0)
-                # 使用主线程信号更新状态栏，避免跨线程UI操作
-                self.status_message_signal.emit(f"批量图片生成完成: 成功{success_count}个，失败{failed_count}个")
-            else:
-                self.status_message_signal.emit(f"批量图片生成失败: {result.get('message', '未知错误')}")
-        except Exception as e:
-            self.status_message_signal.emit(f"批量图片生成异常: {str(e)}")
-            
     def batch_generate_videos(self):
         """批量生成视频"""
-        if not self.current_files:
+        if not len(self.row_store):
             QMessageBox.warning(self, "警告", "请先导入文件夹")
             return
             
@@ -2535,54 +2209,21 @@ class MainWindow(QMainWindow):
         
         # 仅触发可生成的行（存在有效的selected_model_image）
         triggered = 0
-        skipped = 0
-        for row in range(len(self.current_files)):
+        candidates = self.row_store.with_selection()
+        skipped = len(self.row_store) - len(candidates)
+        for record in candidates:
             try:
-                selected_path = self.current_files[row].get('selected_model_image')
-                if not selected_path or not os.path.exists(selected_path):
-                    skipped += 1
-                    continue
-                action_widget = self.files_table.cellWidget(row, 3)
-                if not action_widget:
-                    skipped += 1
-                    continue
-                layout = action_widget.layout()
-                if not layout:
-                    skipped += 1
-                    continue
-                video_btn = None
-                for i in range(layout.count()):
-                    itm = layout.itemAt(i)
-                    if itm and itm.widget() and isinstance(itm.widget(), QPushButton):
-                        w = itm.widget()
-                        if w.objectName() == "generate_video_btn":
-                            video_btn = w
-                            break
-                if video_btn is not None and video_btn.isEnabled():
-                    self.generate_video(row, video_btn)
+                if video_enabled(record) and not record.video_busy \
+                        and self.generate_video(record.row_id, interactive=False):
                     triggered += 1
                 else:
                     skipped += 1
             except Exception as e:
-                logger.error(f"触发第{row}行视频生成失败: {e}")
+                logger.error(f"触发 {record.row_id} 视频生成失败: {e}")
                 skipped += 1
 
         self.status_message_signal.emit(f"视频批量生成已触发: 成功{triggered}个，跳过{skipped}个")
             
-    def _on_batch_videos_finished(self, future):
-        """批量视频生成完成回调"""
-        try:
-            result = future.result()
-            if result.get('success'):
-                success_count = result.get('success_count', 0)
-                failed_count = result.get('failed_count', 0)
-                # 使用主线程信号更新状态栏，避免跨线程UI操作
-                self.status_message_signal.emit(f"批量视频生成完成: 成功{success_count}个，失败{failed_count}个")
-            else:
-                self.status_message_signal.emit(f"批量视频生成失败: {result.get('message', '未知错误')}")
-        except Exception as e:
-            self.status_message_signal.emit(f"批量视频生成异常: {str(e)}")
-
     def save_image_prompt(self):
         """保存图片提示词"""
         # 从设置界面获取提示词
@@ -2624,6 +2265,7 @@ class MainWindow(QMainWindow):
                 self.browser_headless_checkbox.setChecked(is_headless)
             except Exception:
                 pass
+            self.image_letterbox_checkbox.setChecked(str(configs.get('image_letterbox', '0')).strip() == '1')
             
             # 视频时长设置
             video_duration = configs.get('video_duration', '5')
@@ -2636,6 +2278,7 @@ class MainWindow(QMainWindow):
             self.max_threads_spin.setValue(int(configs.get('max_threads', '5')))
             self.daily_video_limit_spin.setValue(int(configs.get('daily_video_limit', '2')))
             self.daily_image_limit_spin.setValue(int(configs.get('daily_image_limit', '10')))
+            self.job_timeout_spin.setValue(int(configs.get('job_timeout', '20')))
 
     def save_settings(self):
         """保存设置"""
@@ -2652,6 +2295,7 @@ class MainWindow(QMainWindow):
                 set_config('browser_headless', '1' if self.browser_headless_checkbox.isChecked() else '0')
             except Exception:
                 pass
+            set_config('image_letterbox', '1' if self.image_letterbox_checkbox.isChecked() else '0')
             
             # 保存视频时长
             video_duration = '10' if self.video_duration_10.isChecked() else '5'
@@ -2661,6 +2305,7 @@ class MainWindow(QMainWindow):
             set_config('max_threads', str(self.max_threads_spin.value()))
             set_config('daily_video_limit', str(self.daily_video_limit_spin.value()))
             set_config('daily_image_limit', str(self.daily_image_limit_spin.value()))
+            set_config('job_timeout', str(self.job_timeout_spin.value()))
             
             status_bar = self.statusBar()
             if status_bar is not None:
@@ -2750,13 +2395,7 @@ class MainWindow(QMainWindow):
         
     def delete_selected_accounts(self):
         """删除选中账号"""
-        selected_ids = []
-        for row in range(self.accounts_table.rowCount()):
-            checkbox = self.accounts_table.cellWidget(row, 0)
-            if checkbox and isinstance(checkbox, QCheckBox) and checkbox.isChecked():
-                item = self.accounts_table.item(row, 1)
-                if item:
-                    selected_ids.append(int(item.text()))
+        selected_ids = self.accounts_model.checked_ids()
         
         if selected_ids:
             reply = QMessageBox.question(self, "确认", f"确定要删除选中的 {len(selected_ids)} 个账号吗？", 
@@ -2779,41 +2418,20 @@ class MainWindow(QMainWindow):
             check = bool(self.select_all_checkbox.isChecked())
         except Exception:
             check = False
-        try:
-            for row in range(self.accounts_table.rowCount()):
-                widget = self.accounts_table.cellWidget(row, 0)
-                if widget and isinstance(widget, QCheckBox):
-                    widget.setChecked(check)
-        except Exception:
-            pass
-        
-    def refresh_accounts(self):
-        """刷新账号列表"""
+        self.accounts_model.set_all_checked(check)
+        
+    def refresh_accounts(self, silent=False):
+        """
+        刷新账号列表
+        :param silent: 引擎事件触发的自动刷新：保留勾选，不提示
+        """
+        self._accounts_refresh_timer.stop()
+        self._accounts_refreshed_at = time.monotonic()
         try:
             accounts = get_accounts_with_usage()
-            self.accounts_table.setRowCount(len(accounts))
-            
-            for row, account in enumerate(accounts):
-                # 选择列
-                checkbox = QCheckBox()
-                self.accounts_table.setCellWidget(row, 0, checkbox)
-                
-                # ID列
-                id_item = QTableWidgetItem(str(account['id']))
-                self.accounts_table.setItem(row, 1, id_item)
-                
-                # 用户名列
-                username_item = QTableWidgetItem(account['username'])
-                self.accounts_table.setItem(row, 2, username_item)
-                
-                # 当日图片数列
-                image_count_item = QTableWidgetItem(str(account['image_count']))
-                self.accounts_table.setItem(row, 3, image_count_item)
-                
-                # 当日视频数列
-                video_count_item = QTableWidgetItem(str(account['video_count']))
-                self.accounts_table.setItem(row, 4, video_count_item)
-                
+            self.accounts_model.set_accounts(accounts, keep_checked=silent)
+            if silent:
+                return
             status_bar = self.statusBar()
             if status_bar is not None:
                 status_bar.showMessage(f"账号列表已刷新，共 {len(accounts)} 个账号")
@@ -2826,20 +2444,67 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
         except Exception as e:
-            QMessageBox.critical(self, "错误", f"刷新账号列表失败: {str(e)}")
+            if silent:
+                logger.error(f"刷新账号列表失败: {e}")
+            else:
+                QMessageBox.critical(self, "错误", f"刷新账号列表失败: {str(e)}")
+
+    def _on_accounts_changed(self, event):
+        """引擎报告账号变化：有账号ID时直接累加次数，否则安排一次合并刷新"""
+        if self.accounts_model.add_usage(event.get('account_id'), event.get('record_type')):
+            return
+        self._schedule_accounts_refresh()
+
+    def _schedule_accounts_refresh(self):
+        if self._accounts_refresh_timer.isActive():
+            return
+        elapsed_ms = (time.monotonic() - self._accounts_refreshed_at) * 1000
+        self._accounts_refresh_timer.start(max(0, int(ACCOUNTS_REFRESH_INTERVAL_MS - elapsed_ms)))
         
     def closeEvent(self, a0):
         """关闭事件"""
+        # 关闭生成引擎：取消全部任务并记录已提交的 task_id，数秒内退出
+        if getattr(self, 'engine', None):
+            self.engine.shutdown()
+            logger.info("生成引擎已关闭")
+        self.ui_events.stop()
+        self._stop_folder_watch()
+        if self._scan_thread is not None:
+            self._scan_thread.wait(3000)
+        get_asset_cache().log_stats()
+        shutdown_thumbnail_cache()
         # 关闭数据库连接
         close_database()
-        # 关闭线程池
-        global thread_pool
-        if thread_pool:
-            thread_pool.shutdown(wait=True)
-            logger.info("线程池已关闭")
         logger.info("应用关闭")
         super().closeEvent(a0)
 
+    def _render_progress(self, snapshot):
+        """按帧刷新进度条与计数"""
+        total = snapshot['total']
+        if not total:
+            return
+        self.batch_progress.setRange(0, total)
+        self.batch_progress.setValue(snapshot['finished'])
+        self.batch_counters.setText(
+            f"进行中 {snapshot['running']}  排队 {snapshot['queued']}  完成 {snapshot['done']}  "
+            f"失败 {snapshot['failed']}  取消 {snapshot['cancelled']}  预计剩余 {format_eta(snapshot['eta'])}"
+        )
+
+    def _append_notifications(self, lines):
+        for line in lines:
+            self.notification_log.appendPlainText(line)
+
+    def _on_batch_finished(self, summary):
+        """一批任务全部结束：记录汇总并只提示一次"""
+        message = (f"本批 {summary['total']} 个任务已结束：成功 {summary['done']} 个，失败 {summary['failed']} 个，"
+                   f"取消 {summary['cancelled']} 个，用时 {format_eta(summary['elapsed'])}")
+        self.batch_counters.setText(message)
+        self.notification_log.appendPlainText(f"{time.strftime('%H:%M:%S')} {message}")
+        if summary['done'] or summary['failed']:
+            if summary['failed']:
+                message += "\n失败原因见首页的通知记录"
+            self._show_message_in_main_thread("失败" if summary['failed'] and not summary['done'] else "完成", message)
+
     def _show_message_in_main_thread(self, title, message):
         """在主线程中显示消息框"""
         # 使用QTimer在主线程中执行UI操作
@@ -2860,4 +2525,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    # 打包为 EXE 后启动引擎子进程需要
+    multiprocessing.freeze_support()
     main()
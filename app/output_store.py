@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+生成结果存储
+下载完成的图片/视频按内容哈希命名并分片存放（<输出目录>/<哈希前两位>/<SKU>_<哈希>.<扩展名>）：
+- 文件名由内容决定，同一秒完成的并发任务不会互相覆盖，也无需探测文件名
+- 内容相同的结果只保存一份
+- 每个结果在数据库中登记 SKU、任务、账号与源图，再次导入时按 SKU 恢复到对应行
+"""
+
+import os
+import re
+import time
+import uuid
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from database import logger, add_output_asset, find_output_asset
+
+# 下载中的临时文件目录（与输出目录同一文件系统，保证重命名是原子的）
+INCOMING_DIR = '.incoming'
+
+# 文件名中保留的哈希长度
+NAME_HASH_LENGTH = 16
+
+# 临时目录中超过该时长（秒）的文件视为中断遗留（进程崩溃时未完成的下载/发布），初始化时清理
+STALE_INCOMING_SECONDS = 3600
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _safe_name(text: str) -> str:
+    """去除文件名中不允许的字符"""
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', text).strip('._')[:60]
+
+
+class OutputStore:
+    """某个输出目录下的内容寻址存储"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._sweep_incoming()
+
+    def _sweep_incoming(self):
+        """清理中断遗留的临时文件（保留较新的，以免误删其他进程正在写入的下载）"""
+        incoming = os.path.join(self.root, INCOMING_DIR)
+        cutoff = time.time() - STALE_INCOMING_SECONDS
+        removed = 0
+        try:
+            with os.scandir(incoming) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                            os.remove(entry.path)
+                            removed += 1
+                    except OSError:
+                        pass
+        except OSError:
+            return
+        if removed:
+            logger.info(f"已清理 {removed} 个中断遗留的临时文件: {incoming}")
+
+    def incoming_path(self, ext: str) -> str:
+        """为一次下载分配唯一的临时路径"""
+        incoming = os.path.join(self.root, INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        return os.path.join(incoming, f"{uuid.uuid4().hex}{ext}")
+
+    def final_path(self, digest: str, ext: str, sku: Optional[str] = None) -> str:
+        prefix = _safe_name(sku) if sku else ''
+        name = f"{prefix}_{digest[:NAME_HASH_LENGTH]}{ext}" if prefix else f"{digest}{ext}"
+        return os.path.join(self.root, digest[:2], name)
+
+    def publish(self, tmp_path: str, kind: str, sku: Optional[str] = None, row_id: Optional[str] = None,
+                job_id: Optional[str] = None, account_id: Optional[int] = None,
+                source: Optional[str] = None, url: Optional[str] = None) -> str:
+        """
+        把下载好的临时文件放入存储并登记；内容已存在时复用已有文件
+        :return: 最终文件路径
+        """
+        ext = os.path.splitext(tmp_path)[1].lower()
+        digest = file_digest(tmp_path)
+        with self._lock:
+            existing = find_output_asset(digest, kind)
+            if existing and os.path.exists(existing):
+                final = existing
+                os.remove(tmp_path)
+                logger.info(f"生成结果与已有文件相同，复用: {final}")
+            else:
+                final = self.final_path(digest, ext, sku)
+                os.makedirs(os.path.dirname(final), exist_ok=True)
+                if os.path.exists(final):
+                    os.remove(tmp_path)
+                else:
+                    os.replace(tmp_path, final)
+            add_output_asset(digest=digest, path=final, kind=kind, sku=sku, row_id=row_id,
+                             job_id=job_id, account_id=account_id, source=source, url=url)
+        return final
+
+
+_stores: Dict[str, OutputStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_output_store(root: str) -> OutputStore:
+    """按输出目录共享存储实例"""
+    root = os.path.abspath(root)
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = _stores[root] = OutputStore(root)
+        return store
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+商品表格（模型/视图）
+原先每行创建主图、四个模特图槽位、视频单元与操作按钮共十余个带样式表的控件，
+上千行时内存与布局耗时线性增长。这里改为：
+- ProductTableModel：以 RowStore 为数据源，增删改只通知受影响的行
+- ProductDelegate：按列绘制主图、模特图、视频与按钮，只绘制可见行；
+  缩略图通过缩略图加载器按需获取，点击通过命中测试转换为信号（行号在点击时解析，删除行后不会错位）
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QRect, QSize, QEvent, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QPainter, QPen
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyle
+
+from row_store import ProductRow, RowStore, MODEL_SLOTS
+
+# 行高（像素）
+ROW_HEIGHT = 180
+
+COLUMNS = ["主图", "模特图", "视频", "操作"]
+COL_MAIN, COL_MODELS, COL_VIDEO, COL_ACTIONS = range(len(COLUMNS))
+
+# 固定列宽
+COLUMN_WIDTHS = {COL_MAIN: 160, COL_VIDEO: 140, COL_ACTIONS: 140}
+
+# 操作按钮：动作、文字、颜色
+ACTION_IMAGE = 'generate_image'
+ACTION_VIDEO = 'generate_video'
+ACTION_CANCEL = 'cancel'
+ACTION_DELETE = 'delete'
+ACTIONS = [
+    (ACTION_IMAGE, "生成图片", "#007bff"),
+    (ACTION_VIDEO, "生成视频", "#28a745"),
+    (ACTION_CANCEL, "取消", "#6c757d"),
+    (ACTION_DELETE, "删除", "#dc3545"),
+]
+
+# 行数据角色
+RowRole = Qt.ItemDataRole.UserRole + 1
+
+# 尺寸
+MAIN_THUMB = 140
+MODEL_THUMB = 100
+VIDEO_SIZE = (100, 80)
+BUTTON_SIZE = (100, 30)
+SPACING = 10
+
+_BORDER = QColor("#dee2e6")
+_DASHED = QColor("#ced4da")
+_SELECTED = QColor("#007bff")
+_BACKGROUND = QColor("#f8f9fa")
+_MUTED = QColor("#6c757d")
+_TEXT = QColor("#495057")
+_DISABLED = QColor("#adb5bd")
+
+
+def _elide(name: str, limit: int = 20) -> str:
+    return name[:limit] + "..." if len(name) > limit else name
+
+
+def video_enabled(row: ProductRow) -> bool:
+    """已生成并选择模特图时才能生成视频"""
+    return bool(row.selected_model_image and row.selected_exists)
+
+
+class ProductTableModel(QAbstractTableModel):
+    """商品行模型，数据源为 RowStore"""
+
+    def __init__(self, store: Optional[RowStore] = None, parent=None):
+        super().__init__(parent)
+        self.store = store if store is not None else RowStore()
+
+    # ---- Qt 接口 ----
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.store):
+            return None
+        row = self.store.at(index.row())
+        if role == RowRole:
+            return row
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole) and index.column() == COL_MAIN:
+            return row.name
+        return None
+
+    def flags(self, index):
+        return Qt.ItemFlag.ItemIsEnabled if index.isValid() else Qt.ItemFlag.NoItemFlags
+
+    # ---- 行操作 ----
+
+    def set_rows(self, rows: Iterable[ProductRow]):
+        self.beginResetModel()
+        self.store.clear()
+        self.store.extend(rows)
+        self.endResetModel()
+
+    def append_rows(self, rows: Iterable[ProductRow]):
+        rows = [row for row in rows if row.row_id not in self.store]
+        if not rows:
+            return
+        start = len(self.store)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self.store.extend(rows)
+        self.endInsertRows()
+
+    def remove_row(self, row: int) -> Optional[ProductRow]:
+        if 0 <= row < len(self.store):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            removed = self.store.remove(self.store.at(row).row_id)
+            self.endRemoveRows()
+            return removed
+        return None
+
+    def row_changed(self, row: int, column: Optional[int] = None):
+        """通知某一行（或某一格）需要重绘"""
+        if 0 <= row < len(self.store):
+            first = column if column is not None else 0
+            last = column if column is not None else len(COLUMNS) - 1
+            self.dataChanged.emit(self.index(row, first), self.index(row, last))
+
+    def row_id_changed(self, row_id, column: Optional[int] = None):
+        index = self.store.index_of(row_id)
+        if index is not None:
+            self.row_changed(index, column)
+
+    def image_loaded(self, path: str, first: int, last: int):
+        """第 first~last 行中显示该图片的单元格重绘（缩略图加载完成后调用）"""
+        for row in range(max(first, 0), min(last, len(self.store) - 1) + 1):
+            info = self.store.at(row)
+            if path == info.main_image:
+                self.row_changed(row, COL_MAIN)
+            if path in info.model_images:
+                self.row_changed(row, COL_MODELS)
+            if info.video_path is not None and path in (info.selected_model_image, info.main_image):
+                self.row_changed(row, COL_VIDEO)
+
+    def rows_changed(self, first: int = 0, last: Optional[int] = None):
+        if len(self.store):
+            last = len(self.store) - 1 if last is None else last
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(COLUMNS) - 1))
+
+
+# ---- 单元格布局（绘制与点击共用） ----
+
+def main_image_rect(cell: QRect) -> QRect:
+    return QRect(cell.x() + (cell.width() - MAIN_THUMB) // 2, cell.y() + 5, MAIN_THUMB, MAIN_THUMB)
+
+
+def model_slot_rects(cell: QRect) -> List[QRect]:
+    total = MODEL_SLOTS * MODEL_THUMB + (MODEL_SLOTS - 1) * SPACING
+    x = cell.x() + max((cell.width() - total) // 2, 5)
+    y = cell.y() + (cell.height() - MODEL_THUMB) // 2
+    return [QRect(x + i * (MODEL_THUMB + SPACING), y, MODEL_THUMB, MODEL_THUMB) for i in range(MODEL_SLOTS)]
+
+
+def video_rect(cell: QRect) -> QRect:
+    w, h = VIDEO_SIZE
+    return QRect(cell.x() + (cell.width() - w) // 2, cell.y() + 25, w, h)
+
+
+def button_rects(cell: QRect) -> List[QRect]:
+    w, h = BUTTON_SIZE
+    x = cell.x() + (cell.width() - w) // 2
+    y = cell.y() + 15
+    return [QRect(x, y + i * (h + SPACING), w, h) for i in range(len(ACTIONS))]
+
+
+class ProductDelegate(QStyledItemDelegate):
+    """按列绘制商品行，并把点击转换为信号"""
+    main_image_clicked = pyqtSignal(int)
+    model_slot_clicked = pyqtSignal(int, int)
+    model_slot_double_clicked = pyqtSignal(int, int)
+    video_clicked = pyqtSignal(int)
+    action_triggered = pyqtSignal(int, str)
+
+    def __init__(self, thumbnails, parent=None):
+        """
+        :param thumbnails: 缩略图加载器，提供 pixmap(路径, 尺寸) -> QPixmap 或 None（未就绪时后台加载）
+        """
+        super().__init__(parent)
+        self.thumbnails = thumbnails
+        self._font = QFont()
+        self._font.setPointSize(9)
+        self._bold = QFont(self._font)
+        self._bold.setBold(True)
+
+    def sizeHint(self, option, index):
+        return QSize(COLUMN_WIDTHS.get(index.column(), 4 * (MODEL_THUMB + SPACING)), ROW_HEIGHT)
+
+    # ---- 绘制 ----
+
+    def paint(self, painter: QPainter, option, index):
+        info = index.data(RowRole)
+        if info is None:
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self._font)
+        if option.state & QStyle.StateFlag.State_MouseOver:
+            painter.fillRect(option.rect, QColor("#f1f3f5"))
+        column = index.column()
+        if column == COL_MAIN:
+            self._paint_main(painter, option.rect, info)
+        elif column == COL_MODELS:
+            self._paint_models(painter, option.rect, info)
+        elif column == COL_VIDEO:
+            self._paint_video(painter, option.rect, info)
+        elif column == COL_ACTIONS:
+            self._paint_actions(painter, option.rect, info)
+        painter.restore()
+
+    def _frame(self, painter: QPainter, rect: QRect, color: QColor, width: int = 1,
+               dashed: bool = False, radius: int = 4):
+        pen = QPen(color, width)
+        if dashed:
+            pen.setStyle(Qt.PenStyle.DashLine)
+        painter.setPen(pen)
+        painter.setBrush(_BACKGROUND)
+        painter.drawRoundedRect(rect.adjusted(0, 0, -1, -1), radius, radius)
+
+    def _image(self, painter: QPainter, rect: QRect, path: str, size: int) -> Optional[str]:
+        """在框内居中绘制缩略图；未能绘制时返回占位文字"""
+        pixmap = self.thumbnails.pixmap(path, size)
+        if pixmap is None:
+            return "加载中..."
+        if pixmap.isNull():
+            return "无图片"
+        x = rect.x() + (rect.width() - pixmap.width()) // 2
+        y = rect.y() + (rect.height() - pixmap.height()) // 2
+        painter.drawPixmap(x, y, pixmap)
+        return None
+
+    def _text(self, painter: QPainter, rect: QRect, text: str, color: QColor = _MUTED):
+        painter.setPen(color)
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter | Qt.TextFlag.TextWordWrap, text)
+
+    def _paint_main(self, painter, cell, info):
+        box = main_image_rect(cell)
+        path = info.main_image
+        exists = info.main_exists
+        self._frame(painter, box, _BORDER if exists else _DASHED, 2, dashed=not exists, radius=8)
+        placeholder = self._image(painter, box.adjusted(5, 5, -5, -5), path, 130) if exists else "无图片"
+        if placeholder:
+            self._text(painter, box, placeholder)
+        name_rect = QRect(cell.x() + 5, box.bottom() + 5, cell.width() - 10, cell.bottom() - box.bottom() - 5)
+        self._text(painter, name_rect, _elide(info.name), _TEXT)
+
+    def _paint_models(self, painter, cell, info):
+        images = info.model_images
+        selected = info.selected_slot
+        for i, rect in enumerate(model_slot_rects(cell)):
+            if i == selected:
+                self._frame(painter, rect, _SELECTED, 2)
+            else:
+                self._frame(painter, rect, _DASHED, 1, dashed=True)
+            if i < len(images):
+                placeholder = self._image(painter, rect.adjusted(2, 2, -2, -2), images[i], MODEL_THUMB - 4)
+            else:
+                placeholder = f"模特图{i + 1}\n待生成"
+            if placeholder:
+                self._text(painter, rect, placeholder)
+
+    def _paint_video(self, painter, cell, info):
+        box = video_rect(cell)
+        video_path = info.video_path
+        self._frame(painter, box, _DASHED, 1, dashed=not video_path)
+        if video_path is not None:
+            # 展示用于生成视频的图片作为预览
+            if info.selected_exists:
+                preview = info.selected_model_image
+            else:
+                preview = info.main_image if info.main_exists else None
+            if not preview or self._image(painter, box.adjusted(2, 2, -2, -2), preview, min(VIDEO_SIZE) - 4):
+                self._text(painter, box, "视频\n已生成")
+            status = "已生成"
+        else:
+            self._text(painter, box, "视频\n待生成")
+            status = "生成中..." if info.video_busy else "未生成"
+        self._text(painter, QRect(cell.x(), box.bottom() + 10, cell.width(), 20), status)
+
+    def _paint_actions(self, painter, cell, info):
+        states = action_states(info)
+        painter.setFont(self._bold)
+        for rect, (action, text, color) in zip(button_rects(cell), ACTIONS):
+            enabled, label = states[action]
+            if label != text:
+                fill = _MUTED  # 正在生成
+            else:
+                fill = QColor(color) if enabled else _DISABLED
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(fill)
+            painter.drawRoundedRect(rect, 4, 4)
+            painter.setPen(QColor("white"))
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, label)
+
+    # ---- 点击 ----
+
+    def editorEvent(self, event, model, option, index):
+        kind = event.type()
+        if kind not in (QEvent.Type.MouseButtonRelease, QEvent.Type.MouseButtonDblClick):
+            return False
+        if event.button() != Qt.MouseButton.LeftButton:
+            return False
+        pos = event.position().toPoint()
+        row, column, cell = index.row(), index.column(), option.rect
+        double = kind == QEvent.Type.MouseButtonDblClick
+        if column == COL_MAIN and main_image_rect(cell).contains(pos) and not double:
+            self.main_image_clicked.emit(row)
+            return True
+        if column == COL_MODELS:
+            for slot, rect in enumerate(model_slot_rects(cell)):
+                if rect.contains(pos):
+                    (self.model_slot_double_clicked if double else self.model_slot_clicked).emit(row, slot)
+                    return True
+        if column == COL_VIDEO and video_rect(cell).contains(pos) and not double:
+            self.video_clicked.emit(row)
+            return True
+        if column == COL_ACTIONS and not double:
+            info = index.data(RowRole)
+            states = action_states(info)
+            for rect, (action, _, _) in zip(button_rects(cell), ACTIONS):
+                if rect.contains(pos) and states[action][0]:
+                    self.action_triggered.emit(row, action)
+                    return True
+        return False
+
+
+def action_states(row: ProductRow) -> Dict[str, tuple]:
+    """各按钮的 (是否可用, 显示文字)"""
+    image_busy = row.image_busy
+    video_busy = row.video_busy
+    return {
+        ACTION_IMAGE: (not image_busy, "正在生成" if image_busy else "生成图片"),
+        ACTION_VIDEO: (not video_busy and video_enabled(row), "正在生成" if video_busy else "生成视频"),
+        ACTION_CANCEL: (image_busy or video_busy, "取消"),
+        ACTION_DELETE: (True, "删除"),
+    }
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+提示词模板
+把配置中的提示词（如 image_prompt）解析一次为记号列表：
+- 文本、场景占位符（<> / <scene> / <场景>）、标题占位符（<title> / <标题> / 含“标题”“产品名”“商品名”的词）
+- 未识别的占位符按原文保留
+编译结果按模板文本缓存：提示词经 set_config 修改后文本变化，自然使用新的编译结果。
+渲染时只做一次字符串格式化，可批量渲染多行。
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+# 记号类型
+LITERAL = 'literal'
+SCENE = 'scene'
+TITLE = 'title'
+UNKNOWN = 'unknown'
+
+_PLACEHOLDER = re.compile(r"<\s*([^<>]*?)\s*>")
+
+# 最多缓存的模板数量
+_TEMPLATE_CACHE_SIZE = 32
+
+
+def _classify(token: str) -> str:
+    """判断占位符类型（与原 merge_prompt_with_scene 的规则一致）"""
+    t = token.strip().lower()
+    if t in ("", "scene", "场景"):
+        return SCENE
+    if t in ("title", "标题"):
+        return TITLE
+    # 宽松匹配：包含“标题”的中文词都视为 title
+    if ("标题" in token) or ("title" in t) or ("产品名" in token) or ("商品名" in token):
+        return TITLE
+    return UNKNOWN
+
+
+class PromptTemplate:
+    """编译后的提示词模板"""
+
+    def __init__(self, template: str):
+        self.template = template or ""
+        self.tokens: List[Tuple[str, str]] = []
+        pos = 0
+        for m in _PLACEHOLDER.finditer(self.template):
+            if m.start() > pos:
+                self.tokens.append((LITERAL, self.template[pos:m.start()]))
+            kind = _classify(m.group(1))
+            self.tokens.append((kind, m.group(0)))
+            pos = m.end()
+        if pos < len(self.template):
+            self.tokens.append((LITERAL, self.template[pos:]))
+        self.has_scene = any(kind == SCENE for kind, _ in self.tokens)
+        # 编译为格式串，渲染时一次 str.format 完成替换
+        parts = []
+        for kind, text in self.tokens:
+            if kind == SCENE:
+                parts.append("{scene}")
+            elif kind == TITLE:
+                parts.append("{title}")
+            else:
+                parts.append(text.replace("{", "{{").replace("}", "}}"))
+        self._format = "".join(parts)
+
+    def render(self, title: str, scene: str) -> str:
+        """填充标题与场景；模板中没有场景占位符（或结果不含场景）时在末尾追加场景"""
+        if not self.template:
+            return scene or ""
+        filled = self._format.format(scene=scene or "", title=title or "")
+        if scene and (scene not in filled):
+            filled = f"{filled}\n{scene}".strip()
+        return filled
+
+    def render_many(self, rows: Iterable[Tuple[str, str]]) -> List[str]:
+        """批量渲染 [(标题, 场景), ...]"""
+        render = self.render
+        return [render(title, scene) for title, scene in rows]
+
+
+@lru_cache(maxsize=_TEMPLATE_CACHE_SIZE)
+def compile_prompt(template: str) -> PromptTemplate:
+    """编译提示词模板（按模板文本缓存）"""
+    return PromptTemplate(template)
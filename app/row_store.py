@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+商品行存储
+表格行按唯一 ID（uniqueId）保存，不再以表格行号作为身份：删除行只会让行号失效，
+按 ID 记录的状态不受影响。每行是带 __slots__ 的紧凑记录，并维护二级索引：
+- 按状态（待生成、生图中、已出图、视频生成中、已完成、失败）
+- 已选择模特图的行、已有模特图的行
+批量操作与界面按索引查询，只访问匹配的 k 行，不再逐行遍历。
+主图与所选模特图是否存在在行创建或更新时记录（main_exists、selected_exists），绘制时不访问文件系统。
+"""
+
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# 每行模特图槽位数
+MODEL_SLOTS = 4
+
+# 行状态
+STATUS_PENDING = 'pending'
+STATUS_IMAGING = 'imaging'
+STATUS_IMAGED = 'imaged'
+STATUS_VIDEO_RUNNING = 'video_running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUSES = (STATUS_PENDING, STATUS_IMAGING, STATUS_IMAGED, STATUS_VIDEO_RUNNING, STATUS_DONE, STATUS_FAILED)
+
+
+class ProductRow:
+    """表格中的一个商品"""
+    __slots__ = (
+        'row_id', 'name', 'main_image', 'folder_path',
+        'model_images', 'selected_slot', 'selected_model_image', 'video_path',
+        'main_exists', 'selected_exists',
+        'scene', 'scene_image', 'auto_video',
+        'image_busy', 'video_busy', 'failed', 'status',
+    )
+
+    def __init__(self, row_id: str, name: str, main_image: str, folder_path: str = ''):
+        self.row_id = row_id
+        self.name = name
+        self.main_image = main_image
+        self.folder_path = folder_path
+        self.model_images: List[str] = []
+        self.selected_slot = 0
+        self.selected_model_image: Optional[str] = None
+        self.video_path: Optional[str] = None
+        self.main_exists = bool(main_image)
+        self.selected_exists = False
+        self.scene: Optional[str] = None
+        self.scene_image: Optional[str] = None
+        self.auto_video = False
+        self.image_busy = False
+        self.video_busy = False
+        self.failed = False
+        self.status = STATUS_PENDING
+
+    @classmethod
+    def from_scan(cls, row: Dict[str, Any]) -> 'ProductRow':
+        """由 folder_scanner 扫描结果创建"""
+        record = cls(row['uniqueId'], str(row.get('name', '')), row.get('main_image') or '', row.get('folder_path') or '')
+        # 扫描时按 SKU 恢复的已生成结果（见 folder_scanner.attach_outputs）
+        record.model_images = list(row.get('model_images') or [])[:MODEL_SLOTS]
+        record.video_path = row.get('video_path')
+        record.selected_model_image = row.get('selected_model_image')
+        if record.model_images and not record.selected_model_image:
+            # 与新生成的图片一致：未选择时默认选中第一张
+            record.selected_model_image = record.model_images[0]
+        # 扫描线程只返回目录中列出的主图，已生成结果也只保留仍存在的文件，无需再检查
+        record.selected_exists = bool(record.selected_model_image)
+        return record
+
+    def check_files(self):
+        """重新检查主图与所选模特图是否存在"""
+        self.main_exists = bool(self.main_image) and os.path.exists(self.main_image)
+        selected = self.selected_model_image
+        self.selected_exists = bool(selected) and os.path.exists(selected)
+
+    def derive_status(self) -> str:
+        if self.video_busy:
+            return STATUS_VIDEO_RUNNING
+        if self.image_busy:
+            return STATUS_IMAGING
+        if self.failed:
+            return STATUS_FAILED
+        if self.video_path:
+            return STATUS_DONE
+        if self.model_images:
+            return STATUS_IMAGED
+        return STATUS_PENDING
+
+
+class RowStore:
+    """按 ID 保存的有序行集合"""
+
+    def __init__(self, rows: Iterable[ProductRow] = ()):
+        self._rows: Dict[str, ProductRow] = {}
+        self._order: List[str] = []
+        # row_id -> 行号；删除行后失效，下次查询时重建
+        self._positions: Optional[Dict[str, int]] = {}
+        # 二级索引（dict 作为有序集合）
+        self._by_status: Dict[str, Dict[str, None]] = {status: {} for status in STATUSES}
+        self._selected: Dict[str, None] = {}
+        self._with_images: Dict[str, None] = {}
+        self.extend(rows)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[ProductRow]:
+        return (self._rows[row_id] for row_id in self._order)
+
+    def __contains__(self, row_id) -> bool:
+        return row_id in self._rows
+
+    def at(self, index: int) -> ProductRow:
+        """按表格行号取行"""
+        return self._rows[self._order[index]]
+
+    def get(self, row_id) -> Optional[ProductRow]:
+        return self._rows.get(row_id)
+
+    def index_of(self, row_id) -> Optional[int]:
+        """行唯一 ID 对应的当前行号"""
+        if self._positions is None:
+            self._positions = {rid: index for index, rid in enumerate(self._order)}
+        return self._positions.get(row_id)
+
+    # ---- 增删 ----
+
+    def extend(self, rows: Iterable[ProductRow]) -> int:
+        """追加行（ID 已存在的行跳过），返回追加数量"""
+        added = 0
+        for row in rows:
+            if row.row_id in self._rows:
+                continue
+            self._rows[row.row_id] = row
+            if self._positions is not None:
+                self._positions[row.row_id] = len(self._order)
+            self._order.append(row.row_id)
+            self._index(row)
+            added += 1
+        return added
+
+    def clear(self):
+        self._rows.clear()
+        self._order.clear()
+        self._positions = {}
+        for index in self._by_status.values():
+            index.clear()
+        self._selected.clear()
+        self._with_images.clear()
+
+    def remove(self, row_id) -> Optional[ProductRow]:
+        row = self._rows.pop(row_id, None)
+        if row is None:
+            return None
+        index = self.index_of(row_id)
+        del self._order[index]
+        self._positions = None
+        self._unindex(row)
+        return row
+
+    # ---- 索引 ----
+
+    def _index(self, row: ProductRow):
+        row.status = row.derive_status()
+        self._by_status[row.status][row.row_id] = None
+        if row.selected_model_image:
+            self._selected[row.row_id] = None
+        if row.model_images:
+            self._with_images[row.row_id] = None
+
+    def _unindex(self, row: ProductRow):
+        self._by_status[row.status].pop(row.row_id, None)
+        self._selected.pop(row.row_id, None)
+        self._with_images.pop(row.row_id, None)
+
+    def update(self, row: ProductRow, **changes) -> ProductRow:
+        """修改行字段并同步二级索引"""
+        self._unindex(row)
+        for name, value in changes.items():
+            setattr(row, name, value)
+        self._index(row)
+        return row
+
+    # ---- 查询（结果按表格顺序） ----
+
+    def _ordered(self, row_ids: Iterable[str]) -> List[ProductRow]:
+        index_of = self.index_of
+        return [self._rows[row_id] for row_id in sorted(row_ids, key=index_of)]
+
+    def query(self, *statuses: str) -> List[ProductRow]:
+        """指定状态的行"""
+        row_ids = [row_id for status in statuses for row_id in self._by_status[status]]
+        return self._ordered(row_ids)
+
+    def with_selection(self) -> List[ProductRow]:
+        """已选择模特图的行"""
+        return self._ordered(self._selected)
+
+    def with_images(self) -> List[ProductRow]:
+        """已有生成模特图的行"""
+        return self._ordered(self._with_images)
+
+    def counts(self) -> Dict[str, int]:
+        return {status: len(index) for status, index in self._by_status.items()}
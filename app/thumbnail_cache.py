@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+缩略图缓存
+表格、图库与选图对话框只需要 100~150 像素的缩略图，不应在界面线程中按原尺寸解码整张照片：
+- 后台线程用 Pillow 解码：JPEG 通过 draft 直接按 1/2~1/8 比例解码，内存与耗时都远小于全尺寸解码
+- 缩略图按 (路径, 修改时间, 文件大小, 尺寸) 命名保存在应用数据目录，重启后直接读取
+- 同一张图的并发请求共享同一个结果；检查源文件与磁盘缓存都在解码线程中进行，请求方（界面线程）不访问文件系统
+Pillow 不可用或解码失败时结果为 None，由调用方回退为原来的加载方式。
+"""
+
+import os
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from database import logger, get_app_data_dir
+
+# Pillow 为可选依赖
+try:
+    from PIL import Image, ImageOps
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# 解码线程数（Pillow 解码与缩放时释放 GIL）
+THUMB_WORKERS = 4
+
+# 缩略图 JPEG 质量
+THUMB_QUALITY = 85
+
+# 磁盘缓存上限，超过后按修改时间淘汰最旧的缩略图
+THUMB_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def thumbnail_dir() -> str:
+    path = os.path.join(get_app_data_dir("jimeng_script"), "thumbnails")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _thumb_name(path: str, size: int) -> Optional[str]:
+    """按源文件路径、修改时间、大小与缩略图尺寸命名；源文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{size}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _render_thumbnail(src_path: str, out_path: str, size: int) -> str:
+    with Image.open(src_path) as img:
+        # JPEG 按接近目标尺寸的比例直接解码（DCT 缩放），其他格式无影响
+        img.draft('RGB', (size * 2, size * 2))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            rgba = img.convert('RGBA')
+            img = Image.new('RGB', rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.split()[-1])
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        tmp_path = f"{out_path}.{threading.get_ident()}.tmp"
+        img.save(tmp_path, 'JPEG', quality=THUMB_QUALITY)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class ThumbnailCache:
+    """磁盘缩略图缓存与后台解码线程池"""
+
+    def __init__(self, max_workers: int = THUMB_WORKERS, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or thumbnail_dir()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='thumbnail')
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, int], Future] = {}
+
+    def _path_for(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name[:2], f"{name}.jpg")
+
+    def cached_path(self, path: str, size: int) -> Optional[str]:
+        """已生成的缩略图路径（不解码）"""
+        name = _thumb_name(path, size)
+        if name is None:
+            return None
+        out_path = self._path_for(name)
+        return out_path if os.path.exists(out_path) else None
+
+    def request(self, path: str, size: int) -> Future:
+        """
+        请求缩略图（不阻塞，不访问文件系统）
+        :return: Future，结果为缩略图文件路径；源文件不存在、Pillow 不可用或解码失败时为 None
+        """
+        key = (path, size)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                return pending
+            future = self._pool.submit(self._resolve, path, size)
+            self._pending[key] = future
+        future.add_done_callback(lambda f, key=key: self._forget(key))
+        return future
+
+    def _resolve(self, path: str, size: int) -> Optional[str]:
+        """在解码线程中按源文件当前的修改时间查找磁盘缓存，没有时生成"""
+        name = _thumb_name(path, size) if HAS_PIL and path else None
+        if name is None:
+            return None
+        out_path = self._path_for(name)
+        if os.path.exists(out_path):
+            return out_path
+        return self._build(path, out_path, size)
+
+    def _forget(self, key: Tuple[str, int]):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    @staticmethod
+    def _build(path: str, out_path: str, size: int) -> Optional[str]:
+        try:
+            return _render_thumbnail(path, out_path, size)
+        except Exception as e:
+            logger.warning(f"生成缩略图失败 {path}: {e}")
+            return None
+
+    def prune(self, max_bytes: int = THUMB_CACHE_MAX_BYTES):
+        """磁盘缓存超过上限时删除最旧的缩略图"""
+        files = []
+        total = 0
+        try:
+            for shard in os.scandir(self.cache_dir):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    st = entry.stat()
+                    files.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        except OSError as e:
+            logger.warning(f"整理缩略图缓存失败: {e}")
+            return
+        if total <= max_bytes:
+            return
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= max_bytes * 0.8:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        logger.info(f"缩略图缓存超出上限，已删除 {removed} 个旧缩略图")
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_cache: Optional[ThumbnailCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """进程内共享的缩略图缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ThumbnailCache()
+        return _cache
+
+
+def shutdown_thumbnail_cache():
+    global _cache
+    with _cache_lock:
+        cache, _cache = _cache, None
+    if cache is not None:
+        cache.shutdown()
+        cache.prune()
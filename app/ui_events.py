@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+界面事件汇总
+批量生成时每个任务结束都会更新状态栏并弹出消息框，300 行的批次会叠出 300 多个对话框。
+这里把任务进度与提示消息先记在内存里，按固定帧率（FRAME_INTERVAL_MS）统一刷新界面：
+- 进度：本批任务的总数、进行中、排队、完成、失败、取消与预计剩余时间
+- 状态栏：一帧内只显示最新一条消息
+- 通知记录：失败原因等逐条追加到非阻塞的通知列表
+一批任务全部结束后只发出一次汇总（batch_finished）。
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+# 界面刷新间隔（毫秒），约 10 帧/秒
+FRAME_INTERVAL_MS = 100
+
+# 任务结束状态
+_FINISHED = ('done', 'failed', 'cancelled')
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60:02d}:{rest % 60:02d}"
+
+
+class UiEventAggregator(QObject):
+    """汇总任务进度与提示消息，按帧发出界面更新信号（需在主线程使用）"""
+    progress_updated = pyqtSignal(object)   # 进度快照（见 snapshot）
+    status_updated = pyqtSignal(str)        # 本帧最新的状态栏消息
+    notifications_ready = pyqtSignal(object)  # 本帧新增的通知 [文本, ...]
+    batch_finished = pyqtSignal(object)     # 一批任务全部结束时的汇总（同 snapshot）
+
+    def __init__(self, parent=None, interval_ms: int = FRAME_INTERVAL_MS):
+        super().__init__(parent)
+        self._jobs: Dict[str, str] = {}  # job_id -> queued / running / 结束状态
+        self._counts = {'running': 0, 'done': 0, 'failed': 0, 'cancelled': 0}
+        self._started_at = 0.0
+        self._status: Optional[str] = None
+        self._notifications: List[str] = []
+        self._dirty = False
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._flush)
+
+    # ---- 事件输入（只修改内存状态） ----
+
+    def job_submitted(self, job_id: str):
+        if not self._jobs:
+            self._started_at = time.monotonic()
+        self._jobs[job_id] = 'queued'
+        self._touch()
+
+    def job_state(self, job_id: str, status: str):
+        """任务状态变化：running / done / failed / cancelled"""
+        previous = self._jobs.get(job_id)
+        if previous is None or previous in _FINISHED:
+            return
+        if status == 'running':
+            if previous == 'queued':
+                self._jobs[job_id] = 'running'
+                self._counts['running'] += 1
+                self._touch()
+            return
+        if status not in _FINISHED:
+            return
+        if previous == 'running':
+            self._counts['running'] -= 1
+        self._jobs[job_id] = status
+        self._counts[status] += 1
+        self._touch()
+
+    def status(self, message: str):
+        """状态栏消息（同一帧内只显示最新一条）"""
+        self._status = message
+        self._touch()
+
+    def notify(self, message: str):
+        """追加一条通知记录"""
+        self._notifications.append(f"{time.strftime('%H:%M:%S')} {message}")
+        self._touch()
+
+    # ---- 输出 ----
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = len(self._jobs)
+        finished = self._counts['done'] + self._counts['failed'] + self._counts['cancelled']
+        elapsed = time.monotonic() - self._started_at if total else 0.0
+        eta = None
+        if finished and finished < total:
+            # 按本批已结束任务的平均速度估算
+            eta = (total - finished) * elapsed / finished
+        return {
+            'total': total,
+            'finished': finished,
+            'running': self._counts['running'],
+            'queued': total - finished - self._counts['running'],
+            'done': self._counts['done'],
+            'failed': self._counts['failed'],
+            'cancelled': self._counts['cancelled'],
+            'elapsed': elapsed,
+            'eta': eta,
+        }
+
+    def _touch(self):
+        self._dirty = True
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self):
+        if not self._dirty:
+            self._timer.stop()
+            return
+        self._dirty = False
+        if self._status is not None:
+            status, self._status = self._status, None
+            self.status_updated.emit(status)
+        if self._notifications:
+            notifications, self._notifications = self._notifications, []
+            self.notifications_ready.emit(notifications)
+        snapshot = self.snapshot()
+        self.progress_updated.emit(snapshot)
+        if snapshot['total'] and snapshot['finished'] == snapshot['total']:
+            # 本批结束：发出汇总后清零，下一次提交开始新的一批
+            self._jobs.clear()
+            self._counts = dict.fromkeys(self._counts, 0)
+            self.batch_finished.emit(snapshot)
+
+    def stop(self):
+        self._timer.stop()
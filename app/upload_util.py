@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浏览器文件上传
+统一通过 Playwright 原生文件通道（set_input_files）把本地文件交给页面中的 file input：
+本地浏览器按路径直接读取文件，不再把字节序列化成 JSON 数组经 CDP 传入页面再重建。
+即梦与可灵流程共用。
+"""
+
+import os
+from typing import Union
+
+
+async def upload_file(page, selector: str, file_path: Union[str, os.PathLike],
+                      timeout_ms: float = 10000, index: int = 0):
+    """
+    将本地文件设置到页面的 file input 并触发 change 事件
+    :param page: Playwright 页面
+    :param selector: file input 选择器（允许隐藏元素）
+    :param file_path: 本地文件路径
+    :param timeout_ms: 等待 input 出现与设置文件的超时（毫秒）
+    :param index: 匹配到多个 input 时使用第几个
+    """
+    file_path = os.fspath(file_path)
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"上传文件不存在: {file_path}")
+    locator = page.locator(selector).nth(index)
+    await locator.wait_for(state='attached', timeout=timeout_ms)
+    await locator.set_input_files(file_path, timeout=timeout_ms)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+商品文件夹扫描基准测试
+在临时目录中生成合成导入目录（默认 10000 个 SKU，每个 3 张图片，约 80% 有 items/<SKU>.json），
+对比旧的逐 SKU 六次 glob 扫描与 folder_scanner（os.scandir + 线程池），并校验两者结果一致。
+旧实现的逐文件 INFO 日志不计入（实际导入时还会更慢）。
+另外测量导入索引（临时数据库）：首次导入、未变化时再次导入、1% 文件夹变化后再次导入。
+
+用法：python benchmarks/bench_folder_scan.py [--skus 10000] [--images 3] [--repeat 3] [--workers 8]
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from database import logger, db, ImportIndex  # noqa: E402
+from folder_scanner import scan_product_folder  # noqa: E402
+
+
+def build_tree(root: str, skus: int, images: int):
+    """生成合成导入目录"""
+    images_folder = os.path.join(root, 'images')
+    items_folder = os.path.join(root, 'items')
+    os.makedirs(items_folder)
+    exts = ['.jpg', '.png', '.webp']
+    for i in range(skus):
+        sku = f"SKU{i:06d}"
+        folder = os.path.join(images_folder, sku)
+        os.makedirs(folder)
+        for j in range(images):
+            with open(os.path.join(folder, f"{j:02d}{exts[j % len(exts)]}"), 'wb') as f:
+                f.write(b'\xff\xd8')
+        with open(os.path.join(folder, 'notes.txt'), 'w') as f:
+            f.write('x')
+        if i % 5:
+            with open(os.path.join(items_folder, f"{sku}.json"), 'w', encoding='utf-8') as f:
+                json.dump({'title': f"商品 {i}", 'price': i}, f, ensure_ascii=False)
+
+
+def scan_legacy(folder_path: str):
+    """旧实现：逐个子文件夹执行六次 glob，逐个检查并读取 JSON（去掉日志）"""
+    images_folder = os.path.join(folder_path, "images")
+    items_folder = os.path.join(folder_path, "items")
+    files = []
+    for subdir in os.listdir(images_folder):
+        subdir_path = os.path.join(images_folder, subdir)
+        if not os.path.isdir(subdir_path):
+            continue
+        image_files = []
+        for ext in ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.gif', '*.webp']:
+            image_files.extend(glob.glob(os.path.join(subdir_path, ext)))
+        if not image_files:
+            continue
+        json_file = os.path.join(items_folder, f"{subdir}.json")
+        title = subdir
+        if os.path.exists(json_file):
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    if isinstance(data, dict):
+                        title = data.get('title', data.get('name', subdir))
+            except Exception:
+                pass
+        files.append({
+            'name': title,
+            'main_image': image_files[0],
+            'folder_path': subdir_path,
+            'uniqueId': f"{subdir}_{int(time.time())}",
+            'selected_model_image': None
+        })
+    return files
+
+
+def bench(label, scan, repeat):
+    timings = []
+    rows = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = scan()
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    print(f"{label:<10} 最快 {best:.3f}s  中位 {statistics.median(timings):.3f}s  {len(rows)} 行")
+    return best, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="商品文件夹扫描基准测试")
+    parser.add_argument('--skus', type=int, default=10000, help="SKU 子文件夹数量")
+    parser.add_argument('--images', type=int, default=3, help="每个 SKU 的图片数量")
+    parser.add_argument('--repeat', type=int, default=3, help="重复轮数")
+    parser.add_argument('--workers', type=int, default=8, help="扫描线程数")
+    args = parser.parse_args()
+    logger.remove()
+
+    root = tempfile.mkdtemp(prefix='bench_scan_')
+    try:
+        started = time.perf_counter()
+        build_tree(root, args.skus, args.images)
+        print(f"生成 {args.skus} 个 SKU 耗时 {time.perf_counter() - started:.1f}s（{root}）")
+
+        legacy, legacy_rows = bench("旧实现", lambda: scan_legacy(root), args.repeat)
+        scanner, rows = bench("scandir", lambda: scan_product_folder(root, max_workers=args.workers, use_index=False),
+                              args.repeat)
+
+        key = lambda r: r['folder_path']  # noqa: E731
+        assert [(r['folder_path'], r['name']) for r in sorted(legacy_rows, key=key)] == \
+               [(r['folder_path'], r['name']) for r in sorted(rows, key=key)]
+        assert all(r['main_image'].startswith(r['folder_path']) for r in rows)
+
+        # 首批行到达界面的时间（分块回调）
+        first = []
+        started = time.perf_counter()
+        scan_product_folder(root, on_chunk=lambda chunk: first or first.append(time.perf_counter() - started),
+                            max_workers=args.workers, use_index=False)
+        print(f"首批行到达 {first[0] * 1000:.1f}ms")
+        print(f"加速比：{legacy / scanner:.1f}x")
+
+        # 导入索引写入临时数据库，不影响应用数据
+        db.close()
+        db.init(os.path.join(root, 'index.db'))
+        db.create_tables([ImportIndex])
+        scan = lambda: scan_product_folder(root, max_workers=args.workers)  # noqa: E731
+        bench("索引首次", scan, 1)
+        warm, indexed_rows = bench("索引命中", scan, args.repeat)
+        assert [(r['folder_path'], r['name'], r['main_image']) for r in indexed_rows] == \
+               [(r['folder_path'], r['name'], r['main_image']) for r in rows]
+        for i in range(0, args.skus, 100):
+            with open(os.path.join(root, 'images', f"SKU{i:06d}", 'new.jpg'), 'wb') as f:
+                f.write(b'\xff\xd8')
+        bench("1%变化", scan, 1)
+        print(f"加速比（索引命中）：{legacy / warm:.1f}x")
+    finally:
+        db.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+商品表格基准测试
+对比两种表格实现填充 N 行（默认 2000）并完成一次绘制的耗时：
+- 旧实现：QTableWidget + 每行 setCellWidget（主图、四个模特图槽位、视频单元、四个按钮，各自带样式表）
+- product_table：QTableView + ProductTableModel + ProductDelegate（只绘制可见行）
+另外测量删除一行的耗时（旧实现删除后整表重建）。缩略图不计入（两者都异步加载）。
+最后对比 RowStore 按索引查询（1% 的行已选择模特图）与逐行遍历。
+
+用法：python benchmarks/bench_product_table.py [--rows 2000]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import (  # noqa: E402
+    QApplication, QTableWidget, QTableView, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QHeaderView,
+)
+
+from product_table import ProductTableModel, ProductDelegate, ROW_HEIGHT, MODEL_SLOTS  # noqa: E402
+from row_store import ProductRow, RowStore  # noqa: E402
+
+_LABEL_STYLE = "QLabel { border: 1px dashed #ced4da; border-radius: 4px; background-color: #f8f9fa; color: #6c757d; }"
+_BUTTON_STYLE = "QPushButton { background-color: %s; color: white; border: none; border-radius: 4px; padding: 8px; }"
+
+
+class _NoThumbnails:
+    """不加载缩略图（只比较表格本身）"""
+
+    def pixmap(self, path, size):
+        return None
+
+
+def make_rows(count):
+    return [{
+        'name': f"商品 {i}",
+        'main_image': f"/nonexistent/SKU{i:06d}/0.jpg",
+        'folder_path': f"/nonexistent/SKU{i:06d}",
+        'uniqueId': f"SKU{i:06d}_0",
+        'selected_model_image': None,
+    } for i in range(count)]
+
+
+def legacy_populate(table, rows):
+    """旧实现：每行创建一组控件"""
+    table.setRowCount(len(rows))
+    for row, info in enumerate(rows):
+        main = QWidget()
+        layout = QVBoxLayout(main)
+        image = QLabel("无图片")
+        image.setFixedSize(140, 140)
+        image.setStyleSheet(_LABEL_STYLE)
+        layout.addWidget(image)
+        layout.addWidget(QLabel(info['name']))
+        table.setCellWidget(row, 0, main)
+
+        models = QWidget()
+        layout = QHBoxLayout(models)
+        for i in range(MODEL_SLOTS):
+            slot = QLabel(f"模特图{i + 1}\n待生成")
+            slot.setFixedSize(100, 100)
+            slot.setStyleSheet(_LABEL_STYLE)
+            layout.addWidget(slot)
+        table.setCellWidget(row, 1, models)
+
+        video = QWidget()
+        layout = QVBoxLayout(video)
+        label = QLabel("视频\n待生成")
+        label.setFixedSize(100, 80)
+        label.setStyleSheet(_LABEL_STYLE)
+        layout.addWidget(label)
+        layout.addWidget(QLabel("未生成"))
+        table.setCellWidget(row, 2, video)
+
+        actions = QWidget()
+        layout = QVBoxLayout(actions)
+        for text, color in (("生成图片", "#007bff"), ("生成视频", "#28a745"), ("取消", "#6c757d"), ("删除", "#dc3545")):
+            button = QPushButton(text)
+            button.setFixedWidth(100)
+            button.setStyleSheet(_BUTTON_STYLE % color)
+            layout.addWidget(button)
+        table.setCellWidget(row, 3, actions)
+        table.setRowHeight(row, ROW_HEIGHT)
+
+
+def timed(label, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<16} {elapsed * 1000:9.1f} ms")
+    return elapsed
+
+
+def settle(app, widget):
+    widget.repaint()
+    app.processEvents()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="商品表格基准测试")
+    parser.add_argument('--rows', type=int, default=2000, help="行数")
+    args = parser.parse_args()
+    app = QApplication([])
+
+    rows = make_rows(args.rows)
+    print(f"{args.rows} 行")
+
+    old_table = QTableWidget(0, 4)
+    old_table.resize(1200, 700)
+    old_table.show()
+    old = timed("旧实现 填充", lambda: (legacy_populate(old_table, rows), settle(app, old_table)))
+    old_delete = timed("旧实现 删除一行", lambda: (legacy_populate(old_table, rows[1:]), settle(app, old_table)))
+    old_table.close()
+    old_table.deleteLater()
+    app.processEvents()
+
+    view = QTableView()
+    view.resize(1200, 700)
+    view.verticalHeader().setDefaultSectionSize(ROW_HEIGHT)
+    view.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+    model = ProductTableModel()
+    view.setModel(model)
+    view.setItemDelegate(ProductDelegate(_NoThumbnails(), view))
+    view.show()
+    new = timed("模型/视图 填充", lambda: (model.set_rows(ProductRow.from_scan(row) for row in rows), settle(app, view)))
+    new_delete = timed("模型/视图 删除一行", lambda: (model.remove_row(0), settle(app, view)))
+    timed("模型/视图 更新一行", lambda: (model.row_changed(0), settle(app, view)))
+    print(f"加速比：填充 {old / new:.0f}x，删除 {old_delete / new_delete:.0f}x")
+
+    store = RowStore(ProductRow.from_scan(row) for row in rows)
+    for record in list(store)[::100]:
+        store.update(record, selected_model_image=record.main_image)
+    scan = timed("逐行遍历 查询", lambda: [r for r in store if r.selected_model_image])
+    indexed = timed("状态索引 查询", store.with_selection)
+    print(f"加速比：查询 {scan / indexed:.0f}x（{len(store.with_selection())} 行）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+提示词模板基准测试
+对比旧的 merge_prompt_with_scene（每次两次正则替换）与编译后的模板（prompt_template），
+默认各渲染 100000 次，并校验两者输出一致。
+
+用法：python benchmarks/bench_prompt_template.py [--renders 100000] [--repeat 3]
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from prompt_template import compile_prompt  # noqa: E402
+
+TEMPLATES = [
+    "<场景>中的<产品标题>，柔和自然光，高清电商主图",
+    "A model holding <title> in <scene>, 85mm, soft light, {no braces expanded}",
+    "模特展示<商品名>，背景：<>，<unknown> 保持原样",
+    "没有占位符的提示词",
+]
+
+ROWS = [(f"产品{i}", f"场景{i % 7}") for i in range(100)]
+
+
+def merge_legacy(prompt: str, title: str, scene: str) -> str:
+    """旧实现：每次渲染都用两次正则替换解析模板"""
+    try:
+        if not prompt:
+            return (scene or "")
+
+        def normalize_token(tok: str) -> str:
+            t = tok.strip().lower()
+            if t in ("scene", "场景"):
+                return "scene"
+            if t in ("title", "标题"):
+                return "title"
+            # 宽松匹配：包含“标题”的中文词都视为 title
+            if ("标题" in tok) or ("title" in t) or ("产品名" in tok) or ("商品名" in tok):
+                return "title"
+            return t
+
+        def replacer(m: re.Match) -> str:
+            raw = m.group(0)
+            token = m.group(1)
+            key = normalize_token(token)
+            if key == "scene":
+                return scene or ""
+            if key == "title":
+                return title or ""
+            return raw  # 未识别的占位符保持不变
+
+        # 先将空占位符 <> 视为场景占位符
+        filled = re.sub(r"<\s*>", scene or "", prompt)
+        # 再替换具名占位符
+        filled = re.sub(r"<\s*([^<>]+?)\s*>", replacer, filled)
+
+        # 如果填充后不包含场景文本（说明没有场景占位符），在末尾追加场景。
+        if scene and (scene not in filled):
+            filled = f"{filled}\n{scene}".strip()
+
+        return filled
+    except Exception as e:
+        logging.warning(f"合并提示词与场景失败，使用原始提示词: {e}")
+        # 退化：原始提示词 + 场景
+        base = prompt or ""
+        return f"{base}\n{scene}".strip()
+
+
+def bench(label, render, renders, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        n = 0
+        while n < renders:
+            for template in TEMPLATES:
+                for title, scene in ROWS:
+                    render(template, title, scene)
+            n += len(TEMPLATES) * len(ROWS)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    print(f"{label:<10} 最快 {best:.3f}s  中位 {statistics.median(timings):.3f}s  "
+          f"{best / n * 1e6:.2f} us/次")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提示词模板基准测试")
+    parser.add_argument('--renders', type=int, default=100000, help="每轮渲染次数")
+    parser.add_argument('--repeat', type=int, default=3, help="重复轮数")
+    args = parser.parse_args()
+
+    for template in TEMPLATES:
+        for title, scene in ROWS[:10]:
+            expected = merge_legacy(template, title, scene)
+            actual = compile_prompt(template).render(title, scene)
+            assert expected == actual, (template, expected, actual)
+
+    legacy = bench("旧实现", merge_legacy, args.renders, args.repeat)
+    compiled = bench("编译模板", lambda t, title, scene: compile_prompt(t).render(title, scene),
+                     args.renders, args.repeat)
+
+    def render_batched(renders):
+        started = time.perf_counter()
+        n = 0
+        while n < renders:
+            for template in TEMPLATES:
+                compile_prompt(template).render_many(ROWS)
+                n += len(ROWS)
+        return time.perf_counter() - started
+
+    batched = min(render_batched(args.renders) for _ in range(args.repeat))
+    print(f"{'批量渲染':<10} 最快 {batched:.3f}s")
+    print(f"加速比：逐行 {legacy / compiled:.1f}x，批量 {legacy / batched:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
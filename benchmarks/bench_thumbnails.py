@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+缩略图基准测试
+在临时目录生成一批大尺寸 JPEG（默认 100 张 4000x3000），对比：
+- 旧实现：界面线程中 QImage 按原尺寸解码后缩放到 130 像素
+- thumbnail_cache 首次生成（后台线程 + JPEG draft 缩小解码 + 写入磁盘缓存）
+- thumbnail_cache 命中磁盘缓存后读取缩略图
+并报告解码的像素量（近似内存峰值）。
+
+用法：python benchmarks/bench_thumbnails.py [--images 100] [--width 4000] [--height 3000] [--size 130]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+from PyQt6.QtCore import Qt  # noqa: E402
+from PyQt6.QtGui import QImage  # noqa: E402
+
+from database import logger  # noqa: E402
+from thumbnail_cache import ThumbnailCache  # noqa: E402
+
+
+def build_images(root: str, count: int, width: int, height: int):
+    """生成带噪点的照片尺寸 JPEG（噪点让文件大小接近真实照片）"""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    img = Image.fromarray(base).resize((width, height), Image.Resampling.BILINEAR)
+    noise = rng.integers(-20, 20, (height, width, 3), dtype=np.int16)
+    img = Image.fromarray(np.clip(np.asarray(img, dtype=np.int16) + noise, 0, 255).astype(np.uint8))
+    paths = []
+    for i in range(count):
+        path = os.path.join(root, f"photo_{i:04d}.jpg")
+        img.save(path, 'JPEG', quality=92 - i % 5)
+        paths.append(path)
+    return paths
+
+
+def legacy(paths, size):
+    for path in paths:
+        image = QImage(path)
+        image.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+
+
+def via_cache(cache: ThumbnailCache, paths, size):
+    futures = [cache.request(path, size) for path in paths]
+    results = [f.result() for f in futures]
+    assert all(results), "缩略图生成失败"
+    for path in results:
+        QImage(path)
+
+
+def timed(label, func, count):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<12} {elapsed:.2f}s  {elapsed / count * 1000:.1f} ms/张")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缩略图基准测试")
+    parser.add_argument('--images', type=int, default=100, help="图片数量")
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--size', type=int, default=130, help="缩略图尺寸")
+    args = parser.parse_args()
+    logger.remove()
+
+    root = tempfile.mkdtemp(prefix='bench_thumb_')
+    try:
+        paths = build_images(root, args.images, args.width, args.height)
+        total_mb = sum(os.path.getsize(p) for p in paths) / 1024 / 1024
+        print(f"{args.images} 张 {args.width}x{args.height} JPEG，共 {total_mb:.0f}MB")
+
+        old = timed("旧实现", lambda: legacy(paths, args.size), args.images)
+        cache = ThumbnailCache(cache_dir=os.path.join(root, 'thumbs'))
+        cold = timed("首次生成", lambda: via_cache(cache, paths, args.size), args.images)
+        warm = timed("磁盘缓存", lambda: via_cache(cache, paths, args.size), args.images)
+        cache.shutdown()
+
+        with Image.open(paths[0]) as img:
+            img.draft('RGB', (args.size * 2, args.size * 2))
+            decoded = img.size
+        print(f"单张解码像素：旧实现 {args.width * args.height / 1e6:.1f}MP，"
+              f"draft {decoded[0] * decoded[1] / 1e6:.2f}MP")
+        print(f"加速比：首次 {old / cold:.1f}x，缓存命中 {old / warm:.1f}x")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
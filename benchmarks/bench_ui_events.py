@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+界面事件汇总基准测试
+模拟一批 N 个任务（默认 300）的引擎事件：提交、开始、部分任务重试、结束（约 10% 失败），
+事件在 --duration 秒内均匀到达。对比两种处理方式的界面更新次数：
+- 旧实现：每个事件直接更新状态栏，每个任务结束弹出一个消息框
+- UiEventAggregator：按帧（FRAME_INTERVAL_MS）刷新进度与状态栏，批次结束只发一次汇总
+
+用法：python benchmarks/bench_ui_events.py [--jobs 300] [--duration 2]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+from ui_events import UiEventAggregator, FRAME_INTERVAL_MS  # noqa: E402
+
+
+def make_events(jobs, seed=0):
+    """生成一批任务的事件序列 [(job_id, status, attempt), ...]"""
+    rng = random.Random(seed)
+    events = [(f"job{i}", 'submitted', 0) for i in range(jobs)]
+    for i in range(jobs):
+        job_id = f"job{i}"
+        retries = rng.choice((0, 0, 0, 1, 2))
+        events.extend((job_id, 'running', attempt) for attempt in range(retries + 1))
+        events.append((job_id, 'failed' if rng.random() < 0.1 else 'done', retries))
+    return events
+
+
+def legacy_counts(events):
+    """旧实现：重试与结束各更新一次状态栏，每个结束的任务弹一个消息框"""
+    status_updates = sum(1 for _, status, attempt in events
+                         if status in ('done', 'failed') or (status == 'running' and attempt))
+    dialogs = sum(1 for _, status, _ in events if status in ('done', 'failed'))
+    return status_updates, dialogs
+
+
+def run_aggregated(app, events, duration):
+    aggregator = UiEventAggregator()
+    counts = {'progress': 0, 'status': 0, 'notifications': 0, 'summary': 0}
+    aggregator.progress_updated.connect(lambda _: counts.__setitem__('progress', counts['progress'] + 1))
+    aggregator.status_updated.connect(lambda _: counts.__setitem__('status', counts['status'] + 1))
+    aggregator.notifications_ready.connect(lambda _: counts.__setitem__('notifications', counts['notifications'] + 1))
+    aggregator.batch_finished.connect(lambda _: counts.__setitem__('summary', counts['summary'] + 1))
+
+    interval = duration / len(events)
+    started = time.perf_counter()
+    for i, (job_id, status, attempt) in enumerate(events):
+        if status == 'submitted':
+            aggregator.job_submitted(job_id)
+        else:
+            aggregator.job_state(job_id, status)
+            if status == 'running' and attempt:
+                aggregator.status(f"图片生成失败，重试第{attempt}次")
+            elif status == 'failed':
+                aggregator.notify(f"{job_id}：图片生成失败(已重试3次)")
+            elif status == 'done':
+                aggregator.status("图片生成完成")
+        while time.perf_counter() - started < (i + 1) * interval:
+            app.processEvents()
+    # 等待最后一帧
+    deadline = time.perf_counter() + FRAME_INTERVAL_MS * 3 / 1000
+    while not counts['summary'] and time.perf_counter() < deadline:
+        app.processEvents()
+    aggregator.stop()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="界面事件汇总基准测试")
+    parser.add_argument('--jobs', type=int, default=300, help="任务数")
+    parser.add_argument('--duration', type=float, default=2.0, help="事件到达的时间跨度（秒）")
+    args = parser.parse_args()
+    app = QApplication([])
+
+    events = make_events(args.jobs)
+    print(f"{args.jobs} 个任务，{len(events)} 个事件，{args.duration:.1f} 秒内到达")
+
+    status_updates, dialogs = legacy_counts(events)
+    print(f"旧实现     状态栏更新 {status_updates:5d} 次，消息框 {dialogs:4d} 个")
+
+    counts = run_aggregated(app, events, args.duration)
+    print(f"汇总刷新   状态栏更新 {counts['status']:5d} 次，进度刷新 {counts['progress']:4d} 次，"
+          f"通知追加 {counts['notifications']:4d} 次，汇总消息框 {counts['summary']} 个")
+
+
+if __name__ == '__main__':
+    main()
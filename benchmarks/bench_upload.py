@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+上传方式基准测试
+对比旧的 page.evaluate 字节数组上传与 Playwright 原生文件通道（upload_util.upload_file），
+分别测试 1MB / 5MB / 20MB 文件。
+
+用法：python benchmarks/bench_upload.py [--repeat 3] [--sizes 1,5,20]
+需要已安装 Playwright 的 Chromium（playwright install chromium）。
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from playwright.async_api import async_playwright  # noqa: E402
+from upload_util import upload_file  # noqa: E402
+
+PAGE_HTML = """
+<input type="file" accept=".jpg,.jpeg,.png">
+<script>
+  window.__received = null;
+  document.querySelector('input').addEventListener('change', (e) => {
+    const f = e.target.files[0];
+    window.__received = f ? f.size : -1;
+  });
+</script>
+"""
+
+SELECTOR = 'input[type="file"][accept=".jpg,.jpeg,.png"]'
+
+
+async def upload_legacy(page, path):
+    """旧实现：读取全部字节后作为 evaluate 参数传入页面"""
+    with open(path, "rb") as f:
+        file_buffer = f.read()
+    await page.evaluate(
+        """([buffer, name]) => {
+            const inputs = document.querySelectorAll('input[type="file"][accept=".jpg,.jpeg,.png"]');
+            const dt = new DataTransfer();
+            const file = new File([new Uint8Array(buffer)], name, { type: 'image/jpeg' });
+            dt.items.add(file);
+            inputs[0].files = dt.files;
+            inputs[0].dispatchEvent(new Event('change', { bubbles: true }));
+        }""",
+        [list(file_buffer), os.path.basename(path)]
+    )
+
+
+async def upload_native(page, path):
+    await upload_file(page, SELECTOR, path)
+
+
+async def measure(page, method, path, expected_size):
+    await page.evaluate("window.__received = null")
+    started = time.perf_counter()
+    await method(page, path)
+    await page.wait_for_function("window.__received !== null")
+    elapsed = time.perf_counter() - started
+    received = await page.evaluate("window.__received")
+    if received != expected_size:
+        raise RuntimeError(f"页面收到的文件大小不一致: {received} != {expected_size}")
+    return elapsed
+
+
+async def run(sizes_mb, repeat):
+    methods = [('evaluate 字节数组', upload_legacy), ('原生文件通道', upload_native)]
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        for size in sizes_mb:
+            path = os.path.join(tmp, f"sample_{size}mb.jpg")
+            with open(path, 'wb') as f:
+                f.write(os.urandom(size * 1024 * 1024))
+            files[size] = path
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            page = await browser.new_page()
+            await page.set_content(PAGE_HTML)
+            print(f"{'大小':>6} | {'方式':<16} | {'中位数(秒)':>10} | {'最小(秒)':>8}")
+            print('-' * 50)
+            for size in sizes_mb:
+                for name, method in methods:
+                    timings = [await measure(page, method, files[size], size * 1024 * 1024)
+                               for _ in range(repeat)]
+                    print(f"{size:>4}MB | {name:<16} | {statistics.median(timings):>10.3f} | {min(timings):>8.3f}")
+            await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上传方式基准测试")
+    parser.add_argument('--repeat', type=int, default=3, help='每种组合的重复次数')
+    parser.add_argument('--sizes', default='1,5,20', help='文件大小（MB），逗号分隔')
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    asyncio.run(run(sizes, args.repeat))
+
+
+if __name__ == '__main__':
+    main()